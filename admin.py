@@ -1,10 +1,148 @@
 ''' Admin console builder.
+
+The changelists are built for tables with millions of rows: list columns
+come from joined rows instead of per-row queries, foreign keys are edited
+with raw id widgets instead of dropdowns of every row, filters and search
+only use indexed columns and the rows are counted up to ADMIN_COUNT_LIMIT
+at most.
 '''
 
+from __future__ import absolute_import
+
+import re
+
 from django.contrib import admin
-from issuetrack.models import Comment, Component, Issue, Project
+from django.core.paginator import Paginator
+from django.db import connections
+from issuetrack.models import Comment, Component, Issue, Project, Webhook
+from issuetrack.settings import ADMIN_COUNT_LIMIT
+
+KEY_RE = re.compile(r'^([A-Za-z0-9]+)-([0-9]+)$')
+''' An issue key typed in a search box, e.g. TP1-42.
+'''
+
+
+class EstimatedCountPaginator(Paginator):
+    ''' Paginator counting ADMIN_COUNT_LIMIT rows at most. Larger unfiltered
+    tables are counted with the PostgreSQL planner's estimate; larger
+    filtered results are shown as ADMIN_COUNT_LIMIT rows.
+    '''
+
+    def _estimate(self):
+        ''' Planner estimate of the number of rows of an unfiltered table,
+        or None.
+        '''
+        query = self.object_list.query
+        connection = connections[self.object_list.db]
+        if query.where or connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [self.object_list.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+    def _get_count(self):
+        if self._count is None:
+            self._count = self.object_list.order_by()[
+                :ADMIN_COUNT_LIMIT + 1].count()
+            if self._count > ADMIN_COUNT_LIMIT:
+                self._count = max(self._estimate() or 0, ADMIN_COUNT_LIMIT)
+        return self._count
+    count = property(_get_count)
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    ''' Changelist settings shared by the Issuetrack models.
+    '''
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ''' Do not count the whole table next to the filtered count.
+    '''
+    list_per_page = 50
+
+
+class ProjectAdmin(ScalableAdmin):
+    list_display = ('key', 'name', 'owner', 'last_issue_number')
+    list_select_related = ('owner',)
+    raw_id_fields = ('owner', 'members')
+    search_fields = ('=key', '^name')
+
+
+class ComponentAdmin(ScalableAdmin):
+    list_display = ('name', 'project')
+    list_select_related = ('project',)
+    list_filter = ('project',)
+    raw_id_fields = ('project',)
+    search_fields = ('^name',)
+
+
+class IssueAdmin(ScalableAdmin):
+    list_display = (
+        'id', 'key', 'title', 'status', 'priority', 'component', 'assignee',
+        'modified',
+    )
+    list_select_related = ('project', 'component__project', 'assignee')
+    list_filter = ('status', 'project')
+    ''' Both are leading columns of an index.
+    '''
+    raw_id_fields = ('creater', 'assignee', 'component')
+    search_fields = ('title',)
+    ''' See get_search_results.
+    '''
+
+    def get_search_results(self, request, queryset, search_term):
+        ''' Find an issue by key or id, or the issues whose title starts
+        with the search term, all with index lookups.
+        '''
+        term = search_term.strip()
+        key = KEY_RE.match(term)
+        if not term:
+            return queryset, False
+        if key:
+            return queryset.filter(
+                project__key=key.group(1), number=key.group(2)), False
+        if term.isdigit():
+            return queryset.filter(pk=term), False
+        return queryset.filter(title__startswith=term), False
+
+
+class CommentAdmin(ScalableAdmin):
+    list_display = ('id', 'issue', 'author', 'audience', 'created')
+    list_select_related = ('issue', 'author')
+    raw_id_fields = ('issue', 'author')
+    search_fields = ('issue',)
+    ''' See get_search_results.
+    '''
+
+    def get_search_results(self, request, queryset, search_term):
+        ''' Find the comments of an issue by its key or id.
+        '''
+        term = search_term.strip()
+        key = KEY_RE.match(term)
+        if key:
+            return queryset.filter(
+                issue__project__key=key.group(1),
+                issue__number=key.group(2),
+            ), False
+        if term.isdigit():
+            return queryset.filter(issue_id=term), False
+        if term:
+            return queryset.none(), False
+        return queryset, False
+
+
+class WebhookAdmin(ScalableAdmin):
+    list_display = ('url', 'project', 'active', 'failures', 'retry_at')
+    list_select_related = ('project',)
+    raw_id_fields = ('project',)
+
 
-admin.site.register(Component)
-admin.site.register(Issue)
-admin.site.register(Project)
-admin.site.register(Comment)
+admin.site.register(Component, ComponentAdmin)
+admin.site.register(Issue, IssueAdmin)
+admin.site.register(Project, ProjectAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Webhook, WebhookAdmin)
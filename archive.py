@@ -0,0 +1,98 @@
+''' Moving old terminal issues to the archive tables and back.
+
+Issues whose status is one of ARCHIVE_STATUSES and that were not changed
+for ARCHIVE_AFTER_DAYS are moved, with their comments, to ArchivedIssue and
+ArchivedComment in batches of ARCHIVE_BATCH_SIZE. This keeps the Issue table
+and its indexes limited to the issues people are working on. Archived
+issues keep their ids, so their links stay valid.
+'''
+
+from __future__ import absolute_import
+
+from datetime import timedelta
+
+from django.db import router, transaction
+from django.utils import timezone
+from issuetrack.models import ArchivedComment, ArchivedIssue, Comment, Issue
+from issuetrack.models import AssigneeLoad, Project, without_tombstones
+from issuetrack.models import workload
+from issuetrack.routers import issue_databases, use_database
+from issuetrack.settings import (
+    ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_STATUSES
+)
+
+
+def _copy(source, model):
+    ''' Build a model instance holding the field values of source that the
+    model also has.
+    '''
+    names = set(f.attname for f in model._meta.concrete_fields)
+    return model(**dict(
+        (f.attname, getattr(source, f.attname))
+        for f in source._meta.concrete_fields if f.attname in names
+    ))
+
+
+def archive_issues(days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE,
+                   progress=None):
+    ''' Move terminal issues unchanged for the given number of days to the
+    archive. Returns the number of issues archived.
+    '''
+    total = 0
+    for database in issue_databases():
+        with use_database(database):
+            total = _archive_issues(days, batch_size, progress, total)
+    return total
+
+
+def _archive_issues(days, batch_size, progress, total):
+    ''' archive_issues on one database.
+    '''
+    candidates = Issue.objects.filter(
+        status__in=ARCHIVE_STATUSES,
+        modified__lt=timezone.now() - timedelta(days=days),
+    )
+    while True:
+        with transaction.atomic(using=router.db_for_write(Issue)):
+            issues = list(
+                candidates.select_for_update().order_by('pk')[:batch_size])
+            ''' Lock the batch so an issue reopened meanwhile is not lost.
+            '''
+            if not issues:
+                return total
+            comments = list(Comment.objects.filter(issue__in=issues))
+            ArchivedIssue.objects.bulk_create(
+                [_copy(issue, ArchivedIssue) for issue in issues])
+            ArchivedComment.objects.bulk_create(
+                [_copy(comment, ArchivedComment) for comment in comments])
+            with without_tombstones():
+                Comment.objects.filter(
+                    pk__in=[c.pk for c in comments]).delete()
+                Issue.objects.filter(pk__in=[i.pk for i in issues]).delete()
+            ''' Archived issues are not deleted as far as the change feed
+            is concerned.
+            '''
+            Project.issues_changed(*[i.project_id for i in issues])
+        total += len(issues)
+        if progress:
+            progress('{} issues archived'.format(total))
+
+
+def restore_issue(archived, status):
+    ''' Move an archived issue and its comments back to the Issue table
+    with the given status. Returns the restored Issue.
+    '''
+    with transaction.atomic(using=router.db_for_write(Issue)):
+        issue = _copy(archived, Issue)
+        issue.status = status
+        issue.modified = timezone.now()
+        issue.save_base(raw=True)
+        ''' A raw save keeps the original created date.
+        '''
+        issue.index_similarity(issue.title, issue.description)
+        AssigneeLoad.move(None, workload(issue.workload_row()))
+        Project.issues_changed(issue.project_id)
+        for archived_comment in archived.archivedcomment_set.all():
+            _copy(archived_comment, Comment).save_base(raw=True)
+        archived.delete()
+    return issue
@@ -0,0 +1,256 @@
+''' Storing and serving attachment files.
+
+Uploads are written to disk chunk by chunk while they arrive and hashed
+on the way. Files are stored once per content under ATTACHMENT_DIR, named
+by their SHA-256, so the same log attached to many issues takes the space
+of one. Downloads support conditional and Range requests and are sent by
+the web server (ATTACHMENT_SENDFILE_HEADER) or the WSGI server's file
+wrapper, so file contents do not pass through Python.
+'''
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import re
+import tempfile
+from calendar import timegm
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, parse_http_date_safe
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from issuetrack.models import Attachment, Blob
+from issuetrack.settings import ATTACHMENT_ACCEL_PREFIX, ATTACHMENT_DIR
+from issuetrack.settings import ATTACHMENT_MAX_SIZE, ATTACHMENT_SENDFILE_HEADER
+
+CHUNK_SIZE = 64 * 1024
+''' Bytes read at a time when a range of a file is sent from Python.
+'''
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+''' A single byte range. Requests for several ranges get the whole file.
+'''
+
+
+def attachment_root():
+    ''' Directory holding the attachment files.
+    '''
+    return os.path.join(settings.MEDIA_ROOT, ATTACHMENT_DIR)
+
+
+def blob_path(sha256):
+    ''' Path of the file with the given content hash.
+    '''
+    return os.path.join(attachment_root(), sha256[:2], sha256[2:4], sha256)
+
+
+class HashedUpload(UploadedFile):
+    ''' An uploaded file already written to a temporary file next to the
+    attachment files, with its SHA-256.
+    '''
+
+    def __init__(self, path, name, content_type, size, sha256):
+        super(HashedUpload, self).__init__(
+            open(path, 'rb'), name, content_type, size)
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        ''' Close and remove the temporary file, unless it was stored.
+        Django closes the uploaded files at the end of the request.
+        '''
+        super(HashedUpload, self).close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class HashingUploadHandler(FileUploadHandler):
+    ''' Upload handler writing each chunk to disk as it arrives and hashing
+    it on the way. Files over ATTACHMENT_MAX_SIZE are skipped.
+    '''
+
+    def new_file(self, *args, **kwargs):
+        super(HashingUploadHandler, self).new_file(*args, **kwargs)
+        directory = os.path.join(attachment_root(), 'tmp')
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        descriptor, self.path = tempfile.mkstemp(dir=directory)
+        self.file = os.fdopen(descriptor, 'wb')
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > ATTACHMENT_MAX_SIZE:
+            self.file.close()
+            os.remove(self.path)
+            raise SkipFile()
+        self.file.write(raw_data)
+        self.hash.update(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.close()
+        return HashedUpload(
+            self.path, self.file_name, self.content_type, self.size,
+            self.hash.hexdigest())
+
+
+def streamed_uploads(view):
+    ''' Decorator having the view's uploads handled by HashingUploadHandler.
+    The handler must be set before the CSRF check reads the request body,
+    so the check is done after it.
+    '''
+    @csrf_exempt
+    @wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        request.upload_handlers = [HashingUploadHandler(request)]
+        return csrf_protect(view)(request, *args, **kwargs)
+    return wrapped_view
+
+
+def attach(upload, issue_id, uploader, comment_id=None):
+    ''' Store an upload and attach it to an issue or to one of its comments.
+    Content that is already stored is not stored again. Returns the new
+    Attachment.
+    '''
+    try:
+        with transaction.atomic():
+            blob, created = Blob.objects.get_or_create(
+                sha256=upload.sha256, defaults={'size': upload.size})
+            path = blob_path(blob.sha256)
+            if not os.path.exists(path):
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                os.rename(upload.path, path)
+            return Attachment.objects.create(
+                issue_id=issue_id,
+                comment_id=comment_id,
+                blob=blob,
+                name=os.path.basename(upload.name)[:255],
+                content_type=upload.content_type or 'application/octet-stream',
+                uploader=uploader,
+            )
+    finally:
+        upload.close()
+
+
+def delete_unused_blobs():
+    ''' Remove the stored files no attachment refers to any more. Returns
+    the number of files removed.
+    '''
+    total = 0
+    for sha256 in Blob.objects.filter(attachment__isnull=True).values_list(
+            'sha256', flat=True):
+        with transaction.atomic():
+            if not Blob.objects.filter(
+                    sha256=sha256, attachment__isnull=True).exists():
+                continue
+            Blob.objects.filter(sha256=sha256).delete()
+        if os.path.exists(blob_path(sha256)):
+            os.remove(blob_path(sha256))
+        total += 1
+    return total
+
+
+def _read_range(path, start, length):
+    ''' Yield length bytes of the file from start on, a chunk at a time.
+    '''
+    with open(path, 'rb') as stream:
+        stream.seek(start)
+        while length > 0:
+            data = stream.read(min(CHUNK_SIZE, length))
+            if not data:
+                return
+            length -= len(data)
+            yield data
+
+
+def _requested_range(request, size, etag, last_modified):
+    ''' The (start, end) byte range asked for, None for the whole file or
+    False if the range cannot be satisfied.
+    '''
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != quote_etag(etag) and \
+            parse_http_date_safe(if_range) != last_modified:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _file_response(request, attachment, last_modified):
+    ''' Response with the whole file or the requested range of it.
+    '''
+    blob = attachment.blob
+    path = blob_path(blob.sha256)
+    header = ATTACHMENT_SENDFILE_HEADER
+    if header:
+        response = HttpResponse(content_type=attachment.content_type)
+        if header == 'X-Accel-Redirect':
+            response[header] = ATTACHMENT_ACCEL_PREFIX + os.path.relpath(
+                path, attachment_root())
+        else:
+            response[header] = path
+        ''' The web server sends the file and answers Range requests.
+        '''
+        return response
+    requested = _requested_range(
+        request, blob.size, blob.sha256, last_modified)
+    if requested is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(blob.size)
+    elif requested:
+        start, end = requested
+        response = StreamingHttpResponse(
+            _read_range(path, start, end - start + 1),
+            status=206, content_type=attachment.content_type)
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(
+            start, end, blob.size)
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(
+            open(path, 'rb'), content_type=attachment.content_type)
+        response['Content-Length'] = blob.size
+        ''' Handed to the WSGI server's file wrapper, which can use
+        sendfile().
+        '''
+    return response
+
+
+def serve_attachment(request, attachment):
+    ''' Response sending the attachment's file, or 304 if the client's copy
+    is current. Files never change, so their hash is a strong ETag.
+    '''
+    blob = attachment.blob
+    last_modified = timegm(blob.created.utctimetuple())
+    response = get_conditional_response(
+        request, etag=blob.sha256, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, attachment, last_modified)
+    response['ETag'] = quote_etag(blob.sha256)
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=86400'
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        attachment.name.replace('\\', '_').replace('"', '_'))
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
@@ -0,0 +1,138 @@
+''' The change feed keeping copies of the issues up to date.
+
+A reporting warehouse or a mirror asks for the changes after a cursor and
+gets the projects, components, issues and comments modified since then,
+and the tombstones of those deleted, in the order of their modification
+time. Each kind is read from its (modified, id) index and the kinds are
+merged, so a call takes time in proportion to the changes it returns, not
+to the size of the tables. The returned cursor names the last change
+given; passing it back continues after it.
+
+A tombstone of a project or component stands for its components, issues
+and comments. Archiving an issue is not a deletion, and restoring one
+reports it again. Changes younger than CHANGES_SETTLE_SECONDS are held
+back, see the setting.
+'''
+
+from __future__ import absolute_import
+
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+from issuetrack.models import Comment, Component, Issue, Project, Tombstone
+from issuetrack.routers import SHARDED_MODELS, issue_databases
+from issuetrack.settings import CHANGES_PAGE_SIZE, CHANGES_SETTLE_SECONDS
+
+STREAMS = (
+    ('project', Project.all_objects, 'modified'),
+    ('component', Component.all_objects, 'modified'),
+    ('issue', Issue.objects, 'modified'),
+    ('comment', Comment.objects, 'modified'),
+    ('tombstone', Tombstone.objects, 'deleted'),
+)
+''' The kinds of changes with their rows and the field ordering them. Their
+position breaks ties between changes made at the same time.
+'''
+
+
+def _epoch():
+    ''' The time cursors count from.
+    '''
+    epoch = datetime(1970, 1, 1)
+    if settings.USE_TZ:
+        return timezone.make_aware(epoch, timezone.utc)
+    return epoch
+
+
+def encode_cursor(when, stream, pk):
+    ''' The cursor of a change, e.g. 1792396800123456.2.42 for issue 42
+    changed at that many microseconds since 1970.
+    '''
+    delta = when - _epoch()
+    microseconds = (
+        delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return '{}.{}.{}'.format(microseconds, stream, pk)
+
+
+def decode_cursor(cursor):
+    ''' The (time, stream, id) of a cursor. Raises ValueError for a cursor
+    not made by encode_cursor.
+    '''
+    parts = cursor.split('.')
+    if len(parts) != 3:
+        raise ValueError('Invalid cursor {!r}'.format(cursor))
+    microseconds, stream, pk = [int(part) for part in parts]
+    if not 0 <= stream < len(STREAMS):
+        raise ValueError('Invalid cursor {!r}'.format(cursor))
+    return _epoch() + timedelta(microseconds=microseconds), stream, pk
+
+
+def _after(index, rows, field, since):
+    ''' The rows of a stream coming after the cursor's change.
+    '''
+    when, stream, pk = since
+    if index < stream:
+        return rows.filter(**{field + '__gt': when})
+    rows = rows.filter(**{field + '__gte': when})
+    if index > stream:
+        return rows
+    return rows.exclude(**{field: when, 'pk__lte': pk})
+
+
+def _change(index, row):
+    ''' A row of a stream as a change.
+    '''
+    kind, objects, field = STREAMS[index]
+    if kind == 'tombstone':
+        return {
+            'kind': row['kind'],
+            'id': row['object_id'],
+            'modified': row['deleted'],
+            'deleted': True,
+        }
+    return {
+        'kind': kind,
+        'id': row['id'],
+        'modified': row['modified'],
+        'deleted': False,
+        'data': row,
+    }
+
+
+def changes_since(cursor='', limit=CHANGES_PAGE_SIZE, settle=None):
+    ''' The changes after a cursor, or from the start without one. Returns
+    (changes, cursor, more): the list of at most limit changes, each a dict
+    with the kind, id, modified time, whether the row was deleted and the
+    data of the row, the cursor to pass next time and whether more changes
+    are waiting. Changes younger than settle seconds, by default
+    CHANGES_SETTLE_SECONDS, are left for later.
+    '''
+    if settle is None:
+        settle = CHANGES_SETTLE_SECONDS
+    since = decode_cursor(cursor) if cursor else None
+    horizon = timezone.now() - timedelta(seconds=settle)
+    streams = []
+    for index, (kind, objects, field) in enumerate(STREAMS):
+        rows = objects.filter(**{field + '__lte': horizon})
+        if since:
+            rows = _after(index, rows, field, since)
+        rows = rows.order_by(field, 'pk').values()
+        model = objects.model._meta.model_name
+        for database in issue_databases() if model in SHARDED_MODELS \
+                else [None]:
+            streams.append([
+                (row[field], index, row['id'], row)
+                for row in rows.using(database)[:limit + 1]
+            ])
+    merged = list(islice(heapq.merge(*streams), limit + 1))
+    if merged:
+        when, index, pk, row = merged[:limit][-1]
+        cursor = encode_cursor(when, index, pk)
+    return (
+        [_change(index, row) for when, index, pk, row in merged[:limit]],
+        cursor,
+        len(merged) > limit,
+    )
@@ -0,0 +1,99 @@
+''' Compressing the HTML pages and JSON responses.
+
+CompressionMiddleware compresses the responses whose type is one of
+COMPRESS_CONTENT_TYPES with the best encoding the client accepts: brotli
+if the brotli package is installed, otherwise gzip. Streamed responses,
+such as the live updates of issue pages, and attachment downloads are
+sent as they are. Add 'issuetrack.compression.CompressionMiddleware' at
+the top of MIDDLEWARE_CLASSES, above any middleware changing the content,
+in place of Django's GZipMiddleware.
+'''
+
+from __future__ import absolute_import
+
+import re
+
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from issuetrack.settings import COMPRESS_BROTLI_QUALITY
+from issuetrack.settings import COMPRESS_CONTENT_TYPES, COMPRESS_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ACCEPTED = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+''' An entry of the Accept-Encoding header, with its optional weight.
+'''
+
+
+def _compress_brotli(content):
+    return brotli.compress(content, quality=COMPRESS_BROTLI_QUALITY)
+
+
+ENCODINGS = [('gzip', compress_string)]
+''' The supported encodings with their compressors, most preferred first.
+'''
+if brotli is not None:
+    ENCODINGS.insert(0, ('br', _compress_brotli))
+
+
+def accepted_encodings(header):
+    ''' The encodings a client accepts by its Accept-Encoding header, as a
+    dict of their weights.
+    '''
+    weights = {}
+    for entry in header.split(','):
+        match = ACCEPTED.match(entry)
+        if match:
+            try:
+                weight = float(match.group(2) or 1)
+            except ValueError:
+                continue
+            weights[match.group(1).lower()] = weight
+    return weights
+
+
+def negotiate(header):
+    ''' The (encoding, compressor) to use for a client, or None to send the
+    content as it is.
+    '''
+    weights = accepted_encodings(header)
+    best = None
+    for encoding, compressor in ENCODINGS:
+        weight = weights.get(encoding, weights.get('*', 0))
+        if weight > 0 and (best is None or weight > best[0]):
+            best = (weight, encoding, compressor)
+    return best[1:] if best else None
+
+
+class CompressionMiddleware(object):
+    ''' Compress HTML and JSON responses with brotli or gzip.
+    '''
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if content_type.strip().lower() not in COMPRESS_CONTENT_TYPES:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < COMPRESS_MIN_SIZE:
+            return response
+        chosen = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if chosen is None:
+            return response
+        encoding, compressor = chosen
+        compressed = compressor(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag') and \
+                not response['ETag'].startswith('W/'):
+            response['ETag'] = 'W/' + response['ETag']
+            ''' The compressed bytes differ from those the ETag names.
+            '''
+        return response
@@ -0,0 +1,108 @@
+''' The issue statistics shown on a project's page.
+
+A dashboard takes five queries: one grouping the project's open issues
+by status, priority, component and assignee, from which all the counts
+are summed up, one each for the names of the components and assignees,
+one for the recently updated issues and one for the open issues
+untouched the longest. The result is cached in DASHBOARD_CACHE until one
+of the project's issues changes, see Project.issues_changed, or for
+DASHBOARD_TIMEOUT seconds. The lists of issues are only shown to staff
+and superusers, since other users only see the issues they created; the
+counts are shown to everyone.
+'''
+
+from __future__ import absolute_import
+
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models import Count
+from issuetrack.models import Component, Issue, Project
+from issuetrack.routers import use_database
+from issuetrack.settings import DASHBOARD_CACHE, DASHBOARD_CLOSED_STATUSES
+from issuetrack.settings import DASHBOARD_ISSUES, DASHBOARD_TIMEOUT
+from issuetrack.settings import ISSUE_PRIORITIES, ISSUE_STATUSES
+
+ISSUE_FIELDS = ('id', 'project__key', 'number', 'title', 'status', 'modified')
+''' Columns of the issues listed on a dashboard.
+'''
+
+ISSUE_LISTS = ('recent', 'untouched')
+''' Entries of a dashboard listing issues, left out for users who are not
+staff or superusers.
+'''
+
+
+def _issue_list(issues):
+    ''' The listed issues as dicts with their key and status label.
+    '''
+    statuses = dict(ISSUE_STATUSES)
+    return [
+        {
+            'id': row['id'],
+            'key': '{}-{}'.format(row['project__key'], row['number']),
+            'title': row['title'],
+            'status': statuses[row['status']],
+            'modified': row['modified'],
+        }
+        for row in issues.values(*ISSUE_FIELDS)[:DASHBOARD_ISSUES]
+    ]
+
+
+def _counts(totals, labels):
+    ''' (label, count) pairs of the non-zero totals, in the order of labels.
+    '''
+    return [(label, totals[key]) for key, label in labels if totals[key]]
+
+
+def build_dashboard(project_id):
+    ''' Compute the dashboard of a project.
+    '''
+    issues = Issue.objects.live().filter(project_id=project_id)
+    open_issues = issues.exclude(status__in=DASHBOARD_CLOSED_STATUSES)
+    by_status = Counter()
+    by_priority = Counter()
+    by_component = Counter()
+    by_assignee = Counter()
+    groups = open_issues.order_by().values(
+        'status', 'priority', 'component', 'assignee',
+    ).annotate(count=Count('pk'))
+    for group in groups:
+        by_status[group['status']] += group['count']
+        by_priority[group['priority']] += group['count']
+        by_component[group['component']] += group['count']
+        by_assignee[group['assignee']] += group['count']
+    components = Component.objects.filter(
+        project_id=project_id).order_by('name').values_list('pk', 'name')
+    assignees = User.objects.filter(
+        pk__in=[pk for pk in by_assignee if pk is not None],
+    ).order_by('username').values_list('pk', 'username')
+    return {
+        'open': sum(by_status.values()),
+        'by_status': _counts(by_status, ISSUE_STATUSES),
+        'by_priority': _counts(by_priority, ISSUE_PRIORITIES),
+        'by_component': _counts(by_component, components),
+        'by_assignee': _counts(
+            by_assignee, list(assignees) + [(None, 'Unassigned')]),
+        'recent': _issue_list(issues.order_by('-modified')),
+        'untouched': _issue_list(open_issues.order_by('modified')),
+    }
+
+
+def project_dashboard(project_id, user):
+    ''' The dashboard of a project for the user, from the cache if it is
+    there.
+    '''
+    cache = caches[DASHBOARD_CACHE]
+    key = Project.dashboard_cache_key(project_id)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        with use_database(Project.database_for(project_id)):
+            dashboard = build_dashboard(project_id)
+        cache.set(key, dashboard, DASHBOARD_TIMEOUT)
+    if not user.is_staff and not user.is_superuser:
+        dashboard = dict(
+            (name, value) for name, value in dashboard.items()
+            if name not in ISSUE_LISTS)
+    return dashboard
@@ -0,0 +1,180 @@
+''' Digests of the events of watched issues.
+
+Users watch issues, or every issue of a project, with Watch rows. The views
+record each event of an issue once, as a WatchEvent, however many users
+watch it, so the write path stays a single INSERT. The send_digests
+command, run periodically, collects the events since each user's last
+digest for all users at once, with one query joining the events with the
+watches of their issues and projects, and sends each user one message
+listing all of theirs. Users only hear about the issues they can see,
+see Watch.can_watch, events of private comments only reach staff and
+superusers, and nobody hears about their own events. Events older than
+DIGEST_RETENTION_DAYS are then removed.
+'''
+
+from __future__ import absolute_import
+
+from collections import OrderedDict
+from datetime import timedelta
+from itertools import groupby
+
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.core.urlresolvers import reverse
+from django.db import connections, router, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import Truncator
+from issuetrack.models import Digest, Watch, WatchEvent
+from issuetrack.settings import DIGEST_BATCH_SIZE, DIGEST_RETENTION_DAYS
+from issuetrack.settings import DIGEST_SETTLE_SECONDS, DIGEST_SITE_URL
+from issuetrack.settings import DIGEST_SUBJECT, DIGEST_TEXT_LENGTH
+from issuetrack.settings import TEMPLATE_DIR
+
+RECIPIENTS = (
+    'SELECT w.user_id AS user_id, e.id AS event_id '
+    'FROM {event} e '
+    'JOIN {watch} w ON w.{column} = e.{column} '
+    'JOIN {user} u ON u.id = w.user_id '
+    'LEFT JOIN {digest} d ON d.user_id = w.user_id '
+    'WHERE e.created > %s AND e.created <= %s '
+    'AND e.created > w.created '
+    'AND (d.until IS NULL OR e.created > d.until) '
+    'AND (e.actor_id IS NULL OR e.actor_id <> w.user_id) '
+    'AND u.is_active = %s '
+    'AND (u.is_staff = %s OR u.is_superuser = %s '
+    'OR (e.creater_id = w.user_id AND e.audience = %s))'
+)
+''' The (user, event) pairs to send, through the watches of the events'
+issues or projects, for each of the two columns.
+'''
+
+
+def record(issue, event, text, actor=None, audience='Public'):
+    ''' Record an event of an issue for its watchers and the watchers of its
+    project.
+    '''
+    WatchEvent.objects.create(
+        issue_id=issue.id,
+        project_id=issue.project_id,
+        actor=actor,
+        creater_id=issue.creater_id,
+        event=event,
+        audience=audience,
+        heading='{} {}'.format(issue.key, issue.title)[:300],
+        text=Truncator(' '.join(text.split())).chars(DIGEST_TEXT_LENGTH),
+    )
+
+
+def watch(user, issue):
+    ''' Have the user watch the issue, e.g. the one they created.
+    '''
+    Watch.objects.get_or_create(user=user, issue_id=issue.id)
+
+
+def recipients(until):
+    ''' (user id, event id) of the events each user is sent, up to until,
+    ordered by user and event.
+    '''
+    alias = router.db_for_read(WatchEvent)
+    connection = connections[alias]
+    created = WatchEvent._meta.get_field('created')
+    since = until - timedelta(days=DIGEST_RETENTION_DAYS)
+    params = [
+        created.get_db_prep_value(since, connection),
+        created.get_db_prep_value(until, connection),
+        True, True, True, 'Public',
+    ]
+    tables = dict(
+        (name, connection.ops.quote_name(model._meta.db_table))
+        for name, model in (
+            ('event', WatchEvent), ('watch', Watch), ('user', User),
+            ('digest', Digest),
+        )
+    )
+    pairs = ' UNION '.join(
+        RECIPIENTS.format(column=column, **tables)
+        for column in ('issue_id', 'project_id'))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT user_id, event_id FROM ({}) pairs '
+            'ORDER BY user_id, event_id'.format(pairs),
+            params * 2,
+        )
+        return cursor.fetchall()
+
+
+def _message(user, events):
+    ''' The digest of the events for the user, grouped by issue.
+    '''
+    issues = OrderedDict()
+    for event in sorted(events, key=lambda event: (event.created, event.pk)):
+        issues.setdefault(event.issue_id, []).append(event)
+    body = render_to_string(
+        '{}/mail/digest.txt'.format(TEMPLATE_DIR),
+        {
+            'user': user,
+            'issue_list': [
+                (
+                    events[-1].heading,
+                    DIGEST_SITE_URL + reverse(
+                        'issue', kwargs={'issue_id': issue_id}),
+                    events,
+                )
+                for issue_id, events in issues.items()
+            ],
+        },
+    )
+    return EmailMessage(
+        DIGEST_SUBJECT.format(events=len(events), issues=len(issues)),
+        body,
+        to=[user.email],
+    )
+
+
+def _mark_sent(user_ids, until):
+    ''' Start the next digests of the users after until.
+    '''
+    with transaction.atomic(using=router.db_for_write(Digest)):
+        sent = Digest.objects.filter(user_id__in=user_ids)
+        present = set(sent.values_list('user_id', flat=True))
+        sent.update(until=until)
+        Digest.objects.bulk_create(
+            Digest(user_id=user_id, until=until)
+            for user_id in user_ids if user_id not in present)
+
+
+def send_digests(now=None):
+    ''' Send every user the events since their last digest that are older
+    than DIGEST_SETTLE_SECONDS, one message per user, then remove the
+    events older than DIGEST_RETENTION_DAYS. Returns the number of digests
+    sent.
+    '''
+    now = now or timezone.now()
+    until = now - timedelta(seconds=DIGEST_SETTLE_SECONDS)
+    per_user = [
+        (user_id, [event_id for user, event_id in pairs])
+        for user_id, pairs in groupby(
+            recipients(until), key=lambda pair: pair[0])
+    ]
+    sent = 0
+    for start in range(0, len(per_user), DIGEST_BATCH_SIZE):
+        batch = per_user[start:start + DIGEST_BATCH_SIZE]
+        users = User.objects.in_bulk([user_id for user_id, ids in batch])
+        events = WatchEvent.objects.in_bulk(set(
+            event_id for user_id, ids in batch for event_id in ids))
+        messages = [
+            _message(users[user_id], [events[pk] for pk in ids])
+            for user_id, ids in batch if users[user_id].email
+        ]
+        get_connection().send_messages(messages)
+        _mark_sent([user_id for user_id, ids in batch], until)
+        sent += len(messages)
+    expired = WatchEvent.objects.filter(
+        created__lt=now - timedelta(days=DIGEST_RETENTION_DAYS))
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:DIGEST_BATCH_SIZE])
+        if not ids:
+            break
+        WatchEvent.objects.filter(pk__in=ids).delete()
+    return sent
@@ -0,0 +1,91 @@
+''' Activity hooks called by the views after an issue or comment is written.
+'''
+
+from __future__ import absolute_import
+
+from django.core.urlresolvers import reverse
+from django.utils.html import strip_tags
+from issuetrack import digests
+from issuetrack.pubsub import get_broker, issue_channel
+from issuetrack.webhooks import enqueue
+
+
+def _issue_data(issue):
+    ''' The fields of an issue sent to webhooks.
+    '''
+    return {
+        'id': issue.id,
+        'key': issue.key,
+        'title': issue.title,
+        'status': issue.get_status_display(),
+        'url': reverse('issue', kwargs={'issue_id': issue.id}),
+    }
+
+
+def issue_created(issue):
+    ''' Queue a new issue for the project's webhooks and record it for the
+    project's watchers. Its creater watches it from now on.
+    '''
+    digests.watch(issue.creater, issue)
+    digests.record(
+        issue, 'issue.created',
+        '{} created this {} issue.'.format(
+            issue.creater, issue.get_kind_display().lower()),
+        actor=issue.creater,
+    )
+    enqueue(issue.project_id, 'issue.created', dict(
+        _issue_data(issue),
+        creater=str(issue.creater),
+        kind=issue.get_kind_display(),
+        priority=issue.get_priority_display(),
+        urgency=issue.get_urgency_display(),
+    ))
+
+
+def comment_saved(comment, created=False):
+    ''' Announce a new or changed comment to the issue's live listeners
+    and queue it for the project's webhooks. A new comment is recorded for
+    the watchers its audience allows.
+    '''
+    if created:
+        digests.record(
+            comment.issue, 'comment.created',
+            '{} commented: {}'.format(
+                comment.author, strip_tags(comment.text_html)),
+            actor=comment.author,
+            audience=comment.audience,
+        )
+    data = {
+        'id': comment.id,
+        'author': str(comment.author),
+        'audience': comment.audience,
+        'created': str(comment.created),
+        'issue_status': comment.get_issue_status_display(),
+        'text': comment.text_html,
+    }
+    get_broker().publish(issue_channel(comment.issue_id), 'comment', data)
+    enqueue(
+        comment.issue.project_id,
+        'comment.created' if created else 'comment.changed',
+        dict(data, issue=_issue_data(comment.issue)),
+    )
+
+
+def status_changed(issue, actor=None):
+    ''' Announce the new status of an issue to its live listeners, queue it
+    for the project's webhooks and record it for the watchers.
+    '''
+    digests.record(
+        issue, 'issue.status_changed',
+        'Status set to {}.'.format(issue.get_status_display()),
+        actor=actor,
+    )
+    get_broker().publish(
+        issue_channel(issue.id),
+        'status',
+        {
+            'id': issue.id,
+            'status': issue.get_status_display(),
+        },
+    )
+    enqueue(issue.project_id, 'issue.status_changed', _issue_data(issue))
@@ -0,0 +1,201 @@
+''' Faceted filtering of the issue list.
+
+The index page can be narrowed by any combination of project, component,
+assignee, status, priority, kind and urgency. Several values of one facet
+match any of them; different facets must all match. All the facet counts
+come from one grouped query over the issues the user may see, so the page
+does not run a COUNT per option. With sharded issues the query runs on
+each database and the counts are added up.
+'''
+
+from __future__ import absolute_import
+
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+from django.utils.http import urlencode
+from issuetrack.routers import issue_databases
+from issuetrack.settings import ISSUE_STATUSES, ISSUE_KINDS
+from issuetrack.settings import ISSUE_PRIORITIES, ISSUE_URGENCIES
+from issuetrack.settings import ISSUE_STATUS_CODES
+
+NONE = 'none'
+''' Query string value selecting issues without a project, component or
+assignee.
+'''
+
+FACETS = (
+    ('project', 'Project', 'project', 'project__key'),
+    ('component', 'Component', 'component', 'component__name'),
+    ('assignee', 'Assignee', 'assignee', 'assignee__username'),
+    ('status', 'Status', 'status', ISSUE_STATUSES),
+    ('priority', 'Priority', 'priority', ISSUE_PRIORITIES),
+    ('kind', 'Kind', 'kind', ISSUE_KINDS),
+    ('urgency', 'Urgency', 'urgency', ISSUE_URGENCIES),
+)
+''' Facets as (query string name, heading, issue field, labels). Labels are
+either the choices of the field or the field holding the name of the
+related object.
+'''
+
+SORT_FIELDS = (
+    'title', 'kind', 'priority', 'status', 'assignee', 'created', 'modified',
+)
+''' Fields the issue list can be sorted by, ascending or with a leading '-'
+descending.
+'''
+
+STATUS_SHORTCUTS = {
+    'all': [],
+    'open': [
+        code for code, label in ISSUE_STATUSES
+        if code != ISSUE_STATUS_CODES['Closed']
+    ],
+    'closed': [ISSUE_STATUS_CODES['Closed']],
+}
+''' The older ?status=all|open|closed links expand to status codes.
+'''
+
+
+class FacetFilter(object):
+    ''' Selected facet values of one request to the index page.
+    '''
+
+    def __init__(self, queryset, params):
+        ''' queryset holds the issues the user may see and params is the
+        request's query string.
+        '''
+        self.queryset = queryset
+        self.selected = {}
+        ''' Selected values per facet name. None stands for NONE.
+        '''
+        for name, heading, field, labels in FACETS:
+            values = []
+            for value in params.getlist(name):
+                if name == 'status' and value in STATUS_SHORTCUTS:
+                    values.extend(STATUS_SHORTCUTS[value])
+                elif value == NONE:
+                    values.append(None)
+                elif value.isdigit():
+                    values.append(int(value))
+            if values:
+                self.selected[name] = sorted(set(values), key=str)
+
+    def _condition(self, name):
+        ''' Q object matching the selected values of one facet.
+        '''
+        field = dict((f[0], f[2]) for f in FACETS)[name]
+        values = self.selected[name]
+        condition = Q(**{
+            field + '__in': [value for value in values if value is not None]
+        })
+        if None in values:
+            condition |= Q(**{field + '__isnull': True})
+        return condition
+
+    def filter(self):
+        ''' Issues matching every selected facet.
+        '''
+        return self.queryset.filter(
+            *[self._condition(name) for name in self.selected])
+
+    def _matches(self, row, skip=None):
+        ''' Whether a grouped row matches every selected facet but skip.
+        '''
+        for name, heading, field, labels in FACETS:
+            if name != skip and name in self.selected and \
+                    row[field] not in self.selected[name]:
+                return False
+        return True
+
+    def _query(self, name, value):
+        ''' Query string with value of the named facet toggled.
+        '''
+        params = []
+        for facet in FACETS:
+            values = list(self.selected.get(facet[0], []))
+            if facet[0] == name:
+                if value in values:
+                    values.remove(value)
+                else:
+                    values.append(value)
+            params.extend(
+                (facet[0], NONE if v is None else v) for v in values)
+        return urlencode(params)
+
+    def query(self):
+        ''' Query string of the current selection, for sort and page links.
+        '''
+        return self._query(None, None)
+
+    def facets(self):
+        ''' Count the issues per facet value and return them with the total
+        number of matching issues:
+
+            ([{'name': ..., 'heading': ..., 'values': [...]}, ...], total)
+
+        Each value is a dict of value, label, count, selected and the query
+        string that toggles it. A facet's counts honour the selection of the
+        other facets only, so that alternatives stay visible.
+        '''
+        columns = [field for name, heading, field, labels in FACETS]
+        columns.extend(
+            labels for name, heading, field, labels in FACETS
+            if isinstance(labels, str))
+        rows = []
+        for database in issue_databases():
+            rows.extend(
+                self.queryset.using(database).order_by().values(
+                    *columns).annotate(count=Count('id')))
+        ''' One grouped query for all the counts.
+        '''
+        total = sum(row['count'] for row in rows if self._matches(row))
+        facets = []
+        for name, heading, field, labels in FACETS:
+            counts = {}
+            names = {}
+            for row in rows:
+                if self._matches(row, skip=name):
+                    value = row[field]
+                    counts[value] = counts.get(value, 0) + row['count']
+                    if isinstance(labels, str):
+                        names[value] = row[labels]
+            selected = self.selected.get(name, [])
+            if isinstance(labels, str):
+                order = sorted(counts, key=lambda v: (v is None, names[v]))
+            else:
+                names = dict(labels)
+                order = [
+                    code for code, label in labels
+                    if code in counts or code in selected
+                ]
+            facets.append({
+                'name': name,
+                'heading': heading,
+                'values': [
+                    {
+                        'value': NONE if value is None else value,
+                        'label': '(none)' if value is None else names[value],
+                        'count': counts.get(value, 0),
+                        'selected': value in selected,
+                        'query': self._query(name, value),
+                    }
+                    for value in order
+                ],
+            })
+        return facets, total
+
+
+class CountedPaginator(Paginator):
+    ''' Paginator given the number of objects up front, so that it does not
+    count them again.
+    '''
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super(CountedPaginator, self).__init__(object_list, per_page, **kwargs)
+        self._total = count
+
+    @property
+    def count(self):
+        ''' Total number of objects, across all pages.
+        '''
+        return self._total
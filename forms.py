@@ -1,7 +1,16 @@
+import re
+
 from django import forms
+from django.db import models
 from django.forms import ModelForm
 from issuetrack.models import Comment, Component, Issue, Project
-from issuetrack.settings import ISSUE_STATUSES
+from issuetrack.settings import ISSUE_STATUSES, ISSUE_KIND_CODES
+from issuetrack.settings import DATABASE_PRIMARY, DATABASE_SHARDS
+from issuetrack.settings import ISSUE_LINK_KINDS
+
+ISSUE_RE = re.compile(r'^\s*(?:([A-Za-z0-9]+)-)?([0-9]+)\s*$')
+''' An issue named by its key, e.g. TP1-42, or its id.
+'''
 
 
 class AddIssueForm(ModelForm):
@@ -36,7 +45,8 @@ class AddIssueForm(ModelForm):
         observed = cleaned_data.get('observed')
         expected = cleaned_data.get('expected')
 
-        if kind == 'Bug' or kind == 'Improvement':
+        if kind == ISSUE_KIND_CODES['Bug'] or \
+                kind == ISSUE_KIND_CODES['Improvement']:
 
             if not steps or not observed or not expected:
 
@@ -49,6 +59,34 @@ class AddIssueForm(ModelForm):
 
 class ChangeIssueForm(ModelForm):
 
+    version = forms.IntegerField(widget=forms.HiddenInput)
+    ''' Version of the issue the user edited. See Issue.apply_changes.
+    '''
+
+    def __init__(self, *args, **kwargs):
+
+        super(ChangeIssueForm, self).__init__(*args, **kwargs)
+
+        self.fields['version'].initial = self.instance.version
+
+        if DATABASE_SHARDS and self.instance.project_id:
+            database = Project.database_for(self.instance.project_id)
+            self.fields['component'].queryset = Component.objects.filter(
+                project__database__in=[database] + (
+                    [''] if database == DATABASE_PRIMARY else []),
+            )
+            ''' Issues only move between projects on the same database.
+            Whole projects are moved with the move_project command.
+            '''
+
+    def changes(self):
+        ''' The edited fields whose values differ from the issue's.
+        '''
+        return dict(
+            (name, self.cleaned_data[name])
+            for name in self.changed_data if name in self.Meta.fields
+        )
+
     class Meta:
 
         model = Issue
@@ -59,6 +97,21 @@ class ChangeIssueForm(ModelForm):
         ]
 
 
+def check_project_pending_purge(cleaned_data):
+    ''' Deleted projects keep their name and key until purge_deleted has
+    removed them, so they cannot be reused before then.
+    '''
+    pending = Project.all_objects.filter(deleted=True).filter(
+        models.Q(name=cleaned_data.get('name')) |
+        models.Q(key=cleaned_data.get('key'))
+    )
+    if pending.exists():
+        raise forms.ValidationError(
+            "A deleted project with this name or key is still being" +
+            " removed. Please try again later."
+        )
+
+
 class AddProjectForm(ModelForm):
 
     def __init__(self, *args, **kwargs):
@@ -77,8 +130,17 @@ class AddProjectForm(ModelForm):
 
         fields = [
             'name', 'key', 'owner', 'description', 'members',
+            'auto_assign', 'public',
         ]
 
+    def clean(self):
+
+        cleaned_data = super(AddProjectForm, self).clean()
+
+        check_project_pending_purge(cleaned_data)
+
+        return cleaned_data
+
 
 class ChangeProjectForm(ModelForm):
 
@@ -98,8 +160,17 @@ class ChangeProjectForm(ModelForm):
 
         fields = [
             'name', 'key', 'owner', 'description', 'members',
+            'auto_assign', 'public',
         ]
 
+    def clean(self):
+
+        cleaned_data = super(ChangeProjectForm, self).clean()
+
+        check_project_pending_purge(cleaned_data)
+
+        return cleaned_data
+
 
 class AddComponentForm(ModelForm):
 
@@ -118,7 +189,7 @@ class AddComponentForm(ModelForm):
         model = Component
 
         fields = [
-            'name', 'description',
+            'name', 'description', 'auto_assign',
         ]
 
 
@@ -139,17 +210,20 @@ class ChangeComponentForm(ModelForm):
         model = Component
 
         fields = [
-            'name', 'description',
+            'name', 'description', 'auto_assign',
         ]
 
 
 class AddCommentForm(ModelForm):
 
-    status = forms.ChoiceField(
+    status = forms.TypedChoiceField(
         choices=ISSUE_STATUSES,
+        coerce=int,
         label='Set Status After Comment',
     )
 
+    attachment = forms.FileField(required=False, label='Attach File')
+
     def __init__(self, *args, **kwargs):
 
         try:
@@ -184,7 +258,65 @@ class ChangeCommentForm(AddCommentForm):
 
         super(ChangeCommentForm, self).__init__(*args, **kwargs)
 
+        del(self.fields['attachment'])
+        ''' Files are attached when a comment is added.
+        '''
+
         try:
             self.fields['status'].initial = self.issue_status
         except AttributeError:
             pass
+
+
+class AddAttachmentForm(forms.Form):
+
+    file = forms.FileField(
+        label='File',
+        error_messages={
+            'required':
+                'No file was received. It may be larger than allowed.',
+        },
+    )
+
+
+class SampleRateForm(forms.Form):
+
+    sample_rate = forms.FloatField(
+        label='Sample Rate',
+        min_value=0,
+        max_value=1,
+        help_text='Share of all requests profiled, from 0 to 1.',
+    )
+
+
+class AddLinkForm(forms.Form):
+
+    kind = forms.TypedChoiceField(
+        label='This Issue', choices=ISSUE_LINK_KINDS, coerce=int)
+
+    issue = forms.CharField(
+        label='Issue',
+        max_length=30,
+        help_text='Key or id of the other issue, e.g. TP1-42.',
+    )
+
+    def __init__(self, *args, **kwargs):
+
+        self.user = kwargs.pop('user')
+
+        super(AddLinkForm, self).__init__(*args, **kwargs)
+
+    def clean_issue(self):
+
+        match = ISSUE_RE.match(self.cleaned_data['issue'])
+        if match is None:
+            raise forms.ValidationError('Enter an issue key or id.')
+        key, number = match.groups()
+        if key is None:
+            lookup = {'pk': number}
+        else:
+            lookup = {'project__key': key, 'number': number}
+        try:
+            return Issue.objects.live().visible_to(self.user).get(**lookup)
+        except Issue.DoesNotExist:
+            raise forms.ValidationError('No issue has this key or id.')
@@ -0,0 +1,96 @@
+''' Template loader removing the indentation of the templates.
+
+The templates are indented for reading, which would otherwise be sent
+with every page, once for each row of a listing. Loader wraps other
+loaders and reduces each run of whitespace holding a line break to a
+single line break, except inside pre, textarea and script elements. This
+is done when a template is compiled, so with Django's cached loader around
+it the cost is paid once per template. Configure it in the project's
+TEMPLATES, with APP_DIRS off:
+
+    'OPTIONS': {
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                ('issuetrack.loaders.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ]),
+        ],
+    },
+'''
+
+from __future__ import absolute_import
+
+import re
+
+from django.template import Origin
+from django.template.loaders.base import Loader as BaseLoader
+
+PRESERVED = re.compile(
+    r'<(pre|textarea|script)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+''' Elements whose whitespace is kept as is.
+'''
+
+LINE_BREAKS = re.compile(r'^\s+|\s*\n\s*|\s+$')
+''' Whitespace holding a line break, or at the start or end of a template.
+'''
+
+TAG_LINES = re.compile(r'(?:^|(?<=\n))({%.*?%}|{#.*?#})\n')
+''' The line break after a tag or comment standing on a line of its own,
+which would leave a blank line where the tag renders nothing.
+'''
+
+
+def _collapse(source):
+    ''' collapse_whitespace on a part of a template outside the PRESERVED
+    elements.
+    '''
+    return TAG_LINES.sub(r'\1', LINE_BREAKS.sub('\n', source))
+
+
+def collapse_whitespace(source):
+    ''' The template source with each run of whitespace holding a line break
+    reduced to one line break, and tags standing on their own line joined
+    to the next, outside the PRESERVED elements.
+    '''
+    parts = []
+    end = 0
+    for match in PRESERVED.finditer(source):
+        parts.append(_collapse(source[end:match.start()]))
+        parts.append(match.group(0))
+        end = match.end()
+    parts.append(_collapse(source[end:]))
+    return ''.join(parts)
+
+
+class Loader(BaseLoader):
+    ''' Loads the templates of the wrapped loaders with collapse_whitespace
+    applied.
+    '''
+
+    def __init__(self, engine, loaders):
+        self.loaders = engine.get_template_loaders(loaders)
+        super(Loader, self).__init__(engine)
+
+    def get_template_sources(self, template_name, template_dirs=None):
+        ''' The origins of the wrapped loaders, loaded through this one.
+        '''
+        for loader in self.loaders:
+            for origin in loader.get_template_sources(
+                    template_name, template_dirs):
+                collapsed = Origin(
+                    name=origin.name,
+                    template_name=origin.template_name,
+                    loader=self,
+                )
+                collapsed.wrapped = origin
+                yield collapsed
+
+    def get_contents(self, origin):
+        return collapse_whitespace(
+            origin.wrapped.loader.get_contents(origin.wrapped))
+
+    def reset(self):
+        for loader in self.loaders:
+            loader.reset()
@@ -0,0 +1,324 @@
+''' Adding the emails of a mailbox as issues and comments.
+
+The ingest_mail command reads a Maildir or mbox. Emails are parsed on a
+pool of MAIL_WORKERS processes and added in batches of MAIL_BATCH_SIZE,
+each in one transaction. A reply becomes a comment on the issue of the
+email it answers, found by its In-Reply-To and References headers, or on
+the issue whose key is in its subject, e.g. "Re: [TP1-42] Crash". Other
+emails become new issues. The Message-ID of every email added is recorded,
+so the command can be stopped and run again over the same mailbox: emails
+already added are skipped.
+'''
+
+from __future__ import absolute_import
+
+import hashlib
+import mailbox
+import multiprocessing
+import os
+import re
+from calendar import timegm
+from email import policy
+from email.parser import BytesParser
+from email.utils import formataddr, getaddresses, parsedate_to_datetime
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.html import escape, linebreaks
+from issuetrack.models import ArchivedComment, Comment, Issue, MailMessage
+from issuetrack.models import Project, Sequence
+from issuetrack.routers import use_database
+from issuetrack.settings import MAIL_BATCH_SIZE, MAIL_COMMENT_AUDIENCE
+from issuetrack.settings import MAIL_DEFAULT_USER, MAIL_ISSUE_KIND
+from issuetrack.settings import MAIL_ISSUE_PRIORITY, MAIL_ISSUE_URGENCY
+from issuetrack.settings import MAIL_WORKERS
+
+ISSUE_KEY_RE = re.compile(r'\[([A-Za-z0-9]+)-([0-9]+)\]')
+''' An issue key in a subject, e.g. [TP1-42].
+'''
+
+MESSAGE_ID_RE = re.compile(r'<[^<>\s]+>')
+''' A Message-ID in the In-Reply-To and References headers.
+'''
+
+MESSAGE_ID_CHUNK_SIZE = 500
+''' Message-IDs looked up per query, below the limit of query parameters
+of SQLite.
+'''
+
+PARSE_CHUNK_SIZE = 64
+''' Emails handed to a parsing process at a time.
+'''
+
+_mailbox = None
+''' The mailbox read by a parsing process.
+'''
+
+
+def open_mailbox(path):
+    ''' The Maildir at path if it is a directory, the mbox file otherwise.
+    '''
+    if os.path.isdir(path):
+        return mailbox.Maildir(path, factory=None, create=False)
+    return mailbox.mbox(path, create=False)
+
+
+def _header(message, name):
+    ''' A header of the message as a string, '' if missing or unreadable.
+    '''
+    try:
+        return str(message.get(name) or '')
+    except (IndexError, ValueError):
+        return ''
+
+
+def _body(message):
+    ''' Text of the message as HTML, from its plain text part if it has one.
+    '''
+    part = message.get_body(preferencelist=('plain', 'html'))
+    if part is None:
+        return ''
+    try:
+        text = part.get_content()
+    except (LookupError, UnicodeError):
+        text = (part.get_payload(decode=True) or b'').decode(
+            'utf-8', 'replace')
+    if part.get_content_type() == 'text/plain':
+        return linebreaks(text.strip(), autoescape=True)
+    return text
+
+
+def parse_message(raw):
+    ''' The fields of an email given as bytes, as a dict. Emails without a
+    Message-ID are known by the hash of their content. Of the References,
+    only the three nearest parents are kept.
+    '''
+    message = BytesParser(policy=policy.default).parsebytes(raw)
+    message_id = _header(message, 'Message-ID').strip()[:255] or \
+        '<{}@issuetrack>'.format(hashlib.sha256(raw).hexdigest())
+    name, address = (getaddresses([_header(message, 'From')]) or
+                     [('', '')])[0]
+    try:
+        date = timegm(
+            parsedate_to_datetime(_header(message, 'Date')).utctimetuple())
+    except (TypeError, ValueError):
+        date = 0
+    subject = ' '.join(_header(message, 'Subject').split())
+    key = ISSUE_KEY_RE.search(subject)
+    return {
+        'message_id': message_id,
+        'parents': MESSAGE_ID_RE.findall(_header(message, 'In-Reply-To')) +
+        MESSAGE_ID_RE.findall(_header(message, 'References'))[:-4:-1],
+        'sender': formataddr((name, address)),
+        'address': address.lower(),
+        'date': date,
+        'subject': subject[:255] or '(no subject)',
+        'key': (key.group(1), int(key.group(2))) if key else None,
+        'body': _body(message),
+    }
+
+
+def _open_worker_mailbox(path):
+    ''' Open the mailbox in a parsing process.
+    '''
+    global _mailbox
+    _mailbox = open_mailbox(path)
+
+
+def _parse_key(key):
+    ''' Parse the email with the given key in the process' mailbox. Returns
+    None for an email that cannot be parsed, so that one broken email does
+    not stop the run.
+    '''
+    try:
+        return parse_message(_mailbox.get_bytes(key))
+    except Exception:
+        return None
+
+
+def _batches(items, batch_size):
+    ''' Lists of batch_size items at most.
+    '''
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _key_issues(keys):
+    ''' Map the (project key, number) pairs to the ids of live issues.
+    '''
+    if not keys:
+        return {}
+    issues = Issue.objects.live().filter(reduce(or_, (
+        Q(project__key=key, number=number) for key, number in keys)))
+    return dict(
+        ((key, number), pk) for pk, key, number in
+        issues.values_list('pk', 'project__key', 'number')
+    )
+
+
+def _ingest_batch(messages, component, users, default_user):
+    ''' Add a batch of parsed emails in one transaction. Returns the numbers
+    of issues and comments created and of emails skipped.
+    '''
+    messages = sorted(messages, key=lambda message: message['date'])
+    ''' Within a batch, emails are added in the order they were sent, so a
+    reply follows the email it answers.
+    '''
+    with transaction.atomic(), \
+            transaction.atomic(using=router.db_for_write(Issue)):
+        known = set(MailMessage.objects.filter(
+            message_id__in=[m['message_id'] for m in messages],
+        ).values_list('message_id', flat=True))
+        parents = list(set(p for m in messages for p in m['parents']))
+        threads = {}
+        for start in range(0, len(parents), MESSAGE_ID_CHUNK_SIZE):
+            threads.update(MailMessage.objects.filter(
+                message_id__in=parents[start:start + MESSAGE_ID_CHUNK_SIZE],
+            ).values_list('message_id', 'issue_id'))
+        statuses = dict(Issue.objects.live().filter(
+            pk__in=threads.values()).values_list('pk', 'status'))
+        threads = dict(
+            (message_id, pk) for message_id, pk in threads.items()
+            if pk in statuses
+        )
+        ''' Replies to archived or deleted issues open new issues.
+        '''
+        keyed = _key_issues(set(m['key'] for m in messages if m['key']))
+        statuses.update(Issue.objects.filter(
+            pk__in=keyed.values()).values_list('pk', 'status'))
+
+        targets = {}
+        ''' Message-ID of each email added to the issue it went to: the id
+        of an existing issue or the Message-ID of the email opening it.
+        '''
+        new = []
+        replies = []
+        for message in messages:
+            message_id = message['message_id']
+            if message_id in known or message_id in targets:
+                continue
+            target = None
+            for parent in message['parents']:
+                target = targets.get(parent) or threads.get(parent)
+                if target:
+                    break
+            target = target or keyed.get(message['key'])
+            if target:
+                replies.append((message, target))
+            else:
+                new.append(message)
+                target = message_id
+            targets[message_id] = target
+
+        def author(message):
+            ''' Id of the sender's account and the text of the message,
+            which names the sender if they have no account.
+            '''
+            if message['address'] in users:
+                return users[message['address']], message['body']
+            return default_user.pk, '<p>From: {}</p>{}'.format(
+                escape(message['sender']), message['body'])
+
+        issue_ids = {}
+        if new:
+            number = Project.next_issue_number(component.project_id, len(new))
+        for offset, message in enumerate(new):
+            creater_id, description = author(message)
+            issue = Issue(
+                title=message['subject'],
+                description=description,
+                creater_id=creater_id,
+                kind=MAIL_ISSUE_KIND,
+                priority=MAIL_ISSUE_PRIORITY,
+                urgency=MAIL_ISSUE_URGENCY,
+                component=component,
+                project_id=component.project_id,
+                number=number + offset,
+            )
+            ''' Numbered here, so the whole batch takes one block of the
+            project's numbers.
+            '''
+            issue.save()
+            issue_ids[message['message_id']] = issue.pk
+            statuses[issue.pk] = issue.status
+
+        comments = []
+        for message, target in replies:
+            author_id, text = author(message)
+            comment = Comment(
+                issue_id=issue_ids.get(target, target),
+                text=text,
+                author_id=author_id,
+                audience=MAIL_COMMENT_AUDIENCE,
+                issue_status=statuses[issue_ids.get(target, target)],
+            )
+            html = comment.render_rich_text({'text': text})
+            for name, value in html.items():
+                setattr(comment, name, value)
+            comments.append(comment)
+        Sequence.assign(comments, ArchivedComment)
+        Comment.objects.bulk_create(comments)
+        Issue.objects.filter(
+            pk__in=set(comment.issue_id for comment in comments),
+        ).update(modified=timezone.now())
+        Project.issues_changed(component.project_id)
+
+        MailMessage.objects.bulk_create(
+            MailMessage(message_id=message_id, issue_id=issue_ids.get(
+                target, target))
+            for message_id, target in targets.items()
+        )
+    return len(new), len(comments), len(messages) - len(targets)
+
+
+def ingest_mail(path, component, batch_size=MAIL_BATCH_SIZE,
+                workers=MAIL_WORKERS, progress=None):
+    ''' Add the emails of the Maildir or mbox at path, opening new issues in
+    the given component. Emails already added are skipped. Returns the
+    numbers of issues and comments created and of emails skipped.
+    '''
+    default_user = User.objects.get(username=MAIL_DEFAULT_USER)
+    users = dict(
+        (email.lower(), pk) for email, pk in
+        User.objects.exclude(email='').values_list('email', 'pk')
+    )
+    keys = open_mailbox(path).keys()
+    if workers == 1:
+        pool = None
+        _open_worker_mailbox(path)
+        parsed = map(_parse_key, keys)
+    else:
+        pool = multiprocessing.Pool(
+            workers, initializer=_open_worker_mailbox, initargs=(path,))
+        parsed = pool.imap(_parse_key, keys, PARSE_CHUNK_SIZE)
+    ''' Only the keys are sent to the parsing processes, which read the
+    emails themselves, so the mailbox is never held in memory.
+    '''
+    issues = comments = skipped = 0
+    database = Project.database_for(component.project_id)
+    try:
+        for batch in _batches(parsed, batch_size):
+            messages = [message for message in batch if message]
+            with use_database(database):
+                added = _ingest_batch(
+                    messages, component, users, default_user)
+            issues += added[0]
+            comments += added[1]
+            skipped += added[2] + len(batch) - len(messages)
+            if progress:
+                progress('{} issues and {} comments added, {} emails '
+                         'skipped'.format(issues, comments, skipped))
+    finally:
+        if pool:
+            pool.terminate()
+    return issues, comments, skipped
@@ -0,0 +1,31 @@
+''' Management command moving old terminal issues to the archive tables.
+'''
+
+from __future__ import absolute_import
+
+from django.core.management.base import BaseCommand
+from issuetrack.archive import archive_issues
+from issuetrack.settings import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+
+    help = 'Move old closed issues and their comments to the archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=ARCHIVE_AFTER_DAYS,
+            help='Archive issues not changed for this many days.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+            help='Number of issues moved per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        total = archive_issues(
+            days=options['days'],
+            batch_size=options['batch_size'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write('Done: {} issues archived'.format(total))
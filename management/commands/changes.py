@@ -0,0 +1,43 @@
+''' Management command writing the change feed as JSON lines.
+'''
+
+from __future__ import absolute_import
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from issuetrack.changes import changes_since
+from issuetrack.settings import CHANGES_PAGE_SIZE
+
+
+class Command(BaseCommand):
+
+    help = ('Write the projects, components, issues and comments changed '
+            'or deleted after a cursor, one JSON object per line, followed '
+            'by the cursor to continue from.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', default='',
+            help='Cursor returned by an earlier call. Omit to start over.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=CHANGES_PAGE_SIZE,
+            help='Number of changes read per query.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('The batch size must be positive')
+        cursor = options['since']
+        more = True
+        while more:
+            try:
+                found, cursor, more = changes_since(
+                    cursor, options['batch_size'])
+            except ValueError as error:
+                raise CommandError(str(error))
+            for change in found:
+                self.stdout.write(json.dumps(change, cls=DjangoJSONEncoder))
+        self.stdout.write(json.dumps({'cursor': cursor}))
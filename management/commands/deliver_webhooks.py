@@ -0,0 +1,30 @@
+''' Management command posting the queued events to the webhooks.
+'''
+
+from __future__ import absolute_import
+
+from django.core.management.base import BaseCommand
+from issuetrack.settings import WEBHOOK_WORKERS
+from issuetrack.webhooks import deliver_webhooks
+
+
+class Command(BaseCommand):
+
+    help = 'Post the queued issue and comment events to the webhooks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=WEBHOOK_WORKERS,
+            help='Number of requests sent at the same time.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when no events are due instead of waiting for more.',
+        )
+
+    def handle(self, *args, **options):
+        deliver_webhooks(
+            workers=options['workers'],
+            once=options['once'],
+            progress=self.stdout.write,
+        )
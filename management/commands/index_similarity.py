@@ -0,0 +1,44 @@
+''' Management command storing the similarity buckets of every issue again.
+'''
+
+from __future__ import absolute_import
+
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from issuetrack.models import Issue
+from issuetrack.routers import issue_databases, use_database
+from issuetrack.settings import SIMILARITY_BATCH_SIZE
+
+
+class Command(BaseCommand):
+
+    help = 'Index the titles and descriptions of all issues for duplicates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=SIMILARITY_BATCH_SIZE,
+            help='Number of issues indexed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for database in issue_databases():
+            with use_database(database):
+                total = self.index(options['batch_size'], total)
+        self.stdout.write('Done: {} issues indexed'.format(total))
+
+    def index(self, batch_size, total):
+        ''' Index the issues of the current database.
+        '''
+        issues = Issue.objects.only('title', 'description').order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(issues.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return total
+            with transaction.atomic(using=router.db_for_write(Issue)):
+                for issue in batch:
+                    issue.index_similarity(issue.title, issue.description)
+            total += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write('{} issues indexed'.format(total))
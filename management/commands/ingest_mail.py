@@ -0,0 +1,60 @@
+''' Management command adding the emails of a mailbox as issues and comments.
+'''
+
+from __future__ import absolute_import
+
+import mailbox
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from issuetrack.mail import ingest_mail
+from issuetrack.models import Component
+from issuetrack.settings import MAIL_BATCH_SIZE, MAIL_DEFAULT_USER
+from issuetrack.settings import MAIL_WORKERS
+
+
+class Command(BaseCommand):
+
+    help = 'Add the emails of a Maildir or mbox as issues and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Maildir directory or mbox file.')
+        parser.add_argument(
+            'project', help='Key of the project new issues are opened in.')
+        parser.add_argument(
+            'component', help='Name of the component new issues belong to.')
+        parser.add_argument(
+            '--batch-size', type=int, default=MAIL_BATCH_SIZE,
+            help='Number of emails added per transaction.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=MAIL_WORKERS,
+            help='Number of processes parsing emails.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            component = Component.objects.get(
+                project__key=options['project'],
+                project__deleted=False,
+                name=options['component'],
+            )
+        except Component.DoesNotExist:
+            raise CommandError('No component {} in project {}'.format(
+                options['component'], options['project']))
+        try:
+            totals = ingest_mail(
+                options['path'],
+                component,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                progress=self.stdout.write,
+            )
+        except User.DoesNotExist:
+            raise CommandError('No user {} to file emails under'.format(
+                MAIL_DEFAULT_USER))
+        except mailbox.NoSuchMailboxError:
+            raise CommandError('No mailbox at {}'.format(options['path']))
+        self.stdout.write(
+            'Done: {} issues and {} comments added, {} emails skipped'.format(
+                *totals))
@@ -0,0 +1,39 @@
+''' Management command moving a project's issues to another database.
+'''
+
+from __future__ import absolute_import
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from issuetrack.models import Project
+from issuetrack.sharding import move_project
+from issuetrack.settings import SHARD_MOVE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+
+    help = "Move a project's issues and comments to another database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('project', help='Key of the project to move.')
+        parser.add_argument(
+            'database', help='Alias of the database to move it to.')
+        parser.add_argument(
+            '--batch-size', type=int, default=SHARD_MOVE_BATCH_SIZE,
+            help='Number of issues copied per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        if options['database'] not in settings.DATABASES:
+            raise CommandError('No database {}'.format(options['database']))
+        try:
+            project = Project.objects.get(key=options['project'])
+        except Project.DoesNotExist:
+            raise CommandError('No project {}'.format(options['project']))
+        total = move_project(
+            project,
+            options['database'],
+            batch_size=options['batch_size'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write('Done: {} issues moved'.format(total))
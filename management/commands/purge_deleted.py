@@ -0,0 +1,30 @@
+''' Management command removing deleted projects and components.
+'''
+
+from __future__ import absolute_import
+
+from django.core.management.base import BaseCommand
+from issuetrack.purge import purge_deleted
+from issuetrack.settings import PURGE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+
+    help = 'Remove deleted projects and components in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=PURGE_BATCH_SIZE,
+            help='Number of rows removed per transaction.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between two batches.',
+        )
+
+    def handle(self, *args, **options):
+        purge_deleted(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            progress=self.stdout.write,
+        )
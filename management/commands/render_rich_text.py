@@ -0,0 +1,26 @@
+''' Management command cleaning the stored rich text HTML again.
+'''
+
+from __future__ import absolute_import
+
+from django.core.management.base import BaseCommand
+from issuetrack.render import render_rich_text
+from issuetrack.settings import RENDER_BATCH_SIZE
+
+
+class Command(BaseCommand):
+
+    help = 'Sanitize the HTML of descriptions and comments again.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=RENDER_BATCH_SIZE,
+            help='Number of rows cleaned per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        total = render_rich_text(
+            batch_size=options['batch_size'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write('Done: {} rows changed'.format(total))
@@ -0,0 +1,17 @@
+''' Management command sending the digests of the watched issues' events.
+'''
+
+from __future__ import absolute_import
+
+from django.core.management.base import BaseCommand
+from issuetrack.digests import send_digests
+
+
+class Command(BaseCommand):
+
+    help = 'Send each watcher one message with the events since their ' \
+        'last digest.'
+
+    def handle(self, *args, **options):
+        sent = send_digests()
+        self.stdout.write('{} digests sent'.format(sent))
@@ -0,0 +1,60 @@
+''' Management command listing the slowest queries of the views.
+'''
+
+from __future__ import absolute_import
+
+import json
+
+from django.core.management.base import BaseCommand
+from issuetrack.models import SlowQuery
+from issuetrack.slowqueries import percentile
+
+ORDERS = {
+    'total': lambda row: row.total_time,
+    'count': lambda row: row.count,
+    'max': lambda row: row.max_time,
+    'p95': lambda row: percentile(json.loads(row.timings), 0.95),
+}
+''' The ways the queries can be ranked.
+'''
+
+
+class Command(BaseCommand):
+
+    help = 'List the slow queries recorded, worst first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Number of queries listed.',
+        )
+        parser.add_argument(
+            '--order', choices=sorted(ORDERS), default='total',
+            help='Rank the queries by their total time, count, slowest '
+            'time or 95th percentile.',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Forget the recorded queries after listing them.',
+        )
+
+    def handle(self, *args, **options):
+        rows = sorted(
+            SlowQuery.objects.all(), key=ORDERS[options['order']],
+            reverse=True)
+        for rank, row in enumerate(rows[:options['limit']], 1):
+            timings = json.loads(row.timings)
+            self.stdout.write(
+                '#{} {} queries, {:.1f} ms in total, p50 {:.1f} ms, '
+                'p95 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms'.format(
+                    rank, row.count, row.total_time,
+                    percentile(timings, 0.5), percentile(timings, 0.95),
+                    percentile(timings, 0.99), row.max_time))
+            self.stdout.write('  view: {} ({}) on {}'.format(
+                row.view or '-', row.url_name or '-', row.database))
+            self.stdout.write('  parameters: {}'.format(row.parameters))
+            self.stdout.write('  sql: {}'.format(row.sql))
+            for line in row.plan.splitlines():
+                self.stdout.write('  plan: {}'.format(line))
+        if options['clear']:
+            SlowQuery.objects.all().delete()
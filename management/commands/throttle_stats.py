@@ -0,0 +1,16 @@
+''' Management command showing how many requests were throttled.
+'''
+
+from __future__ import absolute_import
+
+from django.core.management.base import BaseCommand
+from issuetrack.throttle import throttled_counts
+
+
+class Command(BaseCommand):
+
+    help = 'Show the number of throttled requests per scope and client.'
+
+    def handle(self, *args, **options):
+        for (scope, client), count in sorted(throttled_counts().items()):
+            self.stdout.write('{} by {}: {}'.format(scope, client, count))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 12:46
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(verbose_name='Comment')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('audience', models.CharField(choices=[('Public', 'Public'), ('Private', 'Private')], default='Private', max_length=30, verbose_name='Audience')),
+                ('issue_status', models.CharField(max_length=30, verbose_name='Current Issue Status')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Component',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, verbose_name='Name')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Description')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Issue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='Title')),
+                ('description', models.TextField(verbose_name='Description')),
+                ('steps', models.TextField(blank=True, help_text='These are reliable steps that when followed willreplicate your issue. Not required if the description coverseverything necessary for describing the issue.', null=True, verbose_name='Steps to Replicate Issue')),
+                ('observed', models.TextField(blank=True, help_text='This is the behavior you are observing when following the steps above.', null=True, verbose_name='Observed Behavior')),
+                ('expected', models.TextField(blank=True, help_text='This is the behavior you are reasonably expecting to occur when following the steps above.', null=True, verbose_name='Expected Behavior')),
+                ('itype', models.CharField(choices=[('Bug', 'Bug'), ('Improvement', 'Improvement'), ('Feature', 'Feature'), ('Info', 'Info'), ('Proposal', 'Proposal'), ('Task', 'Task')], max_length=30, verbose_name='Type')),
+                ('priority', models.CharField(choices=[('Blocker', 'Blocker'), ('Critical', 'Critical'), ('Major', 'Major'), ('Minor', 'Minor'), ('Trivial', 'Trivial')], max_length=30, verbose_name='Priority')),
+                ('urgency', models.CharField(choices=[('ASAP', 'ASAP'), ('7 days', '7 days'), ('21 days', '21 days'), ('42 days', '42 days'), ('Indefinite', 'Indefinite')], max_length=30, verbose_name='Urgency')),
+                ('status', models.CharField(choices=[('New', 'New'), ('Open', 'Open'), ('In Progress', 'In Progress'), ('Resolved', 'Resolved'), ('Closed', 'Closed'), ('On Hold', 'On Hold'), ('Pending Creater', 'Pending Creater'), ('Pending 3rd Party', 'Pending 3rd Party'), ('Duplicate', 'Duplicate'), ('Invalid/Unfounded', 'Invalid/Unfounded'), ("Won't Fix", "Won't Fix")], default='New', max_length=30, verbose_name='Status')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='issue_assignee', to=settings.AUTH_USER_MODEL)),
+                ('component', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Component')),
+                ('creater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='Name')),
+                ('key', models.CharField(max_length=10, unique=True, verbose_name='Key')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Description')),
+                ('members', models.ManyToManyField(related_name='project_members', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Project'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='issue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Issue'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='component',
+            unique_together=set([('name', 'project')]),
+        ),
+    ]
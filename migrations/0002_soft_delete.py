@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 12:47
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='deleted',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='deleted',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
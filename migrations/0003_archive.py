@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 12:49
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('issuetrack', '0002_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField(verbose_name='Comment')),
+                ('created', models.DateTimeField()),
+                ('modified', models.DateTimeField()),
+                ('audience', models.CharField(choices=[('Public', 'Public'), ('Private', 'Private')], max_length=30, verbose_name='Audience')),
+                ('issue_status', models.CharField(max_length=30, verbose_name='Current Issue Status')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedIssue',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255, verbose_name='Title')),
+                ('description', models.TextField(verbose_name='Description')),
+                ('steps', models.TextField(blank=True, null=True, verbose_name='Steps to Replicate Issue')),
+                ('observed', models.TextField(blank=True, null=True, verbose_name='Observed Behavior')),
+                ('expected', models.TextField(blank=True, null=True, verbose_name='Expected Behavior')),
+                ('itype', models.CharField(choices=[('Bug', 'Bug'), ('Improvement', 'Improvement'), ('Feature', 'Feature'), ('Info', 'Info'), ('Proposal', 'Proposal'), ('Task', 'Task')], max_length=30, verbose_name='Type')),
+                ('priority', models.CharField(choices=[('Blocker', 'Blocker'), ('Critical', 'Critical'), ('Major', 'Major'), ('Minor', 'Minor'), ('Trivial', 'Trivial')], max_length=30, verbose_name='Priority')),
+                ('urgency', models.CharField(choices=[('ASAP', 'ASAP'), ('7 days', '7 days'), ('21 days', '21 days'), ('42 days', '42 days'), ('Indefinite', 'Indefinite')], max_length=30, verbose_name='Urgency')),
+                ('status', models.CharField(choices=[('New', 'New'), ('Open', 'Open'), ('In Progress', 'In Progress'), ('Resolved', 'Resolved'), ('Closed', 'Closed'), ('On Hold', 'On Hold'), ('Pending Creater', 'Pending Creater'), ('Pending 3rd Party', 'Pending 3rd Party'), ('Duplicate', 'Duplicate'), ('Invalid/Unfounded', 'Invalid/Unfounded'), ("Won't Fix", "Won't Fix")], max_length=30, verbose_name='Status')),
+                ('created', models.DateTimeField()),
+                ('modified', models.DateTimeField()),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+                ('assignee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('component', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Component')),
+                ('creater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='issue',
+            index_together=set([('status', 'modified')]),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='issue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='issuetrack.ArchivedIssue'),
+        ),
+    ]
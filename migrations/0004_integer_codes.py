@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+STATUSES = (
+    (10, 'New'),
+    (20, 'Open'),
+    (30, 'In Progress'),
+    (40, 'Resolved'),
+    (50, 'Closed'),
+    (60, 'On Hold'),
+    (70, 'Pending Creater'),
+    (80, 'Pending 3rd Party'),
+    (90, 'Duplicate'),
+    (100, 'Invalid/Unfounded'),
+    (110, "Won't Fix"),
+)
+
+KINDS = (
+    (10, 'Bug'),
+    (20, 'Improvement'),
+    (30, 'Feature'),
+    (40, 'Info'),
+    (50, 'Proposal'),
+    (60, 'Task'),
+)
+
+PRIORITIES = (
+    (10, 'Blocker'),
+    (20, 'Critical'),
+    (30, 'Major'),
+    (40, 'Minor'),
+    (50, 'Trivial'),
+)
+
+URGENCIES = (
+    (10, 'ASAP'),
+    (20, '7 days'),
+    (30, '21 days'),
+    (40, '42 days'),
+    (50, 'Indefinite'),
+)
+''' Codes for the labels as they were when this migration was written.
+'''
+
+CONVERSIONS = {
+    'issue': (
+        ('itype', KINDS, 40),
+        ('priority', PRIORITIES, 30),
+        ('urgency', URGENCIES, 50),
+        ('status', STATUSES, 10),
+    ),
+    'comment': (
+        ('issue_status', STATUSES, 10),
+    ),
+    'archivedissue': (
+        ('itype', KINDS, 40),
+        ('priority', PRIORITIES, 30),
+        ('urgency', URGENCIES, 50),
+        ('status', STATUSES, 10),
+    ),
+    'archivedcomment': (
+        ('issue_status', STATUSES, 10),
+    ),
+}
+''' For every model: (field, choices, code for labels that are not in the
+choices).
+'''
+
+
+def labels_to_codes(apps, schema_editor):
+    ''' Replace every label by its code, still as text, so that the column
+    type can be changed in place afterwards. One UPDATE per label keeps the
+    conversion set based.
+    '''
+    for model_name, conversions in CONVERSIONS.items():
+        rows = apps.get_model('issuetrack', model_name).objects.using(
+            schema_editor.connection.alias)
+        for field, choices, fallback in conversions:
+            codes = [str(code) for code, label in choices]
+            for code, label in choices:
+                rows.filter(**{field: label}).update(**{field: str(code)})
+            rows.exclude(**{field + '__in': codes}).update(
+                **{field: str(fallback)})
+
+
+def codes_to_labels(apps, schema_editor):
+    ''' Reverse of labels_to_codes.
+    '''
+    for model_name, conversions in CONVERSIONS.items():
+        rows = apps.get_model('issuetrack', model_name).objects.using(
+            schema_editor.connection.alias)
+        for field, choices, fallback in conversions:
+            for code, label in choices:
+                rows.filter(**{field: str(code)}).update(**{field: label})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0003_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(labels_to_codes, codes_to_labels),
+        migrations.AlterField(
+            model_name='issue',
+            name='itype',
+            field=models.PositiveSmallIntegerField(
+                choices=KINDS, verbose_name='Type'),
+        ),
+        migrations.RenameField(
+            model_name='issue',
+            old_name='itype',
+            new_name='kind',
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='priority',
+            field=models.PositiveSmallIntegerField(
+                choices=PRIORITIES, verbose_name='Priority'),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='urgency',
+            field=models.PositiveSmallIntegerField(
+                choices=URGENCIES, verbose_name='Urgency'),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='status',
+            field=models.PositiveSmallIntegerField(
+                choices=STATUSES, default=10, verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='issue_status',
+            field=models.PositiveSmallIntegerField(
+                choices=STATUSES, verbose_name='Current Issue Status'),
+        ),
+        migrations.AlterField(
+            model_name='archivedissue',
+            name='itype',
+            field=models.PositiveSmallIntegerField(
+                choices=KINDS, verbose_name='Type'),
+        ),
+        migrations.RenameField(
+            model_name='archivedissue',
+            old_name='itype',
+            new_name='kind',
+        ),
+        migrations.AlterField(
+            model_name='archivedissue',
+            name='priority',
+            field=models.PositiveSmallIntegerField(
+                choices=PRIORITIES, verbose_name='Priority'),
+        ),
+        migrations.AlterField(
+            model_name='archivedissue',
+            name='urgency',
+            field=models.PositiveSmallIntegerField(
+                choices=URGENCIES, verbose_name='Urgency'),
+        ),
+        migrations.AlterField(
+            model_name='archivedissue',
+            name='status',
+            field=models.PositiveSmallIntegerField(
+                choices=STATUSES, verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='archivedcomment',
+            name='issue_status',
+            field=models.PositiveSmallIntegerField(
+                choices=STATUSES, verbose_name='Current Issue Status'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 12:57
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def number_issues(apps, schema_editor):
+    ''' Number the issues, archived or not, of every project in the order
+    they were created and set the projects' counters.
+    '''
+    db = schema_editor.connection.alias
+    Project = apps.get_model('issuetrack', 'Project')
+    for project in Project.objects.using(db).all():
+        rows = []
+        for name in ('Issue', 'ArchivedIssue'):
+            model = apps.get_model('issuetrack', name)
+            rows.extend(
+                (created, pk, model) for pk, created in
+                model.objects.using(db).filter(
+                    component__project=project).values_list('pk', 'created'))
+        rows.sort(key=lambda row: row[:2])
+        for number, (created, pk, model) in enumerate(rows, 1):
+            model.objects.using(db).filter(pk=pk).update(
+                project=project, number=number)
+        project.last_issue_number = len(rows)
+        project.save(update_fields=['last_issue_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0004_integer_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedissue',
+            name='number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedissue',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='issuetrack.Project'),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='number',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='project',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Project'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='last_issue_number',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(number_issues, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='archivedissue',
+            unique_together=set([('project', 'number')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='issue',
+            unique_together=set([('project', 'number')]),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 13:01
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from issuetrack.sanitize import sanitize_html
+
+RICH_TEXT_FIELDS = {
+    'project': ('description',),
+    'component': ('description',),
+    'issue': ('description', 'steps', 'observed', 'expected'),
+    'comment': ('text',),
+    'archivedissue': ('description', 'steps', 'observed', 'expected'),
+    'archivedcomment': ('text',),
+}
+
+
+def render_html(apps, schema_editor):
+    ''' Fill the new HTML columns from the stored rich text.
+    '''
+    for model_name, fields in RICH_TEXT_FIELDS.items():
+        rows = apps.get_model('issuetrack', model_name).objects.using(
+            schema_editor.connection.alias)
+        for row in rows.values('pk', *fields).iterator():
+            rows.filter(pk=row['pk']).update(**dict(
+                (name + '_html', sanitize_html(row[name])) for name in fields
+            ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0006_issue_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='text_html',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='archivedissue',
+            name='description_html',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='archivedissue',
+            name='expected_html',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='archivedissue',
+            name='observed_html',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='archivedissue',
+            name='steps_html',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='description_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='description_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='expected_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='observed_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='steps_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='description_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(render_html, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 13:10
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0009_mail_messages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('issue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Issue')),
+            ],
+        ),
+    ]
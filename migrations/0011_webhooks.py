@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 13:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0010_issue_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Webhook',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, verbose_name='URL')),
+                ('secret', models.CharField(help_text='Key of the HMAC-SHA256 signature sent with each request.', max_length=100, verbose_name='Secret')),
+                ('events', models.CharField(blank=True, help_text='Comma separated events to send, e.g. issue.created, comment.created. All events are sent if empty.', max_length=200, verbose_name='Events')),
+                ('batch_size', models.PositiveSmallIntegerField(default=1, help_text='Most events sent in one request.', verbose_name='Batch Size')),
+                ('active', models.BooleanField(default=True)),
+                ('failures', models.PositiveIntegerField(default=0, editable=False)),
+                ('retry_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('locked_until', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.TextField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Webhook')),
+            ],
+        ),
+    ]
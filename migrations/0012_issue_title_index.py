@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 13:14
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0011_webhooks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='issue',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Title'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 13:16
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0012_issue_title_index'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='issue',
+            index_together=set([('status', 'modified'), ('project', 'modified')]),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 13:20
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from issuetrack.settings import AUTO_ASSIGN_PRIORITY_WEIGHTS
+from issuetrack.settings import AUTO_ASSIGN_URGENCY_WEIGHTS
+from issuetrack.settings import DASHBOARD_CLOSED_STATUSES
+
+
+def count_workloads(apps, schema_editor):
+    ''' Add the workload of every project member and assignee.
+    '''
+    db = schema_editor.connection.alias
+    Project = apps.get_model('issuetrack', 'Project')
+    Issue = apps.get_model('issuetrack', 'Issue')
+    AssigneeLoad = apps.get_model('issuetrack', 'AssigneeLoad')
+    for project in Project.objects.using(db).all():
+        loads = dict(
+            (user_id, 0)
+            for user_id in project.members.values_list('pk', flat=True))
+        members = set(loads)
+        groups = Issue.objects.using(db).filter(
+            models.Q(component__isnull=True) |
+            models.Q(component__deleted=False),
+            project=project, assignee__isnull=False,
+        ).exclude(
+            status__in=DASHBOARD_CLOSED_STATUSES,
+        ).order_by().values(
+            'assignee', 'priority', 'urgency',
+        ).annotate(count=models.Count('pk'))
+        for group in groups:
+            loads[group['assignee']] = loads.get(group['assignee'], 0) + \
+                group['count'] * \
+                AUTO_ASSIGN_PRIORITY_WEIGHTS[group['priority']] * \
+                AUTO_ASSIGN_URGENCY_WEIGHTS[group['urgency']]
+        AssigneeLoad.objects.using(db).bulk_create(
+            AssigneeLoad(
+                project=project, user_id=user_id, load=load,
+                member=user_id in members,
+            )
+            for user_id, load in loads.items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('issuetrack', '0013_issue_project_modified_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssigneeLoad',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('load', models.IntegerField(default=0)),
+                ('member', models.BooleanField(default=False)),
+                ('assigned', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='auto_assign',
+            field=models.NullBooleanField(help_text='Leave unknown to follow the project.', verbose_name='Auto-Assign'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='auto_assign',
+            field=models.BooleanField(default=False, help_text='Assign new unassigned issues to the member with the lowest workload.', verbose_name='Auto-Assign'),
+        ),
+        migrations.AddField(
+            model_name='assigneeload',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='issuetrack.Project'),
+        ),
+        migrations.AddField(
+            model_name='assigneeload',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='assigneeload',
+            unique_together=set([('project', 'user')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='assigneeload',
+            index_together=set([('project', 'member', 'load', 'assigned')]),
+        ),
+        migrations.RunPython(count_workloads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 13:33
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0015_project_database'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterIndexTogether(
+            name='comment',
+            index_together=set([('modified', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='component',
+            index_together=set([('modified', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='issue',
+            index_together=set([('modified', 'id'), ('project', 'modified'), ('status', 'modified')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='project',
+            index_together=set([('modified', 'id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='tombstone',
+            index_together=set([('deleted', 'id')]),
+        ),
+    ]
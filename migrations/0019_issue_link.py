@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 13:48
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0018_slow_query'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueAncestor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(10, 'Blocks'), (20, 'Duplicates'), (30, 'Relates to')], verbose_name='Kind')),
+                ('paths', models.BigIntegerField(default=1)),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_rows', to='issuetrack.Issue')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_rows', to='issuetrack.Issue')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IssueLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(10, 'Blocks'), (20, 'Duplicates'), (30, 'Relates to')], verbose_name='Kind')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='links_from', to='issuetrack.Issue')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='links_to', to='issuetrack.Issue')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='issuelink',
+            unique_together=set([('source', 'target', 'kind')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='issuelink',
+            index_together=set([('target', 'kind')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='issueancestor',
+            unique_together=set([('kind', 'ancestor', 'descendant')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='issueancestor',
+            index_together=set([('kind', 'descendant', 'ancestor')]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.13 on 2026-10-19 14:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuetrack', '0020_watch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='public',
+            field=models.BooleanField(default=False, help_text='Show the issues and their public comments to anyone, without logging in.', verbose_name='Public Portal'),
+        ),
+    ]
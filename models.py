@@ -1,13 +1,91 @@
 ''' Models used for the Issuetrack application.
 '''
 
-from django.db import models
+import threading
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from collections import Counter
+
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, Max
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
+from django.utils import timezone
 from issuetrack.settings import ISSUE_STATUSES, ISSUE_KINDS, ISSUE_PRIORITIES
 from issuetrack.settings import ISSUE_URGENCIES, COMMENT_AUDIENCES
+from issuetrack.sanitize import sanitize_html
+from issuetrack.similarity import buckets
+from issuetrack.settings import DASHBOARD_CACHE, ISSUE_STATUS_CODES
+from issuetrack.settings import AUTO_ASSIGN_PRIORITY_WEIGHTS
+from issuetrack.settings import AUTO_ASSIGN_URGENCY_WEIGHTS
+from issuetrack.settings import AUTO_ASSIGN_RETRIES, DASHBOARD_CLOSED_STATUSES
+from issuetrack.settings import DATABASE_PRIMARY, DATABASE_SHARDS
+from issuetrack.settings import ISSUE_LINK_ACYCLIC, ISSUE_LINK_KINDS
+from issuetrack.settings import ISSUE_LINK_KIND_CODES, PORTAL_CACHE
+from issuetrack.routers import issue_databases, use_database
+
+
+class IssueConflict(Exception):
+    ''' Raised when an issue is changed based on a version that someone else
+    has changed since.
+    '''
+
+
+class LinkCycle(Exception):
+    ''' Raised when a link would make an issue follow from itself, e.g.
+    block an issue that blocks it.
+    '''
+
+
+class RichTextModel(models.Model):
+    ''' Base of models with rich text fields. Each field named in
+    rich_text_fields has a <field>_html column holding its sanitized HTML,
+    which is updated whenever the field is saved.
+    '''
+
+    rich_text_fields = ()
+
+    class Meta:
+        abstract = True
 
+    def render_rich_text(self, values):
+        ''' The <field>_html values for the rich text fields in values.
+        '''
+        return dict(
+            (name + '_html', sanitize_html(values[name]))
+            for name in self.rich_text_fields if name in values
+        )
+
+    def save(self, *args, **kwargs):
+        ''' Update the HTML of the rich text fields being saved.
+        '''
+        update_fields = kwargs.get('update_fields')
+        names = [
+            name for name in self.rich_text_fields
+            if update_fields is None or name in update_fields
+        ]
+        rendered = self.render_rich_text(
+            dict((name, getattr(self, name)) for name in names))
+        for name, value in rendered.items():
+            setattr(self, name, value)
+        if update_fields is not None:
+            kwargs['update_fields'] = list(update_fields) + list(rendered)
+        return super(RichTextModel, self).save(*args, **kwargs)
+
+
+class LiveManager(models.Manager):
+    ''' Default manager hiding rows that were deleted by a user and are
+    waiting for the purge job. Use all_objects to see them.
+    '''
 
-class Project(models.Model):
+    def get_queryset(self):
+        return super(LiveManager, self).get_queryset().filter(deleted=False)
+
+
+class Project(RichTextModel):
     '''Project can be something like a software application or ongoing
     event or project.
     '''
@@ -25,17 +103,138 @@ class Project(models.Model):
     description = models.TextField('Description', null=True, blank=True)
     ''' Describes the project.
     '''
+    description_html = models.TextField(default='', editable=False)
+    ''' Sanitized HTML of the description, shown on the project's page.
+    '''
     members = models.ManyToManyField(User, related_name='project_members')
     ''' A list of users are eligible to be assignees or issue creaters for
     the project.
     '''
+    deleted = models.BooleanField(default=False, db_index=True)
+    ''' Set when the project is deleted. The project, its components,
+    issues and comments are removed later in batches by purge_deleted.
+    '''
+    last_issue_number = models.PositiveIntegerField(default=0, editable=False)
+    ''' Number given to the project's latest issue. See
+    Project.next_issue_number.
+    '''
+    auto_assign = models.BooleanField(
+        'Auto-Assign',
+        default=False,
+        help_text='Assign new unassigned issues to the member with the '
+        + 'lowest workload.',
+    )
+    ''' Whether new issues without an assignee are given one, see
+    AssigneeLoad.pick. Components can override it.
+    '''
+    public = models.BooleanField(
+        'Public Portal',
+        default=False,
+        help_text='Show the issues and their public comments to anyone, '
+        + 'without logging in.',
+    )
+    ''' Whether the project has a read-only public portal, see
+    issuetrack.portal.
+    '''
+    database = models.CharField(
+        max_length=100, blank=True, default='', editable=False)
+    ''' Alias of the database holding the project's issues and comments,
+    empty for DATABASE_PRIMARY. See DATABASE_SHARDS.
+    '''
+    modified = models.DateTimeField(auto_now=True)
+    ''' The date and time when the project was last modified.
+    '''
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    rich_text_fields = ('description',)
+
+    class Meta:
+        '''Meta properties of the Project class go here.'''
+
+        index_together = [('modified', 'id')]
+        ''' Serves the change feed, see issuetrack.changes.
+        '''
 
     def __str__(self):
         '''String repr of the Project is its name.'''
         return self.name
 
+    def save(self, *args, **kwargs):
+        ''' Place a new project on the shard holding the fewest projects.
+        '''
+        if self._state.adding and DATABASE_SHARDS and not self.database:
+            counts = dict(
+                (database or DATABASE_PRIMARY, count)
+                for database, count in Project.all_objects.order_by(
+                ).values_list('database').annotate(Count('pk'))
+            )
+            self.database = min(
+                DATABASE_SHARDS, key=lambda alias: counts.get(alias, 0))
+        adding = self._state.adding
+        super(Project, self).save(*args, **kwargs)
+        if not adding:
+            Project.issues_changed(self.pk)
+            ''' The portal and dashboard show the project too.
+            '''
+
+    @classmethod
+    def database_for(cls, project_id):
+        ''' Alias of the database holding a project's issues. Issues
+        without a project are kept on the primary.
+        '''
+        if not DATABASE_SHARDS or project_id is None:
+            return DATABASE_PRIMARY
+        database = cls.all_objects.filter(pk=project_id).values_list(
+            'database', flat=True).first()
+        return database or DATABASE_PRIMARY
+
+    @classmethod
+    def next_issue_number(cls, project_id, count=1):
+        ''' Take the next issue number of a project, or the first of the next
+        count numbers. The increment locks only this project's row, until
+        the caller's transaction ends, so issues of other projects are
+        numbered concurrently and two issues never get the same number.
+        '''
+        projects = cls.all_objects.filter(pk=project_id)
+        projects.update(
+            last_issue_number=models.F('last_issue_number') + count)
+        last = projects.values_list('last_issue_number', flat=True).get()
+        return last - count + 1
+
+    @staticmethod
+    def dashboard_cache_key(project_id):
+        ''' Cache key of a project's dashboard.
+        '''
+        return 'issuetrack:dashboard:{}'.format(project_id)
+
+    @staticmethod
+    def portal_cache_key(project_id):
+        ''' Cache key of the version of a project's portal pages.
+        '''
+        return 'issuetrack:portal:{}'.format(project_id)
+
+    @classmethod
+    def issues_changed(cls, *project_ids):
+        ''' Drop the cached dashboards and the portal version of projects
+        whose issues changed. They are dropped again when the transaction
+        commits, so that a page built from the old rows meanwhile is not
+        kept.
+        '''
+        project_ids = set(project_ids) - set([None])
+        if not project_ids:
+            return
+        for cache, cache_key in (
+                (caches[DASHBOARD_CACHE], cls.dashboard_cache_key),
+                (caches[PORTAL_CACHE], cls.portal_cache_key)):
+            keys = [cache_key(project_id) for project_id in project_ids]
+            cache.delete_many(keys)
+            transaction.on_commit(
+                lambda cache=cache, keys=keys: cache.delete_many(keys))
+
 
-class Component(models.Model):
+class Component(RichTextModel):
     '''A particular area of a project. For example a component for a
     software project could be 'models' or 'database' or 'UI'.
     '''
@@ -49,6 +248,27 @@ class Component(models.Model):
     description = models.TextField('Description', null=True, blank=True)
     ''' Optional description of the component.
     '''
+    description_html = models.TextField(default='', editable=False)
+    ''' Sanitized HTML of the description.
+    '''
+    deleted = models.BooleanField(default=False, db_index=True)
+    ''' Set when the component or its project is deleted. The component,
+    its issues and comments are removed later in batches by purge_deleted.
+    '''
+    auto_assign = models.NullBooleanField(
+        'Auto-Assign',
+        help_text='Leave unknown to follow the project.',
+    )
+    ''' Overrides the project's auto_assign for the component's issues.
+    '''
+    modified = models.DateTimeField(auto_now=True)
+    ''' The date and time when the component was last modified.
+    '''
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    rich_text_fields = ('description',)
 
     class Meta:
         '''Meta properties of the Component class go here.'''
@@ -56,16 +276,128 @@ class Component(models.Model):
         unique_together = ('name', 'project')
         ''' The name and project must be unique together.
         '''
+        index_together = [('modified', 'id')]
+        ''' Serves the change feed.
+        '''
 
     def __str__(self):
         '''String repr of the Component.'''
         return '{}/{}'.format(self.project.name, self.name)
 
+    def save(self, *args, **kwargs):
+        ''' A renamed or deleted component changes its project's dashboard.
+        '''
+        super(Component, self).save(*args, **kwargs)
+        Project.issues_changed(self.project_id)
 
-class Issue(models.Model):
+    def auto_assigns(self):
+        ''' Whether new issues of the component are assigned automatically.
+        '''
+        if self.auto_assign is None:
+            return self.project.auto_assign
+        return self.auto_assign
 
-    title = models.CharField('Title', max_length=255)
-    ''' The issue's title.
+
+class IssueQuerySet(models.QuerySet):
+
+    def live(self):
+        ''' Issues that do not belong to a deleted component or project.
+        '''
+        return self.filter(
+            models.Q(component__isnull=True) |
+            models.Q(component__deleted=False)
+        )
+
+    def similar_to(self, title, description):
+        ''' Issues sharing a similarity bucket with the given title and
+        description, the most similar first.
+        '''
+        return self.filter(
+            issuebucket__bucket__in=buckets(title, description),
+        ).annotate(
+            shared_buckets=Count('issuebucket'),
+        ).order_by('-shared_buckets', '-modified')
+
+    def visible_to(self, user):
+        ''' Issues the user can see: all of them for staff and superusers,
+        the ones they created for other users.
+        '''
+        if user.is_staff or user.is_superuser:
+            return self
+        return self.filter(creater=user)
+
+    def ancestors(self, issue, kind=ISSUE_LINK_KIND_CODES['Blocks']):
+        ''' Issues from which the given one is reached through links of an
+        ISSUE_LINK_ACYCLIC kind, by default everything blocking it directly
+        or through other blockers. One query on IssueAncestor.
+        '''
+        return self.filter(
+            descendant_rows__kind=kind, descendant_rows__descendant=issue)
+
+    def descendants(self, issue, kind=ISSUE_LINK_KIND_CODES['Blocks']):
+        ''' Issues reached from the given one through links of an
+        ISSUE_LINK_ACYCLIC kind, by default everything it blocks.
+        '''
+        return self.filter(
+            ancestor_rows__kind=kind, ancestor_rows__ancestor=issue)
+
+    def open_blockers(self, project):
+        ''' Open issues blocking open issues of the project, directly or
+        through other blockers, once for each component whose issues they
+        block, which blocked_component_id holds. One query on
+        IssueAncestor.
+        '''
+        open_statuses = [
+            code for code, label in ISSUE_STATUSES
+            if code not in DASHBOARD_CLOSED_STATUSES
+        ]
+        return self.filter(
+            status__in=open_statuses,
+            descendant_rows__kind=ISSUE_LINK_KIND_CODES['Blocks'],
+            descendant_rows__descendant__component__project=project,
+            descendant_rows__descendant__status__in=open_statuses,
+        ).annotate(
+            blocked_component_id=models.F(
+                'descendant_rows__descendant__component'),
+        ).distinct()
+
+
+WORKLOAD_FIELDS = (
+    'project_id', 'assignee_id', 'status', 'priority', 'urgency')
+''' Columns of an issue that its assignee's workload depends on.
+'''
+
+WORKLOAD_CHANGES = frozenset([
+    'component', 'project', 'project_id', 'assignee', 'assignee_id',
+    'status', 'priority', 'urgency',
+])
+''' Fields whose change can change the workload of an issue's assignee.
+'''
+
+
+def issue_weight(priority, urgency):
+    ''' What an open issue adds to its assignee's workload.
+    '''
+    return AUTO_ASSIGN_PRIORITY_WEIGHTS[priority] * \
+        AUTO_ASSIGN_URGENCY_WEIGHTS[urgency]
+
+
+def workload(row):
+    ''' (project id, assignee id, weight) of an issue given its
+    WORKLOAD_FIELDS. Issues that are closed, unassigned or outside a
+    project weigh nothing.
+    '''
+    weight = 0
+    if row['project_id'] is not None and row['assignee_id'] is not None \
+            and row['status'] not in DASHBOARD_CLOSED_STATUSES:
+        weight = issue_weight(row['priority'], row['urgency'])
+    return row['project_id'], row['assignee_id'], weight
+
+
+class Issue(RichTextModel):
+
+    title = models.CharField('Title', max_length=255, db_index=True)
+    ''' The issue's title. Indexed for the title search of the admin console.
     '''
     description = models.TextField('Description')
     ''' A description of the issue.
@@ -96,18 +428,20 @@ class Issue(models.Model):
         + 'occur when following the steps above.',
     )
 
-    itype = models.CharField('Type', max_length=30, choices=ISSUE_KINDS)
+    kind = models.PositiveSmallIntegerField('Type', choices=ISSUE_KINDS)
     ''' The kind or type of issue.
     '''
-    priority = models.CharField('Priority', max_length=30, choices=ISSUE_PRIORITIES)
+    priority = models.PositiveSmallIntegerField(
+        'Priority', choices=ISSUE_PRIORITIES)
     ''' The priority for the issue.
     '''
-    urgency = models.CharField('Urgency', max_length=30, choices=ISSUE_URGENCIES)
+    urgency = models.PositiveSmallIntegerField(
+        'Urgency', choices=ISSUE_URGENCIES)
     ''' The urgency for the issue. Sets an expectation of when an issue
     should be resolved.
     '''
-    status = models.CharField(
-        'Status', max_length=30, choices=ISSUE_STATUSES, default='New'
+    status = models.PositiveSmallIntegerField(
+        'Status', choices=ISSUE_STATUSES, default=ISSUE_STATUS_CODES['New']
     )
     ''' The status or disposition of the issue.
     '''
@@ -135,13 +469,551 @@ class Issue(models.Model):
     )
     ''' Associates with the Component.
     '''
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, null=True, blank=True,
+        editable=False,
+    )
+    ''' Project of the component, kept on the issue for its key.
+    '''
+    number = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    ''' Sequence number of the issue within its project. Issues without a
+    component have none.
+    '''
+    version = models.PositiveIntegerField(default=1, editable=False)
+    ''' Incremented by every change of the issue's fields. Edits based on an
+    older version are refused, see Issue.apply_changes.
+    '''
+    description_html = models.TextField(default='', editable=False)
+    steps_html = models.TextField(default='', editable=False)
+    observed_html = models.TextField(default='', editable=False)
+    expected_html = models.TextField(default='', editable=False)
+    ''' Sanitized HTML of the rich text fields, shown on the issue's page.
+    '''
+
+    objects = IssueQuerySet.as_manager()
+
+    rich_text_fields = ('description', 'steps', 'observed', 'expected')
+
+    class Meta:
+        '''Meta properties of the Issue class go here.'''
+
+        index_together = [
+            ('status', 'modified'),
+            ('project', 'modified'),
+            ('modified', 'id'),
+        ]
+        ''' Serve the status listings, the search for issues to archive, the
+        recent and untouched issues of the project dashboards and the change
+        feed.
+        '''
+        unique_together = ('project', 'number')
+        ''' An issue key such as TP1-42 names a single issue.
+        '''
 
     def __str__(self):
         '''String repr of the issue using the issue's title.'''
         return self.title
 
+    @property
+    def key(self):
+        ''' Key of the issue, e.g. TP1-42, or #<id> without a project.
+        '''
+        if self.number is None:
+            return '#{}'.format(self.id)
+        return '{}-{}'.format(self.project.key, self.number)
+
+    def _renumber(self, component):
+        ''' Project and number fields for the issue in the given component,
+        or nothing if it stays in its project. Must be called in the
+        transaction that saves them.
+        '''
+        project_id = component.project_id if component else None
+        if project_id is None or project_id == self.project_id:
+            return {}
+        return {
+            'project_id': project_id,
+            'number': Project.next_issue_number(project_id),
+        }
+
+    def workload_row(self):
+        ''' The issue's WORKLOAD_FIELDS.
+        '''
+        return dict((name, getattr(self, name)) for name in WORKLOAD_FIELDS)
+
+    def _stored_workload_row(self):
+        ''' The WORKLOAD_FIELDS of the issue as stored, locking its row
+        until the transaction ends. None if the row is gone.
+        '''
+        return Issue.objects.select_for_update().filter(
+            pk=self.pk).values(*WORKLOAD_FIELDS).first()
+
+    def _database(self, project_id, using=None):
+        ''' Database the issue is saved to when it is in the given project.
+        Without DATABASE_SHARDS that is the database the caller named, if
+        any.
+        '''
+        if not DATABASE_SHARDS:
+            return using or router.db_for_write(Issue, instance=self)
+        database = Project.database_for(project_id)
+        if not self._state.adding and self._state.db != database:
+            raise ValueError(
+                'Issue {} cannot be moved to a project on another database. '
+                'Move the project with move_project instead.'.format(self.pk))
+        return database
+
+    def save(self, *args, **kwargs):
+        ''' Give the issue a number in its component's project when it is
+        created with a component or moved to another project. A new issue
+        without an assignee is assigned automatically if its component
+        says so. The workloads of the old and new assignee are updated.
+        '''
+        adding = self._state.adding
+        if adding:
+            Sequence.assign([self], ArchivedIssue)
+        else:
+            self.version += 1
+        update_fields = kwargs.get('update_fields')
+        project_id = self.project_id
+        with transaction.atomic():
+            for name, value in self._renumber(self.component).items():
+                setattr(self, name, value)
+            database = kwargs['using'] = self._database(
+                self.project_id, kwargs.get('using'))
+            with transaction.atomic(using=database), use_database(database):
+                old = None
+                if not adding and (
+                        update_fields is None or
+                        WORKLOAD_CHANGES.intersection(update_fields)):
+                    old = self._stored_workload_row()
+                if adding and self.assignee_id is None and \
+                        self.component and \
+                        self.status not in DASHBOARD_CLOSED_STATUSES and \
+                        self.component.auto_assigns():
+                    self.assignee_id = AssigneeLoad.pick(
+                        self.project_id,
+                        issue_weight(self.priority, self.urgency),
+                    )
+                    old = self.workload_row()
+                    ''' Picking already added the issue to the workload.
+                    '''
+                super(Issue, self).save(*args, **kwargs)
+                if adding or old is not None:
+                    AssigneeLoad.move(
+                        old and workload(old),
+                        workload(self.workload_row()),
+                    )
+                if update_fields is None or 'title' in update_fields or \
+                        'description' in update_fields:
+                    self.index_similarity(self.title, self.description)
+            Project.issues_changed(project_id, self.project_id)
+
+    def index_similarity(self, title, description):
+        ''' Store the similarity buckets of the issue's title and description.
+        '''
+        IssueBucket.objects.filter(issue=self).delete()
+        IssueBucket.objects.bulk_create(
+            IssueBucket(issue=self, bucket=bucket)
+            for bucket in set(buckets(title, description))
+        )
+
+    def apply_changes(self, version=None, **changes):
+        ''' Write only the given fields, e.g. status=..., with one UPDATE and
+        take the next version. The large text fields are not rewritten unless
+        they changed. With a version, the update only happens if the issue
+        is still at that version; IssueConflict is raised otherwise. Without
+        changes only the modified date is touched.
+        '''
+        changes['modified'] = timezone.now()
+        changes.update(self.render_rich_text(changes))
+        with transaction.atomic():
+            if 'component' in changes:
+                changes.update(self._renumber(changes['component']))
+            database = self._database(
+                changes.get('project_id', self.project_id))
+            with transaction.atomic(using=database), use_database(database):
+                self._update(version, changes)
+            Project.issues_changed(
+                self.project_id, changes.get('project_id'))
+        if 'version' in changes:
+            self.version = (self.version if version is None else version) + 1
+            del changes['version']
+        for name, value in changes.items():
+            setattr(self, name, value)
+
+    def _update(self, version, changes):
+        ''' The UPDATE of apply_changes and what depends on it.
+        '''
+        old = None
+        if WORKLOAD_CHANGES.intersection(changes):
+            old = self._stored_workload_row()
+        if len(changes) > 1:
+            changes['version'] = models.F('version') + 1
+        rows = Issue.objects.filter(pk=self.pk)
+        if version is not None:
+            rows = rows.filter(version=version)
+        if not rows.update(**changes):
+            raise IssueConflict(self.pk)
+        if old is not None:
+            new = dict(old)
+            new.update(
+                (name, changes[name])
+                for name in WORKLOAD_FIELDS if name in changes)
+            if 'assignee' in changes:
+                new['assignee_id'] = getattr(
+                    changes['assignee'], 'pk', changes['assignee'])
+            AssigneeLoad.move(workload(old), workload(new))
+        if 'title' in changes or 'description' in changes:
+            self.index_similarity(
+                changes.get('title', self.title),
+                changes.get('description', self.description),
+            )
+
+
+class IssueBucket(models.Model):
+    '''A similarity bucket of an issue, see issuetrack.similarity.'''
+
+    issue = models.ForeignKey(Issue, on_delete=models.CASCADE)
+    ''' The issue whose title and description fall in the bucket.
+    '''
+    bucket = models.BigIntegerField(db_index=True)
+    ''' Hash of one band of the issue's MinHash signature.
+    '''
+
+    def __str__(self):
+        '''String repr of the issue bucket is the bucket's hash.'''
+        return str(self.bucket)
+
+
+class IssueLink(models.Model):
+    '''A typed link from one issue to another, e.g. TP1-1 blocks TP1-2.
+    Both issues live on the same database. The links of ISSUE_LINK_ACYCLIC
+    kinds are followed in IssueAncestor.'''
+
+    kind = models.PositiveSmallIntegerField('Kind', choices=ISSUE_LINK_KINDS)
+    ''' The kind of link, read from the source to the target.
+    '''
+    source = models.ForeignKey(
+        Issue, on_delete=models.CASCADE, related_name='links_from')
+    ''' The issue the link is from, e.g. the blocking issue.
+    '''
+    target = models.ForeignKey(
+        Issue, on_delete=models.CASCADE, related_name='links_to')
+    ''' The issue the link is to, e.g. the blocked issue.
+    '''
+    created = models.DateTimeField(auto_now_add=True)
+    ''' The date and time when the link was created.
+    '''
+
+    class Meta:
+        '''Meta properties of the IssueLink class go here.'''
+
+        unique_together = ('source', 'target', 'kind')
+        index_together = [('target', 'kind')]
+        ''' Serve the links from and to an issue.
+        '''
+
+    def __str__(self):
+        '''String repr of the link, e.g. TP1-1 Blocks TP1-2.'''
+        return '{} {} {}'.format(
+            self.source.key, self.get_kind_display(), self.target.key)
+
+    @classmethod
+    def add(cls, kind, source, target):
+        ''' Link the source issue to the target, or return the link there
+        is. A link of an ISSUE_LINK_ACYCLIC kind that would close a cycle
+        raises LinkCycle, which takes one indexed query on IssueAncestor.
+        A "relates to" link holds both ways.
+        '''
+        database = source._state.db
+        if source.pk == target.pk:
+            raise LinkCycle(source.pk)
+        if target._state.db != database:
+            raise ValueError(
+                'Issues {} and {} are on different databases and cannot be '
+                'linked.'.format(source.pk, target.pk))
+        links = cls.objects.using(database)
+        with transaction.atomic(using=database):
+            if kind in ISSUE_LINK_ACYCLIC:
+                IssueAncestor.lock(database, [source.pk, target.pk])
+                if IssueAncestor.objects.using(database).filter(
+                        kind=kind, ancestor=target, descendant=source,
+                ).exists():
+                    raise LinkCycle(source.pk)
+            else:
+                reverse = links.filter(
+                    kind=kind, source=target, target=source).first()
+                if reverse is not None:
+                    return reverse
+            link, created = links.get_or_create(
+                kind=kind, source=source, target=target)
+            if created and kind in ISSUE_LINK_ACYCLIC:
+                IssueAncestor.adjust(
+                    database, kind, source.pk, target.pk, 1)
+        return link
+
+    def delete(self, *args, **kwargs):
+        ''' Remove the link and the paths through it from IssueAncestor.
+        '''
+        database = kwargs.get('using') or self._state.db
+        with transaction.atomic(using=database):
+            if self.kind in ISSUE_LINK_ACYCLIC:
+                IssueAncestor.adjust(
+                    database, self.kind, self.source_id, self.target_id, -1)
+            return super(IssueLink, self).delete(*args, **kwargs)
+
+
+class IssueAncestor(models.Model):
+    '''An issue from which another is reached through links of one of the
+    ISSUE_LINK_ACYCLIC kinds, e.g. a blocker of a blocker of the issue. The
+    rows are the transitive closure of those links, kept up to date as
+    links are added and removed, so that every issue above or below one is
+    read with a single indexed query instead of a walk over the links.'''
+
+    kind = models.PositiveSmallIntegerField('Kind', choices=ISSUE_LINK_KINDS)
+    ''' The kind of the links followed.
+    '''
+    ancestor = models.ForeignKey(
+        Issue, on_delete=models.CASCADE, related_name='descendant_rows')
+    ''' The issue the links start from, e.g. a blocking issue.
+    '''
+    descendant = models.ForeignKey(
+        Issue, on_delete=models.CASCADE, related_name='ancestor_rows')
+    ''' The issue reached, e.g. an issue it blocks.
+    '''
+    paths = models.BigIntegerField(default=1)
+    ''' Number of distinct paths of links from the ancestor to the
+    descendant. Removing a link takes away the paths through it, and the row
+    goes when none are left, so that no walk is needed to tell whether the
+    issues are still connected.
+    '''
+
+    class Meta:
+        '''Meta properties of the IssueAncestor class go here.'''
+
+        unique_together = ('kind', 'ancestor', 'descendant')
+        index_together = [('kind', 'descendant', 'ancestor')]
+        ''' Serve the descendants and the ancestors of an issue.
+        '''
+
+    def __str__(self):
+        '''String repr of the row.'''
+        return '{} {} {} ({} paths)'.format(
+            self.ancestor_id, self.get_kind_display(), self.descendant_id,
+            self.paths)
+
+    @staticmethod
+    def lock(database, issue_ids):
+        ''' Lock the rows of the issues whose ancestors change until the
+        transaction ends, in the order of their ids, so that changes of
+        links sharing an issue are made one after the other.
+        '''
+        list(Issue._base_manager.using(database).select_for_update().filter(
+            pk__in=issue_ids).order_by('pk').values_list('pk', flat=True))
+
+    @classmethod
+    def adjust(cls, database, kind, source_id, target_id, sign):
+        ''' Add (sign 1) or take away (sign -1) the paths through a link
+        from the source to the target: every ancestor of the source, and
+        the source, reaches every descendant of the target, and the target,
+        once for each path to the source times each path from the target.
+        Must be called in a transaction on the database.
+        '''
+        rows = cls.objects.using(database).filter(kind=kind)
+        above = [(source_id, 1)] + list(rows.filter(
+            descendant_id=source_id).values_list('ancestor_id', 'paths'))
+        below = [(target_id, 1)] + list(rows.filter(
+            ancestor_id=target_id).values_list('descendant_id', 'paths'))
+        cls.lock(database, [pk for pk, paths in above + below])
+        paths = dict(
+            ((ancestor, descendant), sign * up * down)
+            for ancestor, up in above for descendant, down in below
+        )
+        existing = rows.filter(
+            ancestor_id__in=[pk for pk, up in above],
+            descendant_id__in=[pk for pk, down in below],
+        )
+        for ancestor, descendant, count in existing.values_list(
+                'ancestor_id', 'descendant_id', 'paths'):
+            paths[ancestor, descendant] += count
+        existing.delete()
+        cls.objects.using(database).bulk_create(
+            cls(kind=kind, ancestor_id=ancestor, descendant_id=descendant,
+                paths=count)
+            for (ancestor, descendant), count in sorted(paths.items())
+            if count > 0
+        )
 
-class Comment(models.Model):
+
+@receiver(pre_delete, sender=Issue)
+def unlink_issue(sender, instance, using, **kwargs):
+    ''' Remove the links of an issue about to be deleted, and with them the
+    paths through it between other issues. Archived issues keep no links.
+    '''
+    for link in IssueLink.objects.using(using).filter(
+            models.Q(source=instance) | models.Q(target=instance)):
+        link.delete(using=using)
+
+
+class AssigneeLoad(models.Model):
+    '''Workload of a user in a project: the weights of the open issues
+    assigned to them, kept up to date as issues change, so that new issues
+    are auto-assigned with one indexed lookup instead of counting the
+    issues of every member.'''
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    ''' The project the issues belong to.
+    '''
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+')
+    ''' The assignee.
+    '''
+    load = models.IntegerField(default=0)
+    ''' Sum of the weights of the user's open issues in the project, see
+    issue_weight.
+    '''
+    member = models.BooleanField(default=False)
+    ''' Whether the user is one of the project's members, who are the ones
+    picked for new issues.
+    '''
+    assigned = models.DateTimeField(default=timezone.now)
+    ''' The date and time when the user was last picked. Of the members
+    with the same workload, the one waiting the longest is picked.
+    '''
+
+    class Meta:
+        '''Meta properties of the AssigneeLoad class go here.'''
+
+        unique_together = ('project', 'user')
+        index_together = [('project', 'member', 'load', 'assigned')]
+        ''' Serves AssigneeLoad.pick.
+        '''
+
+    def __str__(self):
+        '''String repr of the workload.'''
+        return '{} in {}: {}'.format(self.user, self.project, self.load)
+
+    @classmethod
+    def adjust(cls, project_id, user_id, delta):
+        ''' Add delta to a user's workload in a project.
+        '''
+        if not delta:
+            return
+        rows = cls.objects.filter(project_id=project_id, user_id=user_id)
+        if rows.update(load=models.F('load') + delta):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    project_id=project_id,
+                    user_id=user_id,
+                    load=delta,
+                    member=Project.members.through.objects.filter(
+                        project_id=project_id, user_id=user_id).exists(),
+                )
+        except IntegrityError:
+            rows.update(load=models.F('load') + delta)
+            ''' Created by a concurrent request meanwhile.
+            '''
+
+    @classmethod
+    def move(cls, old, new):
+        ''' Update the workloads for an issue whose workload changed from
+        old to new, both (project id, assignee id, weight) or None.
+        '''
+        old_key, old_weight = (old[:2], old[2]) if old else (None, 0)
+        new_key, new_weight = (new[:2], new[2]) if new else (None, 0)
+        if old_key == new_key:
+            if old_key is not None:
+                cls.adjust(old_key[0], old_key[1], new_weight - old_weight)
+            return
+        if old_key is not None:
+            cls.adjust(old_key[0], old_key[1], -old_weight)
+        if new_key is not None:
+            cls.adjust(new_key[0], new_key[1], new_weight)
+
+    @classmethod
+    def pick(cls, project_id, weight):
+        ''' Take the member of a project with the lowest workload, add
+        weight to it and return their user id, or None if the project has
+        no members. The workload is only raised if it is still the one
+        read, so concurrent requests never both take the same member for
+        the same workload; the one that finds it changed reads again. After
+        AUTO_ASSIGN_RETRIES such reads the member's row is locked instead.
+        '''
+        members = cls.objects.filter(
+            project_id=project_id, member=True,
+        ).order_by('load', 'assigned')
+        for attempt in range(AUTO_ASSIGN_RETRIES):
+            row = members.values_list('pk', 'user_id', 'load').first()
+            if row is None:
+                return None
+            pk, user_id, load = row
+            if cls.objects.filter(pk=pk, load=load).update(
+                    load=models.F('load') + weight, assigned=timezone.now()):
+                return user_id
+        with transaction.atomic(using=router.db_for_write(cls)):
+            row = members.select_for_update().first()
+            if row is None:
+                return None
+            row.load = models.F('load') + weight
+            row.assigned = timezone.now()
+            row.save(update_fields=['load', 'assigned'])
+            return row.user_id
+
+    @classmethod
+    def rebuild(cls, project_id):
+        ''' Compute the workloads of a project again from its live issues,
+        e.g. after a component was deleted.
+        '''
+        loads = Counter()
+        with use_database(Project.database_for(project_id)):
+            groups = list(Issue.objects.live().filter(
+                project_id=project_id, assignee__isnull=False,
+            ).exclude(
+                status__in=DASHBOARD_CLOSED_STATUSES,
+            ).order_by().values(
+                'assignee', 'priority', 'urgency',
+            ).annotate(count=Count('pk')))
+        for group in groups:
+            loads[group['assignee']] += group['count'] * issue_weight(
+                group['priority'], group['urgency'])
+        with transaction.atomic():
+            rows = cls.objects.select_for_update().filter(
+                project_id=project_id)
+            current = dict(rows.values_list('user_id', 'load'))
+            for user_id in set(current) | set(loads):
+                cls.adjust(
+                    project_id, user_id,
+                    loads[user_id] - current.get(user_id, 0))
+
+
+@receiver(m2m_changed, sender=Project.members.through)
+def members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    ''' Keep AssigneeLoad.member in step with the members of the projects.
+    '''
+    if action == 'post_clear':
+        field = 'user' if reverse else 'project'
+        AssigneeLoad.objects.filter(**{field: instance}).update(member=False)
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+    pairs = [
+        (pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+    for project_id, user_id in pairs:
+        rows = AssigneeLoad.objects.filter(
+            project_id=project_id, user_id=user_id)
+        if rows.update(member=action == 'post_add') or \
+                action == 'post_remove':
+            continue
+        try:
+            with transaction.atomic():
+                AssigneeLoad.objects.create(
+                    project_id=project_id, user_id=user_id, member=True)
+        except IntegrityError:
+            rows.update(member=True)
+
+
+class Comment(RichTextModel):
     '''Associated comment for an issue.'''
 
     issue = models.ForeignKey(Issue, on_delete=models.CASCADE)
@@ -150,6 +1022,9 @@ class Comment(models.Model):
     text = models.TextField('Comment')
     ''' The comment's text.
     '''
+    text_html = models.TextField(default='', editable=False)
+    ''' Sanitized HTML of the text, shown on the issue's page.
+    '''
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     ''' User who created the comment.
     '''
@@ -165,7 +1040,29 @@ class Comment(models.Model):
     ''' Who the comment is intended for.
     '''
 
-    issue_status = models.CharField('Current Issue Status', max_length=30)
+    issue_status = models.PositiveSmallIntegerField(
+        'Current Issue Status', choices=ISSUE_STATUSES)
+    ''' The status the issue was set to with this comment.
+    '''
+
+    rich_text_fields = ('text',)
+
+    class Meta:
+        '''Meta properties of the Comment class go here.'''
+
+        index_together = [('modified', 'id')]
+        ''' Serves the change feed.
+        '''
+
+    def save(self, *args, **kwargs):
+        ''' Give a new comment its id, see Sequence, and save it on the
+        database of its issue, which setting the issue chose. Callers
+        writing in a transaction take the id before they open it.
+        '''
+        Sequence.assign([self], ArchivedComment)
+        if DATABASE_SHARDS and self._state.db:
+            kwargs['using'] = self._state.db
+        return super(Comment, self).save(*args, **kwargs)
 
     def __str__(self):
         '''String repr of the comment. Includes the issue title, comment
@@ -174,3 +1071,681 @@ class Comment(models.Model):
         return 'Comment for "{}" by {} at {}'.format(
             self.issue.title, self.author, self.created
         )
+
+
+class ArchivedIssue(RichTextModel):
+    '''An issue in a terminal status moved out of the Issue table by the
+    archive_issues command. It keeps the id of the original issue, is shown
+    read-only and is moved back to the Issue table when reopened.
+    '''
+
+    id = models.IntegerField(primary_key=True)
+    ''' Id of the original issue.
+    '''
+    title = models.CharField('Title', max_length=255)
+    description = models.TextField('Description')
+    steps = models.TextField('Steps to Replicate Issue', null=True, blank=True)
+    observed = models.TextField('Observed Behavior', null=True, blank=True)
+    expected = models.TextField('Expected Behavior', null=True, blank=True)
+    kind = models.PositiveSmallIntegerField('Type', choices=ISSUE_KINDS)
+    priority = models.PositiveSmallIntegerField(
+        'Priority', choices=ISSUE_PRIORITIES)
+    urgency = models.PositiveSmallIntegerField(
+        'Urgency', choices=ISSUE_URGENCIES)
+    status = models.PositiveSmallIntegerField(
+        'Status', choices=ISSUE_STATUSES)
+    creater = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+')
+    assignee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    created = models.DateTimeField()
+    modified = models.DateTimeField()
+    component = models.ForeignKey(
+        Component, on_delete=models.CASCADE, null=True, blank=True
+    )
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='+',
+    )
+    number = models.PositiveIntegerField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=1)
+    description_html = models.TextField(default='')
+    steps_html = models.TextField(default='')
+    observed_html = models.TextField(default='')
+    expected_html = models.TextField(default='')
+    ''' Same fields as the Issue the row was archived from.
+    '''
+    archived = models.DateTimeField(auto_now_add=True)
+    ''' The date and time when the issue was archived.
+    '''
+
+    objects = IssueQuerySet.as_manager()
+
+    rich_text_fields = Issue.rich_text_fields
+
+    class Meta:
+        '''Meta properties of the ArchivedIssue class go here.'''
+
+        unique_together = ('project', 'number')
+        ''' Archived issues are still found by their key.
+        '''
+
+    def __str__(self):
+        '''String repr of the archived issue using the issue's title.'''
+        return self.title
+
+    key = Issue.key
+
+
+class ArchivedComment(RichTextModel):
+    '''A comment moved to the archive together with its issue.'''
+
+    id = models.IntegerField(primary_key=True)
+    ''' Id of the original comment.
+    '''
+    issue = models.ForeignKey(ArchivedIssue, on_delete=models.CASCADE)
+    text = models.TextField('Comment')
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+')
+    created = models.DateTimeField()
+    modified = models.DateTimeField()
+    audience = models.CharField(
+        'Audience', max_length=30, choices=COMMENT_AUDIENCES)
+    issue_status = models.PositiveSmallIntegerField(
+        'Current Issue Status', choices=ISSUE_STATUSES)
+    text_html = models.TextField(default='')
+    ''' Same fields as the Comment the row was archived from.
+    '''
+
+    rich_text_fields = Comment.rich_text_fields
+
+    def __str__(self):
+        '''String repr of the archived comment.'''
+        return 'Archived comment {} by {} at {}'.format(
+            self.id, self.author, self.created
+        )
+
+
+class Blob(models.Model):
+    '''Content of one or more attachments, stored once.'''
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    ''' SHA-256 of the content, which also names the file.
+    '''
+    size = models.BigIntegerField()
+    ''' Size of the content in bytes.
+    '''
+    created = models.DateTimeField(auto_now_add=True)
+    ''' The date and time when the content was first uploaded.
+    '''
+
+    def __str__(self):
+        '''String repr of the blob is its hash.'''
+        return self.sha256
+
+
+class Attachment(models.Model):
+    '''A file attached to an issue or to one of its comments.'''
+
+    issue = models.ForeignKey(
+        Issue, on_delete=models.DO_NOTHING, db_constraint=False)
+    ''' Issue the file is attached to. Not a database constraint, so that
+    attachments stay in place while their issue is archived; purge_deleted
+    removes them.
+    '''
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+    )
+    ''' Comment the file was attached with, if any.
+    '''
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT)
+    ''' The stored content.
+    '''
+    name = models.CharField('Name', max_length=255)
+    ''' File name given by the uploader.
+    '''
+    content_type = models.CharField(max_length=100)
+    ''' Content type given by the uploader.
+    '''
+    uploader = models.ForeignKey(User, on_delete=models.CASCADE)
+    ''' The user who attached the file.
+    '''
+    created = models.DateTimeField(auto_now_add=True)
+    ''' The date and time when the file was attached.
+    '''
+
+    def __str__(self):
+        '''String repr of the attachment is its file name.'''
+        return self.name
+
+
+class MailMessage(models.Model):
+    '''An email ingested by the ingest_mail command.'''
+
+    message_id = models.CharField(max_length=255, unique=True)
+    ''' Message-ID of the email. Emails already ingested are skipped, and
+    replies are threaded onto the issue of the email they answer.
+    '''
+    issue = models.ForeignKey(
+        Issue, on_delete=models.DO_NOTHING, db_constraint=False)
+    ''' Issue the email was added to, as the issue or as a comment. Not a
+    database constraint, so that the record stays while the issue is
+    archived and the email is not added again.
+    '''
+    created = models.DateTimeField(auto_now_add=True)
+    ''' The date and time when the email was ingested.
+    '''
+
+    def __str__(self):
+        '''String repr of the mail message is its Message-ID.'''
+        return self.message_id
+
+
+class Webhook(models.Model):
+    '''A URL the events of a project's issues are posted to.'''
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    ''' Project whose issues and comments are reported.
+    '''
+    url = models.URLField('URL', max_length=500)
+    ''' Receiver of the events.
+    '''
+    secret = models.CharField(
+        'Secret',
+        max_length=100,
+        help_text='Key of the HMAC-SHA256 signature sent with each request.',
+    )
+    ''' Shared with the receiver, which checks the signature with it.
+    '''
+    events = models.CharField(
+        'Events',
+        max_length=200,
+        blank=True,
+        help_text='Comma separated events to send, e.g. issue.created, '
+        + 'comment.created. All events are sent if empty.',
+    )
+    ''' Events the receiver subscribed to.
+    '''
+    batch_size = models.PositiveSmallIntegerField(
+        'Batch Size',
+        default=1,
+        help_text='Most events sent in one request.',
+    )
+    ''' Number of queued events sent together at most.
+    '''
+    active = models.BooleanField(default=True)
+    ''' Inactive webhooks get no new events and keep their queue.
+    '''
+    failures = models.PositiveIntegerField(default=0, editable=False)
+    ''' Failed deliveries in a row, which set the delay of the next one.
+    '''
+    retry_at = models.DateTimeField(null=True, blank=True, editable=False)
+    ''' Earliest time of the next delivery after a failure.
+    '''
+    locked_until = models.DateTimeField(
+        null=True, blank=True, editable=False)
+    ''' Set by the worker delivering the events, so a receiver gets one
+    request at a time and its events in order.
+    '''
+
+    def __str__(self):
+        '''String repr of the webhook is its URL.'''
+        return self.url
+
+    def wants(self, event):
+        ''' Whether the receiver subscribed to the event.
+        '''
+        return not self.events.strip() or \
+            event in [name.strip() for name in self.events.split(',')]
+
+
+class WebhookEvent(models.Model):
+    '''An event queued for delivery to a webhook.'''
+
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE)
+    ''' The webhook the event is sent to.
+    '''
+    payload = models.TextField()
+    ''' The event as JSON.
+    '''
+    created = models.DateTimeField(auto_now_add=True)
+    ''' The date and time when the event was queued.
+    '''
+    attempts = models.PositiveSmallIntegerField(default=0)
+    ''' Failed deliveries of the event so far.
+    '''
+
+    def __str__(self):
+        '''String repr of the webhook event is its payload.'''
+        return self.payload
+
+
+class Watch(models.Model):
+    '''A user following an issue, or every issue of a project. The events
+    of the watched issues are sent to them in digests, see
+    issuetrack.digests. Users watch what they can see: staff and superusers
+    any issue, other users the issues they created, see can_watch. Any
+    user can watch a project, but only hears about the issues they can
+    see.'''
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    ''' The watching user.
+    '''
+    issue = models.ForeignKey(
+        Issue,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+    )
+    ''' The issue watched, if any. Not a database constraint, so that the
+    watch is kept on the primary while the issue is on a shard or archived;
+    purge_deleted removes it.
+    '''
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, null=True, blank=True)
+    ''' The project whose issues are all watched, if any.
+    '''
+    created = models.DateTimeField(default=timezone.now)
+    ''' The date and time when the user started watching. Earlier events
+    are not sent to them.
+    '''
+
+    class Meta:
+        '''Meta properties of the Watch class go here.'''
+
+        unique_together = [('user', 'issue'), ('user', 'project')]
+        index_together = [('issue', 'user'), ('project', 'user')]
+        ''' Serve the watchers of an issue or project, which the digests
+        join with the events.
+        '''
+
+    def __str__(self):
+        '''String repr of the watch.'''
+        return '{} watches {}'.format(
+            self.user, 'issue {}'.format(self.issue_id)
+            if self.issue_id else 'project {}'.format(self.project_id))
+
+    @staticmethod
+    def can_watch(user, issue):
+        ''' Whether the user can see, and so watch, the issue.
+        '''
+        return user.is_staff or user.is_superuser or \
+            user.id == issue.creater_id
+
+    @classmethod
+    def toggle(cls, user, **watched):
+        ''' Start watching the issue or project given as keyword, or stop
+        if the user watches it. Returns whether the user now watches it.
+        '''
+        if cls.objects.filter(user=user, **watched).delete()[0]:
+            return False
+        cls.objects.get_or_create(user=user, **watched)
+        return True
+
+
+class WatchEvent(models.Model):
+    '''Something that happened to an issue, written once for all of its
+    watchers and collected into their digests.'''
+
+    issue = models.ForeignKey(
+        Issue, on_delete=models.DO_NOTHING, db_constraint=False)
+    ''' The issue concerned. Not a database constraint, like Watch.issue.
+    '''
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, null=True, blank=True)
+    ''' Project of the issue, for the project's watchers.
+    '''
+    actor = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True)
+    ''' The user who caused the event, who is not told about it.
+    '''
+    creater = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    ''' Creator of the issue, the only user besides staff who can see it
+    and so hear about the event, see Watch.can_watch.
+    '''
+    event = models.CharField(max_length=30)
+    ''' Name of the event, as sent to webhooks, e.g. comment.created.
+    '''
+    audience = models.CharField(
+        'Audience', max_length=30, choices=COMMENT_AUDIENCES,
+        default='Public')
+    ''' Who hears about the event: private events only reach staff.
+    '''
+    heading = models.CharField(max_length=300)
+    ''' Key and title of the issue when the event happened.
+    '''
+    text = models.TextField()
+    ''' One line describing the event.
+    '''
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+    ''' The date and time of the event. Digests collect the events by it.
+    '''
+
+    def __str__(self):
+        '''String repr of the event.'''
+        return '{}: {}'.format(self.heading, self.text)
+
+
+class Digest(models.Model):
+    '''The last digest of events sent to a user.'''
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True)
+    ''' The user the digest was sent to.
+    '''
+    until = models.DateTimeField()
+    ''' Events up to this date and time were sent. The next digest starts
+    after it.
+    '''
+
+    def __str__(self):
+        '''String repr of the digest.'''
+        return 'Digest of {} until {}'.format(self.user, self.until)
+
+
+class RequestProfile(models.Model):
+    '''Profile of a request taken by issuetrack.profiling. Only the latest
+    PROFILE_BUFFER_SIZE profiles are kept, each new one replacing the
+    oldest.'''
+
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+    ''' The date and time when the request was made.
+    '''
+    method = models.CharField(max_length=10)
+    ''' HTTP method of the request.
+    '''
+    path = models.CharField(max_length=255)
+    ''' Path and query string of the request.
+    '''
+    username = models.CharField(max_length=150, blank=True)
+    ''' User who made the request, empty if anonymous.
+    '''
+    status = models.PositiveSmallIntegerField()
+    ''' HTTP status of the response.
+    '''
+    duration = models.FloatField()
+    ''' Milliseconds the view took, as measured under the profiler.
+    '''
+    query_count = models.PositiveIntegerField()
+    ''' Number of SQL queries the view made.
+    '''
+    query_time = models.FloatField()
+    ''' Milliseconds the SQL queries took.
+    '''
+    stats = models.TextField()
+    ''' The profiler's report: the functions by cumulative time and the
+    functions each of them called.
+    '''
+    queries = models.TextField()
+    ''' JSON list of the queries as [database, milliseconds, sql].
+    '''
+    templates = models.TextField()
+    ''' JSON list of the templates rendered as [name, milliseconds], the
+    time including that of the templates they include.
+    '''
+
+    def __str__(self):
+        '''String repr of the profile is its request.'''
+        return '{} {} at {}'.format(self.method, self.path, self.created)
+
+    @classmethod
+    def record(cls, size, **fields):
+        ''' Store a profile, replacing the oldest once size are stored. The
+        replacing profile takes the current time, so that it is the newest.
+        '''
+        fields.setdefault('created', timezone.now())
+        with transaction.atomic(using=router.db_for_write(cls)):
+            if cls.objects.count() < size:
+                return cls.objects.create(**fields)
+            oldest = cls.objects.select_for_update().order_by(
+                'created', 'pk').first()
+            for name, value in fields.items():
+                setattr(oldest, name, value)
+            oldest.save()
+            return oldest
+
+
+class SlowQuery(models.Model):
+    '''SQL query found slower than SLOW_QUERY_MS by
+    issuetrack.slowqueries, with the queries of the same fingerprint
+    counted together.'''
+
+    fingerprint = models.CharField(max_length=40, unique=True)
+    ''' SHA-1 of the normalized SQL.
+    '''
+    sql = models.TextField()
+    ''' The SQL with its literals and lists of parameters replaced.
+    '''
+    example = models.TextField()
+    ''' The slowest query seen, with its parameters.
+    '''
+    database = models.CharField(max_length=100)
+    ''' Alias of the database the slowest query ran on.
+    '''
+    view = models.CharField(max_length=255, blank=True)
+    ''' Dotted path of the view that made the slowest query.
+    '''
+    url_name = models.CharField(max_length=100, blank=True)
+    ''' Name of the URL the view was called by.
+    '''
+    parameters = models.TextField(default='{}')
+    ''' JSON of the view's arguments and the query string of the
+    request.
+    '''
+    plan = models.TextField(blank=True)
+    ''' The database's EXPLAIN output for the slowest query.
+    '''
+    count = models.PositiveIntegerField(default=0)
+    ''' Number of slow queries seen.
+    '''
+    total_time = models.FloatField(default=0)
+    ''' Milliseconds the slow queries took together.
+    '''
+    max_time = models.FloatField(default=0)
+    ''' Milliseconds the slowest query took.
+    '''
+    timings = models.TextField(default='[]')
+    ''' JSON list of the milliseconds of the latest SLOW_QUERY_SAMPLES
+    slow queries, from which the percentiles are taken.
+    '''
+    first_seen = models.DateTimeField(default=timezone.now)
+    ''' The date and time of the first slow query.
+    '''
+    last_seen = models.DateTimeField(default=timezone.now)
+    ''' The date and time of the latest slow query.
+    '''
+
+    def __str__(self):
+        '''String repr of the slow query is its SQL.'''
+        return self.sql
+
+
+class Sequence(models.Model):
+    '''Last id given to the rows of a sharded model. With DATABASE_SHARDS
+    the ids of issues and comments are taken from here instead of from each
+    database, so that an id names one row across all of them and the row
+    keeps it when its project is moved.'''
+
+    name = models.CharField(max_length=100, primary_key=True)
+    ''' Label of the model, e.g. issuetrack.issue.
+    '''
+    last = models.BigIntegerField(default=0)
+    ''' Last id given.
+    '''
+
+    def __str__(self):
+        '''String repr of the sequence.'''
+        return '{}: {}'.format(self.name, self.last)
+
+    @classmethod
+    def assign(cls, objects, *archives):
+        ''' Give the objects without a primary key the next ids of their
+        model if issues are sharded. The models in archives share the ids,
+        e.g. ArchivedIssue with Issue. Callers take the ids before they open
+        their transaction, so that the counter's row is not locked while
+        they write.
+        '''
+        objects = [obj for obj in objects if obj.pk is None]
+        if not DATABASE_SHARDS or not objects:
+            return
+        model = type(objects[0])
+        rows = cls.objects.using(DATABASE_PRIMARY).filter(
+            name=model._meta.label_lower)
+        count = len(objects)
+        if not rows.exists():
+            start = max(
+                other._base_manager.using(alias).aggregate(
+                    last=Max('pk'))['last'] or 0
+                for other in (model,) + archives
+                for alias in issue_databases()
+            )
+            ''' The first ids follow those the databases gave out before.
+            '''
+            try:
+                with transaction.atomic(using=DATABASE_PRIMARY):
+                    rows.create(name=model._meta.label_lower, last=start)
+            except IntegrityError:
+                pass
+                ''' Created by a concurrent request meanwhile.
+                '''
+        with transaction.atomic(using=DATABASE_PRIMARY):
+            last = rows.select_for_update().values_list(
+                'last', flat=True).get() + count
+            rows.update(last=last)
+        ''' The row stays locked from reading the last id to writing the
+        new one, so concurrent callers never take the same ids.
+        '''
+        for pk, obj in enumerate(objects, last - count + 1):
+            obj.pk = pk
+
+
+_tombstones = threading.local()
+''' Whether the current thread records no tombstones, see
+without_tombstones.
+'''
+
+
+@contextmanager
+def without_tombstones():
+    ''' Record no tombstones for the rows deleted within, such as issues
+    moved to the archive or to another database, or the rows below a
+    project or component whose own tombstone was recorded when it was
+    deleted.
+    '''
+    suppressed = getattr(_tombstones, 'suppressed', False)
+    _tombstones.suppressed = True
+    try:
+        yield
+    finally:
+        _tombstones.suppressed = suppressed
+
+
+class Tombstone(models.Model):
+    '''Record of a deleted project, component, issue or comment, reported
+    by the change feed so that copies of the rows are deleted too. The
+    tombstone of a project or component stands for the rows below it.'''
+
+    kind = models.CharField(max_length=20)
+    ''' Model name of the deleted row, e.g. issue.
+    '''
+    object_id = models.BigIntegerField()
+    ''' Id of the deleted row.
+    '''
+    deleted = models.DateTimeField(default=timezone.now)
+    ''' The date and time when the row was deleted.
+    '''
+
+    class Meta:
+        '''Meta properties of the Tombstone class go here.'''
+
+        index_together = [('deleted', 'id')]
+        ''' Serves the change feed.
+        '''
+
+    def __str__(self):
+        '''String repr of the tombstone.'''
+        return '{} {} deleted at {}'.format(
+            self.kind, self.object_id, self.deleted)
+
+    @classmethod
+    def record(cls, model, ids):
+        ''' Record the deletion of the rows of model with the given ids.
+        '''
+        now = timezone.now()
+        cls.objects.bulk_create([
+            cls(kind=model._meta.model_name, object_id=pk, deleted=now)
+            for pk in ids
+        ])
+
+
+TOMBSTONE_MODELS = (Project, Component, Issue, Comment)
+''' Models whose deleted rows are recorded as tombstones.
+'''
+
+
+@receiver(post_delete)
+def record_tombstone(sender, instance, using, **kwargs):
+    ''' Record a tombstone for a row deleted outright, e.g. from the admin
+    or with the user it belongs to. Copies of projects and components on
+    the shards are not recorded.
+    '''
+    if sender not in TOMBSTONE_MODELS or \
+            getattr(_tombstones, 'suppressed', False):
+        return
+    if sender in (Project, Component) and using != DATABASE_PRIMARY:
+        return
+    Tombstone.record(sender, [instance.pk])
+
+
+REFERENCE_MODELS = (User, Project, Component)
+''' Models kept on the primary and copied to every shard, where the sharded
+rows refer to them.
+'''
+
+
+def copy_to_shards(objects):
+    ''' Copy rows of REFERENCE_MODELS from the primary to the shards.
+    '''
+    aliases = [
+        alias for alias in DATABASE_SHARDS if alias != DATABASE_PRIMARY]
+    for obj in objects:
+        database = obj._state.db
+        for alias in aliases:
+            obj.save_base(raw=True, using=alias)
+        obj._state.db = database
+
+
+@receiver(post_save)
+def reference_saved(sender, instance, using, **kwargs):
+    ''' Copy the users, projects and components saved on the primary.
+    '''
+    if sender in REFERENCE_MODELS and using == DATABASE_PRIMARY:
+        copy_to_shards([instance])
+
+
+@receiver(post_delete)
+def reference_deleted(sender, instance, using, **kwargs):
+    ''' Delete the copies of users, projects and components deleted on the
+    primary.
+    '''
+    if sender not in REFERENCE_MODELS or using != DATABASE_PRIMARY:
+        return
+    for alias in DATABASE_SHARDS:
+        if alias != DATABASE_PRIMARY:
+            sender._base_manager.using(alias).filter(pk=instance.pk).delete()
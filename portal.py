@@ -0,0 +1,81 @@
+''' The read-only public portal of the projects that opt in.
+
+A project with Project.public set shows its issues and their public
+comments to anyone at /public/<key>/, without logging in. The pages
+depend on nothing of the visitor: they are rendered without the request,
+so no session or CSRF cookie is read and no Vary: Cookie is added, and
+they are sent with Cache-Control: public, so browsers, reverse proxies
+and CDNs may share them for PORTAL_MAX_AGE seconds.
+
+Rendered pages are kept in PORTAL_CACHE together with the version of
+their project's portal, a random token kept under
+Project.portal_cache_key. Project.issues_changed, called by every write of
+the project's issues and comments, drops the token, which outdates every
+page of the project at once. A page whose version is current is served
+without a database query, and its ETag, made from the version, lets
+shared caches revalidate it with 304 Not Modified responses.
+'''
+
+from __future__ import absolute_import
+
+import hashlib
+import uuid
+
+from django.core.cache import caches
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from issuetrack.models import Project
+from issuetrack.settings import PORTAL_CACHE, PORTAL_CACHE_TIMEOUT
+from issuetrack.settings import PORTAL_MAX_AGE
+
+
+def page_cache_key(key, page):
+    ''' Cache key of a rendered page of the portal of the project with the
+    given key.
+    '''
+    return 'issuetrack:portal:page:{}:{}'.format(key, page)
+
+
+def portal_version(project_id):
+    ''' The current version of a project's portal pages.
+    '''
+    cache = caches[PORTAL_CACHE]
+    cache_key = Project.portal_cache_key(project_id)
+    cache.add(cache_key, uuid.uuid4().hex, None)
+    return cache.get(cache_key)
+
+
+def serve(request, key, page, build):
+    ''' The response for a page of the portal of the project with the given
+    key. The page is rendered from the template file and context returned
+    by build(project) unless the cache holds it at the current version.
+    build raises Http404 for pages that do not exist.
+    '''
+    cache = caches[PORTAL_CACHE]
+    cache_key = page_cache_key(key, page)
+    cached = cache.get(cache_key)
+    if cached is None or cached['version'] != cache.get(
+            Project.portal_cache_key(cached['project_id'])):
+        project = Project.objects.filter(key=key, public=True).first()
+        if project is None:
+            raise Http404('No public project has this key.')
+        version = portal_version(project.pk)
+        template_file, context = build(project)
+        cached = {
+            'project_id': project.pk,
+            'version': version,
+            'etag': hashlib.sha1(
+                '{}:{}'.format(version, page).encode()).hexdigest(),
+            'content': render_to_string(template_file, context),
+        }
+        cache.set(cache_key, cached, PORTAL_CACHE_TIMEOUT)
+    if cached['etag'] in parse_etags(
+            request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(cached['content'])
+    response['ETag'] = quote_etag(cached['etag'])
+    patch_cache_control(response, public=True, max_age=PORTAL_MAX_AGE)
+    return response
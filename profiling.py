@@ -0,0 +1,160 @@
+''' Profiling requests on demand.
+
+ProfilingMiddleware runs a view under cProfile when a staff user adds
+?profile=1 (see PROFILE_QUERY_FLAG) to the URL, or when the request is
+picked by the sample rate, PROFILE_SAMPLE_RATE or the rate a superuser
+set on the profiles page. The profiler's report, the SQL queries with
+their timings and the templates rendered with theirs are stored as a
+RequestProfile, of which the latest PROFILE_BUFFER_SIZE are kept, and are
+shown to staff on the profiles page. A profiled request of a staff user
+names its profile in the X-Issuetrack-Profile header.
+
+Add 'issuetrack.profiling.ProfilingMiddleware' at the end of
+MIDDLEWARE_CLASSES, below the authentication middleware and the database
+routing middleware, whose choices the profiled view needs.
+'''
+
+from __future__ import absolute_import
+
+import cProfile
+import json
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from django.core.cache import caches
+from django.core.urlresolvers import reverse
+from django.db import connections
+from django.template.base import Template
+from django.utils.six import StringIO
+from issuetrack.models import RequestProfile
+from issuetrack.settings import PROFILE_BUFFER_SIZE, PROFILE_CACHE
+from issuetrack.settings import PROFILE_QUERY_FLAG, PROFILE_SAMPLE_RATE
+from issuetrack.settings import PROFILE_STATS_LINES
+
+RATE_KEY = 'issuetrack:profile:rate'
+''' Cache key of the sample rate set on the profiles page.
+'''
+
+RATE_REFRESH = 10
+''' Seconds each worker keeps the sample rate before reading it again.
+'''
+
+_rate = {'value': PROFILE_SAMPLE_RATE, 'read': 0}
+''' The worker's copy of the sample rate and when it was read.
+'''
+
+_profiling = threading.local()
+''' The templates rendered by the current thread's profiled request.
+'''
+
+
+def sample_rate():
+    ''' The share of requests profiled.
+    '''
+    if time.time() - _rate['read'] > RATE_REFRESH:
+        _rate['value'] = caches[PROFILE_CACHE].get(
+            RATE_KEY, PROFILE_SAMPLE_RATE)
+        _rate['read'] = time.time()
+    return _rate['value']
+
+
+def set_sample_rate(rate):
+    ''' Set the share of requests profiled by every worker.
+    '''
+    caches[PROFILE_CACHE].set(RATE_KEY, rate, None)
+    _rate['read'] = 0
+
+
+def _timed(render):
+    ''' Wrap Template.render to time the templates of profiled requests.
+    '''
+    @wraps(render)
+    def timed_render(self, context):
+        templates = getattr(_profiling, 'templates', None)
+        if templates is None:
+            return render(self, context)
+        started = time.time()
+        try:
+            return render(self, context)
+        finally:
+            templates.append(
+                [self.name, round((time.time() - started) * 1000, 3)])
+    timed_render.profiling = True
+    return timed_render
+
+
+def _report(profiler):
+    ''' The profiler's report: the functions by cumulative time, then the
+    functions each of them called.
+    '''
+    stream = StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(PROFILE_STATS_LINES)
+    stats.print_callees(PROFILE_STATS_LINES)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware(object):
+    ''' Profile the views of the requests asked for or sampled.
+    '''
+
+    def __init__(self):
+        if not getattr(Template.render, 'profiling', False):
+            Template.render = _timed(Template.render)
+
+    def process_view(self, request, view, view_args, view_kwargs):
+        staff = request.user.is_staff or request.user.is_superuser
+        if not (staff and request.GET.get(PROFILE_QUERY_FLAG)) and \
+                random.random() >= sample_rate():
+            return None
+        databases = list(connections.all())
+        saved = [
+            (connection.force_debug_cursor, connection.queries_logged,
+             connection.queries_log)
+            for connection in databases
+        ]
+        for connection in databases:
+            connection.force_debug_cursor = True
+            connection.queries_log = deque(
+                maxlen=connection.queries_log.maxlen)
+        _profiling.templates = []
+        profiler = cProfile.Profile()
+        started = time.time()
+        try:
+            response = profiler.runcall(
+                view, request, *view_args, **view_kwargs)
+        finally:
+            duration = (time.time() - started) * 1000
+            templates = _profiling.templates
+            del _profiling.templates
+            queries = []
+            for connection, (debug, logged, log) in zip(databases, saved):
+                queries.extend(
+                    [connection.alias, float(query['time']) * 1000,
+                     query['sql']]
+                    for query in connection.queries_log)
+                if logged:
+                    log.extend(connection.queries_log)
+                connection.force_debug_cursor = debug
+                connection.queries_log = log
+        profile = RequestProfile.record(
+            PROFILE_BUFFER_SIZE,
+            method=request.method,
+            path=request.get_full_path()[:255],
+            username=request.user.get_username(),
+            status=response.status_code,
+            duration=duration,
+            query_count=len(queries),
+            query_time=sum(query[1] for query in queries),
+            stats=_report(profiler),
+            queries=json.dumps(queries),
+            templates=json.dumps(templates),
+        )
+        if staff:
+            response['X-Issuetrack-Profile'] = reverse(
+                'request_profile', kwargs={'profile_id': profile.pk})
+        return response
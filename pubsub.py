@@ -0,0 +1,154 @@
+''' Publish/subscribe fan-out for live issue updates.
+
+Events are published once per write and every listener on the channel
+reads the same stored event, so N open issue pages cost N small reads
+instead of N full page renders.
+
+The broker is pluggable through PUBSUB_BACKEND in the Issuetrack settings
+file:
+
+    LocalBroker:    In-process broker. Fine for a single (threaded) worker.
+    CacheBroker:    Stores events in a Django cache so that every worker
+                    sharing that cache (memcached, redis, or a file based
+                    cache as a local stand-in) sees the same events.
+'''
+
+from __future__ import absolute_import
+
+import threading
+import time
+from collections import deque
+
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from issuetrack.settings import (
+    PUBSUB_BACKEND, PUBSUB_BACKLOG, PUBSUB_CACHE, PUBSUB_POLL_INTERVAL
+)
+
+
+class LocalBroker(object):
+    ''' Broker keeping the most recent events of every channel in memory.
+    '''
+
+    def __init__(self, backlog=PUBSUB_BACKLOG):
+        self.backlog = backlog
+        ''' Number of events kept per channel for late listeners.
+        '''
+        self.channels = {}
+        ''' Maps a channel name to a [last_id, deque of events] pair.
+        '''
+        self.condition = threading.Condition()
+        ''' Wakes up waiting listeners when something is published.
+        '''
+
+    def publish(self, channel, event, data):
+        ''' Store an event on the channel and wake up its listeners.
+        Returns the id of the new event.
+        '''
+        with self.condition:
+            state = self.channels.setdefault(
+                channel, [0, deque(maxlen=self.backlog)])
+            state[0] += 1
+            state[1].append((state[0], event, data))
+            self.condition.notify_all()
+            return state[0]
+
+    def last_id(self, channel):
+        ''' Id of the most recent event on the channel, 0 if none yet.
+        '''
+        with self.condition:
+            return self.channels.get(channel, [0])[0]
+
+    def listen(self, channel, last_id, timeout):
+        ''' Return the (id, event, data) tuples published on the channel
+        after last_id, waiting up to timeout seconds for at least one.
+        '''
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                state = self.channels.get(channel)
+                if state and state[0] > last_id:
+                    return [e for e in state[1] if e[0] > last_id]
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self.condition.wait(remaining)
+
+
+class CacheBroker(object):
+    ''' Broker storing events in a Django cache shared between workers.
+
+    Each channel has a counter key holding the last event id and one key
+    per event. Listeners poll the counter, which is a single cache get.
+    '''
+
+    def __init__(self, backlog=PUBSUB_BACKLOG, cache_alias=PUBSUB_CACHE,
+                 poll_interval=PUBSUB_POLL_INTERVAL):
+        self.backlog = backlog
+        self.cache = caches[cache_alias]
+        self.poll_interval = poll_interval
+
+    def _key(self, channel, event_id=None):
+        if event_id is None:
+            return 'issuetrack:pubsub:{}'.format(channel)
+        return 'issuetrack:pubsub:{}:{}'.format(channel, event_id)
+
+    def publish(self, channel, event, data):
+        ''' Store an event on the channel. Returns the id of the new event.
+        '''
+        counter = self._key(channel)
+        self.cache.add(counter, 0, None)
+        try:
+            event_id = self.cache.incr(counter)
+        except ValueError:
+            ''' The counter was evicted between add() and incr().
+            '''
+            self.cache.add(counter, 0, None)
+            event_id = self.cache.incr(counter)
+        self.cache.set(
+            self._key(channel, event_id), (event_id, event, data), None)
+        self.cache.delete(self._key(channel, event_id - self.backlog))
+        return event_id
+
+    def last_id(self, channel):
+        ''' Id of the most recent event on the channel, 0 if none yet.
+        '''
+        return self.cache.get(self._key(channel), 0)
+
+    def listen(self, channel, last_id, timeout):
+        ''' Return the (id, event, data) tuples published on the channel
+        after last_id, polling up to timeout seconds for at least one.
+        '''
+        deadline = time.time() + timeout
+        while True:
+            current = self.last_id(channel)
+            if current > last_id:
+                first = max(last_id + 1, current - self.backlog + 1)
+                found = self.cache.get_many(
+                    [self._key(channel, i) for i in range(first, current + 1)])
+                return sorted(found.values())
+            if time.time() >= deadline:
+                return []
+            time.sleep(self.poll_interval)
+
+
+_broker = None
+''' Lazily created broker shared by the whole process.
+'''
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    ''' Return the process wide broker configured by PUBSUB_BACKEND.
+    '''
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(PUBSUB_BACKEND)()
+    return _broker
+
+
+def issue_channel(issue_id):
+    ''' Name of the channel carrying the updates of one issue.
+    '''
+    return 'issue:{}'.format(issue_id)
@@ -0,0 +1,105 @@
+''' Removal of deleted projects and components.
+
+Deleting a project or component from the views only flags it, so the
+request returns at once. The rows below it are removed here in batches of
+PURGE_BATCH_SIZE, each in its own short transaction, so memory use stays
+constant and other writers are never locked out for long.
+'''
+
+from __future__ import absolute_import
+
+import time
+
+from django.db import router, transaction
+from issuetrack.attachments import delete_unused_blobs
+from issuetrack.models import ArchivedComment, ArchivedIssue, Attachment
+from issuetrack.models import Comment, Component, Issue, MailMessage
+from issuetrack.models import Project, Watch, WatchEvent, without_tombstones
+from issuetrack.routers import use_database
+from issuetrack.settings import PURGE_BATCH_SIZE
+
+
+def _delete_in_batches(queryset, batch_size, pause):
+    ''' Delete the rows of the queryset batch by batch. Returns the number
+    of rows deleted.
+    '''
+    total = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        with transaction.atomic(using=router.db_for_write(queryset.model)):
+            queryset.model._base_manager.filter(pk__in=ids).delete()
+        total += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def purge_component(component, batch_size=PURGE_BATCH_SIZE, pause=0,
+                    progress=None):
+    ''' Remove a component with its issues, comments, attachments, watches
+    and ingested email records. Their deletion is not recorded as tombstones:
+    the component's tombstone stands for them.
+    '''
+    with use_database(Project.database_for(component.project_id)), \
+            without_tombstones():
+        _purge_component(component, batch_size, pause, progress)
+
+
+def _purge_component(component, batch_size, pause, progress):
+    ''' purge_component on the database of the component's issues.
+    '''
+    for issues in (Issue.objects, ArchivedIssue.objects):
+        issue_ids = issues.filter(component=component).order_by(
+            'pk').values_list('pk', flat=True)
+        last_pk = 0
+        while True:
+            ids = list(issue_ids.filter(pk__gt=last_pk)[:batch_size])
+            if not ids:
+                break
+            for model in (Attachment, MailMessage, Watch, WatchEvent):
+                _delete_in_batches(
+                    model.objects.filter(issue_id__in=ids), batch_size, pause)
+            last_pk = ids[-1]
+        ''' Attachments, email records, watches and events are kept on the
+        primary, which may not hold the issues, so they are found by issue
+        id.
+        '''
+    comments = _delete_in_batches(
+        Comment.objects.filter(issue__component=component), batch_size, pause)
+    issues = _delete_in_batches(
+        Issue.objects.filter(component=component), batch_size, pause)
+    comments += _delete_in_batches(
+        ArchivedComment.objects.filter(issue__component=component),
+        batch_size, pause)
+    issues += _delete_in_batches(
+        ArchivedIssue.objects.filter(component=component), batch_size, pause)
+    component.delete()
+    if progress:
+        progress('Component {}: {} issues and {} comments purged'.format(
+            component.pk, issues, comments))
+
+
+def purge_project(project, batch_size=PURGE_BATCH_SIZE, pause=0,
+                  progress=None):
+    ''' Remove a project with its components, issues and comments.
+    '''
+    for component in Component.all_objects.filter(project=project):
+        purge_component(component, batch_size, pause, progress)
+    with without_tombstones():
+        project.delete()
+    if progress:
+        progress('Project {}: purged'.format(project.key))
+
+
+def purge_deleted(batch_size=PURGE_BATCH_SIZE, pause=0, progress=None):
+    ''' Remove every project and component flagged as deleted.
+    '''
+    for component in Component.all_objects.filter(
+            deleted=True, project__deleted=False):
+        purge_component(component, batch_size, pause, progress)
+    for project in Project.all_objects.filter(deleted=True):
+        purge_project(project, batch_size, pause, progress)
+    files = delete_unused_blobs()
+    if progress and files:
+        progress('{} unused attachment files removed'.format(files))
@@ -0,0 +1,74 @@
+''' Cleaning the stored HTML of the rich text fields again.
+
+The <field>_html columns are written whenever a rich text field is saved.
+When the allowed tags, attributes or protocols change, render_rich_text
+cleans every stored field again, in batches of RENDER_BATCH_SIZE rows with
+one short transaction each, and only writes the rows whose HTML changed.
+'''
+
+from __future__ import absolute_import
+
+from django.db import router, transaction
+from issuetrack.models import ArchivedComment, ArchivedIssue, Comment
+from issuetrack.models import Component, Issue, Project
+from issuetrack.routers import SHARDED_MODELS, issue_databases, use_database
+from issuetrack.sanitize import sanitize_html
+from issuetrack.settings import RENDER_BATCH_SIZE
+
+RICH_TEXT_MODELS = (
+    Project, Component, Issue, Comment, ArchivedIssue, ArchivedComment,
+)
+''' Models with rich text fields.
+'''
+
+
+def render_model(model, fields, batch_size=RENDER_BATCH_SIZE):
+    ''' Clean the given rich text fields of every row of a model again.
+    Returns the number of rows whose HTML changed.
+    '''
+    columns = ['pk']
+    for name in fields:
+        columns.extend([name, name + '_html'])
+    rows = model._base_manager.order_by('pk')
+    last_pk = None
+    changed = 0
+    while True:
+        batch = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        batch = list(batch.values(*columns)[:batch_size])
+        if not batch:
+            return changed
+        with transaction.atomic(using=router.db_for_write(model)):
+            for row in batch:
+                html = dict(
+                    (name + '_html', sanitize_html(row[name]))
+                    for name in fields
+                )
+                html = dict(
+                    (name, value) for name, value in html.items()
+                    if value != row[name]
+                )
+                if html:
+                    model._base_manager.filter(pk=row['pk']).update(**html)
+                    changed += 1
+        last_pk = batch[-1]['pk']
+
+
+def render_rich_text(batch_size=RENDER_BATCH_SIZE, progress=None):
+    ''' Clean the rich text of all models again. Returns the number of rows
+    whose HTML changed.
+    '''
+    total = 0
+    for model in RICH_TEXT_MODELS:
+        changed = 0
+        databases = [None]
+        if model._meta.model_name in SHARDED_MODELS:
+            databases = issue_databases()
+        for database in databases:
+            with use_database(database):
+                changed += render_model(
+                    model, model.rich_text_fields, batch_size)
+        total += changed
+        if progress:
+            progress('{}: {} rows changed'.format(
+                model._meta.verbose_name_plural.capitalize(), changed))
+    return total
@@ -0,0 +1,241 @@
+''' Sending the reads of GET requests to read replicas.
+
+ReplicaRouter routes the queries of this app's models. Reads made while
+ReplicaMiddleware handles a GET or HEAD request go to one of the replicas;
+writes, and every query outside such a request, go to the primary. A user
+whose request wrote something is given a cookie that keeps their reads on
+the primary for REPLICA_PIN_SECONDS, so that they see their own changes
+before the replicas catch up.
+
+To use it, add 'issuetrack.routers.ReplicaRouter' to DATABASE_ROUTERS and
+'issuetrack.routers.ReplicaMiddleware' to MIDDLEWARE_CLASSES in the
+project settings.
+
+ShardRouter instead spreads the issues of the projects over the databases
+named by DATABASE_SHARDS. Each project's issues, comments and their
+archived copies live on the database named by Project.database. Users,
+projects and components are kept on the primary and copied to every shard,
+so that the issue queries join them there. Queries of the sharded models
+go to the database set with use_database, which ShardMiddleware sets from
+the project, component, issue or comment a view is called for. Use
+'issuetrack.routers.ShardRouter' and 'issuetrack.routers.ShardMiddleware'
+in place of the replica router and middleware.
+'''
+
+from __future__ import absolute_import
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from issuetrack.settings import APP_NAME, DATABASE_PRIMARY, DATABASE_REPLICAS
+from issuetrack.settings import DATABASE_SHARDS
+from issuetrack.settings import REPLICA_PIN_COOKIE, REPLICA_PIN_SECONDS
+
+_state = threading.local()
+''' Database the reads of the current thread's request go to, if any, and
+the database of the sharded models, see use_database.
+'''
+
+SHARDED_MODELS = frozenset([
+    'issue', 'issuebucket', 'issuelink', 'issueancestor', 'comment',
+    'archivedissue', 'archivedcomment',
+])
+''' Models whose rows live on their project's database. The others live
+on the primary.
+'''
+
+
+def replicas():
+    ''' Aliases of the replica databases.
+    '''
+    if DATABASE_REPLICAS is not None:
+        return list(DATABASE_REPLICAS)
+    return sorted(
+        alias for alias in settings.DATABASES if alias != DATABASE_PRIMARY)
+
+
+def pin_primary():
+    ''' Send the remaining reads of the current request to the primary.
+    '''
+    _state.read_db = None
+
+
+class ReplicaRouter(object):
+    ''' Database router for this app's models.
+    '''
+
+    def db_for_read(self, model, **hints):
+        ''' A replica during a read-only request, the primary otherwise.
+        '''
+        if model._meta.app_label != APP_NAME:
+            return None
+        return getattr(_state, 'read_db', None) or DATABASE_PRIMARY
+
+    def db_for_write(self, model, **hints):
+        ''' Always the primary.
+        '''
+        if model._meta.app_label != APP_NAME:
+            return None
+        pin_primary()
+        return DATABASE_PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        ''' Replicas hold the same rows as the primary.
+        '''
+        databases = set([DATABASE_PRIMARY] + replicas())
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware(object):
+    ''' Decide where the reads of each request go.
+    '''
+
+    def process_request(self, request):
+        ''' Reads of GET and HEAD requests from users without a recent write
+        go to a randomly chosen replica.
+        '''
+        pin_primary()
+        aliases = replicas()
+        pinned_until = request.COOKIES.get(REPLICA_PIN_COOKIE, '')
+        try:
+            pinned = float(pinned_until) > time.time()
+        except ValueError:
+            pinned = False
+        if aliases and request.method in ('GET', 'HEAD') and not pinned:
+            _state.read_db = random.choice(aliases)
+
+    def process_response(self, request, response):
+        ''' Keep the user on the primary for a while after a write.
+        '''
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                REPLICA_PIN_COOKIE,
+                str(time.time() + REPLICA_PIN_SECONDS),
+                max_age=REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        pin_primary()
+        return response
+
+
+def issue_databases():
+    ''' Aliases of the databases holding issues, or [None], which routes
+    as usual, when issues are not sharded.
+    '''
+    if not DATABASE_SHARDS:
+        return [None]
+    return sorted(set((DATABASE_PRIMARY,) + tuple(DATABASE_SHARDS)))
+
+
+@contextmanager
+def use_database(alias):
+    ''' Send the queries of the sharded models made within to the given
+    database, or to the primary if alias is None.
+    '''
+    previous = getattr(_state, 'shard', None)
+    _state.shard = alias
+    try:
+        yield
+    finally:
+        _state.shard = previous
+
+
+def locate(model_name, pk):
+    ''' Alias of the database holding the row of a sharded model, or None
+    if no database has it.
+    '''
+    if not str(pk).isdigit():
+        return None
+    model = apps.get_model(APP_NAME, model_name)
+    for alias in issue_databases():
+        if model._base_manager.using(alias).filter(pk=pk).exists():
+            return alias
+    return None
+
+
+class ShardRouter(object):
+    ''' Database router for this app's models when issues are sharded.
+    '''
+
+    def _database(self, model, hints):
+        if model._meta.app_label != APP_NAME:
+            return None
+        if model._meta.model_name not in SHARDED_MODELS:
+            return DATABASE_PRIMARY
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db and \
+                instance._meta.model_name in SHARDED_MODELS:
+            return instance._state.db
+        return getattr(_state, 'shard', None) or DATABASE_PRIMARY
+
+    def db_for_read(self, model, **hints):
+        ''' The database of the row the query follows a relation from, the
+        database set with use_database or the primary.
+        '''
+        return self._database(model, hints)
+
+    def db_for_write(self, model, **hints):
+        ''' Same as db_for_read.
+        '''
+        return self._database(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        ''' Sharded rows relate to the copies of the users, projects and
+        components on their database.
+        '''
+        databases = set(issue_databases())
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ShardMiddleware(object):
+    ''' Send the queries of each view to the database of the project it is
+    called for.
+    '''
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        ''' Find the database from the view's project_id, component_id,
+        key, issue_id, comment_id or attachment_id argument.
+        '''
+        _state.shard = None
+        if not DATABASE_SHARDS:
+            return None
+        Project = apps.get_model(APP_NAME, 'Project')
+        Component = apps.get_model(APP_NAME, 'Component')
+        Attachment = apps.get_model(APP_NAME, 'Attachment')
+        project_id = view_kwargs.get('project_id')
+        if 'component_id' in view_kwargs:
+            project_id = Component.all_objects.filter(
+                pk=view_kwargs['component_id'],
+            ).values_list('project_id', flat=True).first()
+        if 'key' in view_kwargs:
+            project_id = Project.all_objects.filter(
+                key=view_kwargs['key'],
+            ).values_list('pk', flat=True).first()
+        if project_id is not None:
+            _state.shard = Project.database_for(project_id)
+            return None
+        issue_id = view_kwargs.get('issue_id')
+        if 'attachment_id' in view_kwargs:
+            issue_id = Attachment.objects.filter(
+                pk=view_kwargs['attachment_id'],
+            ).values_list('issue_id', flat=True).first()
+        if issue_id is not None:
+            _state.shard = locate('issue', issue_id) or \
+                locate('archivedissue', issue_id)
+        elif 'comment_id' in view_kwargs:
+            _state.shard = locate('comment', view_kwargs['comment_id'])
+        return None
+
+    def process_response(self, request, response):
+        ''' Forget the database after the request.
+        '''
+        _state.shard = None
+        return response
@@ -0,0 +1,107 @@
+''' Sanitizing the HTML entered in the rich text fields.
+
+The editors post HTML. It is cleaned once, when it is saved, into a
+companion <field>_html column that the templates output as is. Tags and
+attributes that are not allowed by RICH_TEXT_TAGS and RICH_TEXT_ATTRIBUTES
+are dropped, links are limited to RICH_TEXT_PROTOCOLS, text is escaped and
+unclosed tags are closed. After changing these settings, run the
+render_rich_text command to clean the stored HTML again.
+'''
+
+from __future__ import absolute_import
+
+from html import escape
+from html.parser import HTMLParser
+
+from issuetrack.settings import RICH_TEXT_ATTRIBUTES, RICH_TEXT_PROTOCOLS
+from issuetrack.settings import RICH_TEXT_TAGS
+
+VOID_TAGS = frozenset(['br', 'hr', 'img'])
+''' Tags without content or end tag.
+'''
+
+DROPPED_TAGS = frozenset(['script', 'style', 'template', 'iframe', 'object'])
+''' Tags removed together with their content.
+'''
+
+URL_ATTRIBUTES = frozenset(['href', 'src'])
+''' Attributes holding a URL, checked against RICH_TEXT_PROTOCOLS.
+'''
+
+
+def _allowed_url(url):
+    ''' Whether a URL is relative or uses one of the allowed protocols.
+    '''
+    url = ''.join(url.split()).lower()
+    scheme, colon, rest = url.partition(':')
+    if not colon or '/' in scheme or '?' in scheme or '#' in scheme:
+        return True
+    return scheme in RICH_TEXT_PROTOCOLS
+
+
+class _Sanitizer(HTMLParser):
+    ''' Rebuilds the allowed part of a HTML fragment.
+    '''
+
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.out = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+        if self.dropping or tag not in RICH_TEXT_TAGS:
+            return
+        allowed = RICH_TEXT_ATTRIBUTES.get(tag, ())
+        html = '<' + tag
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _allowed_url(value):
+                continue
+            html += ' {}="{}"'.format(name, escape(value))
+        self.out.append(html + '>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in DROPPED_TAGS:
+            self.dropping -= 1
+        elif tag not in VOID_TAGS and self.open_tags and \
+                self.open_tags[-1] == tag and not self.dropping:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        while True:
+            open_tag = self.open_tags.pop()
+            self.out.append('</{}>'.format(open_tag))
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        while self.open_tags:
+            self.out.append('</{}>'.format(self.open_tags.pop()))
+        return ''.join(self.out).strip()
+
+
+def sanitize_html(text):
+    ''' Safe HTML for the given rich text, '' for None.
+    '''
+    if not text:
+        return ''
+    sanitizer = _Sanitizer()
+    sanitizer.feed(text)
+    return sanitizer.result()
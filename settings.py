@@ -23,6 +23,11 @@ FOOT = 'foot.html'
 ''' The html file used for the 'bottom' of all template pages.
 '''
 
+PORTAL_HEADING = 'portal_heading.html'
+''' The html file used for the 'top' of the public portal's pages, which
+show nothing of the visitor.
+'''
+
 FORM_TABLE_HEADING = 'form_table_heading.html'
 ''' The html file used for the top of all form tables.
 '''
@@ -36,26 +41,32 @@ FORM_TABLE_FOOTING = 'form_table_footing.html'
 '''
 
 ISSUE_STATUSES = (
-    'New',
-    'Open',
-    'In Progress',
-    'Resolved',
-    'Closed',
-    'On Hold',
-    'Pending Creater',
-    'Pending 3rd Party',
-    'Duplicate',
-    'Invalid/Unfounded',
-    "Won't Fix",
+    (10, 'New'),
+    (20, 'Open'),
+    (30, 'In Progress'),
+    (40, 'Resolved'),
+    (50, 'Closed'),
+    (60, 'On Hold'),
+    (70, 'Pending Creater'),
+    (80, 'Pending 3rd Party'),
+    (90, 'Duplicate'),
+    (100, 'Invalid/Unfounded'),
+    (110, "Won't Fix"),
 )
+''' Issue statuses, kinds, priorities and urgencies are stored as the small
+integer code on the left and shown with the label on the right. Codes must
+never be changed or reused once issues were saved with them; add new
+entries with a new code. Listings sort by code, so priorities and urgencies
+are ordered from the most to the least severe.
+'''
 
 ISSUE_KINDS = (
-    'Bug',
-    'Improvement',
-    'Feature',
-    'Info',
-    'Proposal',
-    'Task',
+    (10, 'Bug'),
+    (20, 'Improvement'),
+    (30, 'Feature'),
+    (40, 'Info'),
+    (50, 'Proposal'),
+    (60, 'Task'),
 )
 
 COMMENT_AUDIENCES = (
@@ -64,20 +75,423 @@ COMMENT_AUDIENCES = (
 )
 
 ISSUE_PRIORITIES = (
-    'Blocker',
-    'Critical',
-    'Major',
-    'Minor',
-    'Trivial',
+    (10, 'Blocker'),
+    (20, 'Critical'),
+    (30, 'Major'),
+    (40, 'Minor'),
+    (50, 'Trivial'),
 )
 
 ISSUE_URGENCIES = (
-    'ASAP',
-    '7 days',
-    '21 days',
-    '42 days',
-    'Indefinite',
+    (10, 'ASAP'),
+    (20, '7 days'),
+    (30, '21 days'),
+    (40, '42 days'),
+    (50, 'Indefinite'),
+)
+
+PUBSUB_BACKEND = 'issuetrack.pubsub.LocalBroker'
+''' Broker used to fan out live issue updates. Use
+'issuetrack.pubsub.CacheBroker' when running more than one worker process.
+'''
+
+PUBSUB_BACKLOG = 100
+''' Number of recent events kept per issue for listeners that reconnect.
+'''
+
+PUBSUB_CACHE = 'default'
+''' Django cache alias used by the CacheBroker.
+'''
+
+PUBSUB_POLL_INTERVAL = 0.5
+''' Seconds between two checks for new events by the CacheBroker.
+'''
+
+SSE_HEARTBEAT = 15
+''' Seconds of silence after which a keep-alive is sent on an event stream.
+'''
+
+SSE_STREAM_TIMEOUT = 300
+''' Seconds after which an event stream is closed. Browsers reconnect on
+their own and resume from the last event they received.
+'''
+
+PURGE_BATCH_SIZE = 500
+''' Number of rows removed per transaction when purging deleted projects
+and components.
+'''
+
+ARCHIVE_STATUSES = (
+    'Closed',
+    "Won't Fix",
+    'Duplicate',
+    'Invalid/Unfounded',
+)
+''' Terminal statuses. Issues in one of these are moved to the archive
+tables by the archive_issues command once they are old enough.
+'''
+
+ARCHIVE_AFTER_DAYS = 365
+''' Days since its last change after which a terminal issue is archived.
+'''
+
+ARCHIVE_BATCH_SIZE = 500
+''' Number of issues moved to the archive per transaction.
+'''
+
+DATABASE_PRIMARY = 'default'
+''' Database alias that all writes go to.
+'''
+
+DATABASE_REPLICAS = None
+''' Aliases of the read replicas of DATABASE_PRIMARY, or None to use every
+other configured database. Only used with issuetrack.routers.ReplicaRouter.
+'''
+
+REPLICA_PIN_SECONDS = 5
+''' Seconds after a write during which the user's reads stay on the primary.
+Should exceed the usual replication lag.
+'''
+
+REPLICA_PIN_COOKIE = 'issuetrack_primary'
+''' Cookie keeping a user's reads on the primary after a write.
+'''
+
+DATABASE_SHARDS = ()
+''' Aliases of the databases the issues of new projects are spread over,
+each project going to the one holding the fewest projects. Empty to keep
+all issues on DATABASE_PRIMARY. Only used with issuetrack.routers.ShardRouter;
+move projects between them with the move_project command.
+'''
+
+SHARD_MOVE_BATCH_SIZE = 500
+''' Number of issues copied per transaction by the move_project command.
+'''
+
+CHANGES_PAGE_SIZE = 500
+''' Most changes returned by one call of the change feed.
+'''
+
+CHANGES_SETTLE_SECONDS = 5
+''' Age a change must reach before the change feed reports it, so that a
+transaction that started earlier but commits later than the reported
+changes is not skipped by the cursor. Should exceed the longest write
+transaction.
+'''
+
+RICH_TEXT_TAGS = (
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'span',
+    'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead',
+    'tr', 'u', 'ul',
+)
+''' Tags kept in descriptions and comments. Other tags are removed, their
+text is kept.
+'''
+
+RICH_TEXT_ATTRIBUTES = {
+    'a': ('href', 'title'),
+    'img': ('src', 'alt', 'title', 'width', 'height'),
+    'td': ('colspan', 'rowspan'),
+    'th': ('colspan', 'rowspan'),
+}
+''' Attributes kept per tag. All other attributes are removed.
+'''
+
+RICH_TEXT_PROTOCOLS = (
+    'http',
+    'https',
+    'mailto',
+)
+''' Protocols allowed in links and image sources besides relative URLs.
+'''
+
+RENDER_BATCH_SIZE = 500
+''' Number of rows cleaned again per transaction by render_rich_text.
+'''
+
+ATTACHMENT_DIR = 'issuetrack/attachments'
+''' Directory below MEDIA_ROOT holding the attachment files, stored once
+per content and named by its SHA-256.
+'''
+
+ATTACHMENT_MAX_SIZE = 500 * 1024 * 1024
+''' Largest accepted attachment, in bytes.
+'''
+
+ATTACHMENT_SENDFILE_HEADER = None
+''' 'X-Sendfile' (Apache, lighttpd) or 'X-Accel-Redirect' (nginx) to have
+the web server send attachment files. With None they are sent through the
+WSGI server's file wrapper.
+'''
+
+ATTACHMENT_ACCEL_PREFIX = '/protected/issuetrack/attachments/'
+''' Internal nginx location serving ATTACHMENT_DIR, for X-Accel-Redirect.
+'''
+
+MAIL_DEFAULT_USER = 'support'
+''' Username of the account that ingested emails are filed under when their
+sender has no account with the same email address.
+'''
+
+MAIL_ISSUE_KIND = 'Bug'
+MAIL_ISSUE_PRIORITY = 'Major'
+MAIL_ISSUE_URGENCY = 'Indefinite'
+''' Type, priority and urgency of the issues created from emails.
+'''
+
+MAIL_COMMENT_AUDIENCE = 'Private'
+''' Audience of the comments created from replies.
+'''
+
+MAIL_BATCH_SIZE = 500
+''' Number of emails added per transaction by ingest_mail.
+'''
+
+MAIL_WORKERS = None
+''' Number of processes parsing emails for ingest_mail, or None for one
+per CPU.
+'''
+
+SIMILARITY_BANDS = 16
+SIMILARITY_ROWS = 4
+''' Bands and rows of the MinHash signatures of the issues. Issues sharing
+about (1 / SIMILARITY_BANDS) ** (1 / SIMILARITY_ROWS) of their text are
+suggested as duplicates. Run the index_similarity command after changing
+these or the two settings below.
+'''
+
+SIMILARITY_SHINGLE_SIZE = 5
+''' Characters per shingle compared between the issues' texts.
+'''
+
+SIMILARITY_TEXT_LENGTH = 2000
+''' Characters of an issue's title and description that are compared.
+'''
+
+SIMILARITY_SUGGESTIONS = 5
+''' Number of likely duplicates shown while an issue is entered.
+'''
+
+SIMILARITY_BATCH_SIZE = 500
+''' Number of issues indexed per transaction by index_similarity.
+'''
+
+WEBHOOK_WORKERS = 4
+''' Number of requests deliver_webhooks sends at the same time. Each
+receiver gets one request at a time.
+'''
+
+WEBHOOK_TIMEOUT = 10
+''' Seconds to wait for a receiver before the delivery counts as failed.
+'''
+
+WEBHOOK_RETRY_DELAY = 30
+WEBHOOK_RETRY_MAX_DELAY = 6 * 60 * 60
+''' Seconds before the first retry of a failed delivery. The delay doubles
+with every failure in a row, up to WEBHOOK_RETRY_MAX_DELAY.
+'''
+
+WEBHOOK_MAX_ATTEMPTS = 20
+''' Failed deliveries after which an event is dropped.
+'''
+
+WEBHOOK_POLL_INTERVAL = 1
+''' Seconds an idle worker waits before checking the queue again.
+'''
+
+WEBHOOK_SIGNATURE_HEADER = 'X-Issuetrack-Signature'
+''' Header holding sha256=<HMAC-SHA256 of the body keyed with the secret>.
+'''
+
+ADMIN_COUNT_LIMIT = 10000
+''' Rows counted at most by the admin console's changelists. Larger results
+are paged up to this many rows; refine them with the filters and search.
+'''
+
+DASHBOARD_CACHE = 'default'
+''' Django cache alias holding the project dashboards.
+'''
+
+DASHBOARD_TIMEOUT = 15 * 60
+''' Seconds a project dashboard is cached. Dashboards are also dropped
+whenever one of the project's issues changes.
+'''
+
+DASHBOARD_CLOSED_STATUSES = (
+    'Resolved',
+    'Closed',
+    "Won't Fix",
+    'Duplicate',
+    'Invalid/Unfounded',
 )
+''' Statuses of the issues not counted as open on the project dashboards.
+'''
+
+DASHBOARD_ISSUES = 10
+''' Number of recently updated and of untouched issues on a dashboard.
+'''
+
+AUTO_ASSIGN_PRIORITY_WEIGHTS = {
+    'Blocker': 8,
+    'Critical': 5,
+    'Major': 3,
+    'Minor': 2,
+    'Trivial': 1,
+}
+
+AUTO_ASSIGN_URGENCY_WEIGHTS = {
+    'ASAP': 4,
+    '7 days': 3,
+    '21 days': 2,
+    '42 days': 1,
+    'Indefinite': 1,
+}
+''' An open issue adds the product of its priority and urgency weights to
+the workload of its assignee. New issues of projects and components with
+auto-assignment on go to the member with the lowest workload.
+'''
+
+AUTO_ASSIGN_RETRIES = 5
+''' Times the member with the lowest workload is read again when a
+concurrent request assigned an issue to them first, before their row is
+locked for the assignment instead.
+'''
+
+THROTTLE_CACHE = 'default'
+''' Django cache alias counting the writes of each user and address. Use a
+cache shared by all workers, such as memcached or Redis.
+'''
+
+THROTTLE_RATES = {
+    'add_issue': (30, 60 * 60),
+    'add_comment': (120, 60 * 60),
+    'change': (300, 60 * 60),
+}
+''' Writes each user may make, as (requests, seconds): the user's bucket
+holds that many requests and is refilled every that many seconds. The
+scopes are the add_issue and add_comment views and the change views
+together. Set a scope to None to not limit it.
+'''
+
+THROTTLE_IP_RATES = {
+    'add_issue': (100, 60 * 60),
+    'add_comment': (400, 60 * 60),
+    'change': (1000, 60 * 60),
+}
+''' Writes each client address may make, as in THROTTLE_RATES. Several
+users may share an address behind a proxy or NAT.
+'''
+
+THROTTLE_IP_META = 'REMOTE_ADDR'
+''' request.META key holding the client address, e.g. a header set by the
+proxy in front of the application such as HTTP_X_REAL_IP.
+'''
+
+COMPRESS_CONTENT_TYPES = ('text/html', 'application/json')
+''' Content types compressed by issuetrack.compression.CompressionMiddleware.
+'''
+
+COMPRESS_MIN_SIZE = 200
+''' Bytes below which responses are sent uncompressed.
+'''
+
+COMPRESS_BROTLI_QUALITY = 5
+''' Brotli quality from 0 to 11. Higher values compress a little better
+but take much longer per response.
+'''
+
+PROFILE_QUERY_FLAG = 'profile'
+''' Query parameter with which staff users have a request profiled, e.g.
+?profile=1. Only used with issuetrack.profiling.ProfilingMiddleware.
+'''
+
+PROFILE_SAMPLE_RATE = 0.0
+''' Share of all requests profiled, from 0 to 1, until a superuser sets
+another rate on the profiles page.
+'''
+
+PROFILE_CACHE = 'default'
+''' Django cache alias holding the sample rate set on the profiles page.
+Use a cache shared by all workers.
+'''
+
+PROFILE_BUFFER_SIZE = 100
+''' Number of request profiles kept. Each new profile replaces the oldest.
+'''
+
+PROFILE_STATS_LINES = 50
+''' Functions listed in each part of a stored profiler report.
+'''
+
+SLOW_QUERY_MS = 100
+''' Milliseconds above which a query made by a view is recorded by
+issuetrack.slowqueries.SlowQueryMiddleware.
+'''
+
+SLOW_QUERY_SAMPLES = 100
+''' Timings kept per slow query for its percentiles.
+'''
+
+ISSUE_LINK_KINDS = (
+    (10, 'Blocks'),
+    (20, 'Duplicates'),
+    (30, 'Relates to'),
+)
+''' Kinds of links between issues, stored as the code on the left like the
+statuses. A link reads from its source to its target, e.g. TP1-1 blocks
+TP1-2.
+'''
+
+ISSUE_LINK_ACYCLIC = ('Blocks', 'Duplicates')
+''' Kinds of links followed transitively, e.g. to the blockers of an
+issue's blockers. Links of these kinds may not form a cycle.
+'''
+
+DIGEST_SITE_URL = 'http://localhost:8000'
+''' Address of the site, put before the links to the issues in the digests.
+'''
+
+DIGEST_SUBJECT = 'Issuetrack: {events} updates on {issues} issues'
+''' Subject of the digests.
+'''
+
+DIGEST_SETTLE_SECONDS = 5
+''' Age an event must reach before it is sent in a digest, for the same
+reason as CHANGES_SETTLE_SECONDS.
+'''
+
+DIGEST_RETENTION_DAYS = 7
+''' Days the events are kept for the digests. send_digests removes older
+events, which are no longer sent.
+'''
+
+DIGEST_BATCH_SIZE = 500
+''' Number of digests sent per connection to the mail server.
+'''
+
+DIGEST_TEXT_LENGTH = 200
+''' Characters of a comment quoted in a digest.
+'''
+
+PORTAL_CACHE = 'default'
+''' Django cache alias holding the public portal's pages. Shared by all app
+servers, e.g. memcached, so that a page is rendered once for all of them.
+'''
+
+PORTAL_MAX_AGE = 60
+''' Seconds browsers, reverse proxies and other shared caches may reuse a
+portal page before asking again. Asking again is answered with 304 Not
+Modified from the cache until an issue or comment of the project changes.
+'''
+
+PORTAL_CACHE_TIMEOUT = 24 * 60 * 60
+''' Seconds a rendered portal page is kept in PORTAL_CACHE.
+'''
+
+PORTAL_PAGE_SIZE = 50
+''' Issues per page of a project's portal.
+'''
 
 '''
 ==================================================
@@ -102,6 +516,10 @@ FOOT = os.path.join(COMMON_TEMPLATES_DIR, FOOT)
 ''' Build the relative path to FOOT_TEMPLATE.
 '''
 
+PORTAL_HEADING = os.path.join(COMMON_TEMPLATES_DIR, PORTAL_HEADING)
+''' Build the relative path to PORTAL_HEADING.
+'''
+
 FORM_TABLE_HEADING = os.path.join(COMMON_TEMPLATES_DIR, FORM_TABLE_HEADING)
 ''' Build the relative path to FORM_TABLE_HEADING.
 '''
@@ -116,6 +534,7 @@ FORM_TABLE_FOOTING = os.path.join(COMMON_TEMPLATES_DIR, FORM_TABLE_FOOTING)
 
 TEMPLATE_CONTEXT = {
     'page_heading': PAGE_HEADING,
+    'portal_heading': PORTAL_HEADING,
     'foot': FOOT,
     'form_table_heading': FORM_TABLE_HEADING,
     'form_buttons_heading': FORM_BUTTONS_HEADING,
@@ -125,6 +544,7 @@ TEMPLATE_CONTEXT = {
 application's template files:
 
     page_heading:       See PAGE_HEADING.
+    portal_heading:     See PORTAL_HEADING.
     foot:               See FOOT.
     form_table_heading: See FORM_TABLE_HEADING.
     form_table_footing: See FORM_TABLE_FOOTING.
@@ -132,14 +552,62 @@ application's template files:
 
 # ========================================================
 
-ISSUE_STATUSES = [(e, e) for e in ISSUE_STATUSES]
+ISSUE_STATUSES = list(ISSUE_STATUSES)
 
-ISSUE_KINDS = [(e, e) for e in ISSUE_KINDS]
+ISSUE_KINDS = list(ISSUE_KINDS)
 
 COMMENT_AUDIENCES = [(e, e) for e in COMMENT_AUDIENCES]
 
-ISSUE_PRIORITIES = [(e, e) for e in ISSUE_PRIORITIES]
+ISSUE_PRIORITIES = list(ISSUE_PRIORITIES)
+
+ISSUE_URGENCIES = list(ISSUE_URGENCIES)
 
-ISSUE_URGENCIES = [(e, e) for e in ISSUE_URGENCIES]
+ISSUE_LINK_KINDS = list(ISSUE_LINK_KINDS)
 ''' Build the choices as a two-element list for models and forms.
 '''
+
+ISSUE_STATUS_CODES = dict((label, code) for code, label in ISSUE_STATUSES)
+
+ISSUE_KIND_CODES = dict((label, code) for code, label in ISSUE_KINDS)
+
+ISSUE_PRIORITY_CODES = dict((label, code) for code, label in ISSUE_PRIORITIES)
+
+ISSUE_URGENCY_CODES = dict((label, code) for code, label in ISSUE_URGENCIES)
+
+ISSUE_LINK_KIND_CODES = dict(
+    (label, code) for code, label in ISSUE_LINK_KINDS)
+''' Look up the code stored for a label, e.g. ISSUE_STATUS_CODES['Closed'].
+'''
+
+ARCHIVE_STATUSES = [ISSUE_STATUS_CODES[e] for e in ARCHIVE_STATUSES]
+''' Build the codes of the terminal statuses.
+'''
+
+DASHBOARD_CLOSED_STATUSES = [
+    ISSUE_STATUS_CODES[e] for e in DASHBOARD_CLOSED_STATUSES]
+''' Build the codes of the statuses not counted as open.
+'''
+
+ISSUE_LINK_ACYCLIC = [ISSUE_LINK_KIND_CODES[e] for e in ISSUE_LINK_ACYCLIC]
+''' Build the codes of the links followed transitively.
+'''
+
+AUTO_ASSIGN_PRIORITY_WEIGHTS = dict(
+    (ISSUE_PRIORITY_CODES[label], weight)
+    for label, weight in AUTO_ASSIGN_PRIORITY_WEIGHTS.items()
+)
+
+AUTO_ASSIGN_URGENCY_WEIGHTS = dict(
+    (ISSUE_URGENCY_CODES[label], weight)
+    for label, weight in AUTO_ASSIGN_URGENCY_WEIGHTS.items()
+)
+''' Key the workload weights by code.
+'''
+
+MAIL_ISSUE_KIND = ISSUE_KIND_CODES[MAIL_ISSUE_KIND]
+
+MAIL_ISSUE_PRIORITY = ISSUE_PRIORITY_CODES[MAIL_ISSUE_PRIORITY]
+
+MAIL_ISSUE_URGENCY = ISSUE_URGENCY_CODES[MAIL_ISSUE_URGENCY]
+''' Build the codes of the issues created from emails.
+'''
@@ -0,0 +1,191 @@
+''' Listing the issues of all shards and moving projects between them.
+
+With DATABASE_SHARDS the issues of each project live on the database
+named by Project.database, see issuetrack.routers.ShardRouter. Lists over
+all projects, such as the index page, query every database and merge the
+results. move_project moves a project's issues, comments and archived
+issues to another database in batches of SHARD_MOVE_BATCH_SIZE issues,
+each copied in its own transaction, and switches the project over once
+all are copied. Issues and comments keep their ids, see Sequence. Links
+between the project's issues are copied last; links to the issues of other
+projects are dropped.
+'''
+
+from __future__ import absolute_import
+
+import heapq
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from issuetrack.models import ArchivedComment, ArchivedIssue, Comment
+from issuetrack.models import Component, Issue, IssueAncestor, IssueBucket
+from issuetrack.models import IssueLink, Project
+from issuetrack.models import without_tombstones
+from issuetrack.routers import issue_databases
+from issuetrack.settings import DATABASE_PRIMARY, ISSUE_LINK_ACYCLIC
+from issuetrack.settings import SHARD_MOVE_BATCH_SIZE
+
+MOVED_MODELS = (
+    (Issue, (Comment, IssueBucket)),
+    (ArchivedIssue, (ArchivedComment,)),
+)
+''' Models moved with a project, each with the models of the rows below
+its rows.
+'''
+
+
+class MergedList(object):
+    ''' The rows of a queryset from every database holding issues, in the
+    order of one field, e.g. '-created'. Slicing it reads the rows up to
+    the end of the slice from each database and merges them.
+    '''
+
+    def __init__(self, queryset, order):
+        descending = order.startswith('-')
+        self.queryset = queryset.order_by(
+            order, '-pk' if descending else 'pk')
+        self.attname = queryset.model._meta.get_field(
+            order.lstrip('-')).attname
+        self.descending = descending
+
+    def _key(self, obj):
+        ''' Sort key of a row. Empty values sort last, as on PostgreSQL.
+        '''
+        value = getattr(obj, self.attname)
+        return (value is None, value, obj.pk)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        databases = issue_databases()
+        if len(databases) == 1:
+            return list(self.queryset.using(databases[0])[index])
+        rows = [
+            list(self.queryset.using(alias)[:index.stop])
+            for alias in databases
+        ]
+        merged = heapq.merge(*rows, key=self._key, reverse=self.descending)
+        return list(islice(merged, index.start or 0, index.stop))
+
+
+def _copy_users(user_ids, target):
+    ''' Copy the users missing on the target database from the primary.
+    '''
+    user_ids = set(user_ids) - set([None])
+    present = set(User.objects.using(target).filter(
+        pk__in=user_ids).values_list('pk', flat=True))
+    for user in User.objects.using(DATABASE_PRIMARY).filter(
+            pk__in=user_ids - present):
+        user.save_base(raw=True, using=target)
+
+
+def _copy_batch(model, children, ids, source, target):
+    ''' Copy rows of model and the rows below them from source to target,
+    replacing earlier copies.
+    '''
+    rows = list(model._base_manager.using(source).filter(pk__in=ids))
+    below = [
+        (child, list(child._base_manager.using(source).filter(
+            issue_id__in=ids)))
+        for child in children
+    ]
+    if target != DATABASE_PRIMARY:
+        _copy_users(
+            [row.creater_id for row in rows] +
+            [row.assignee_id for row in rows] +
+            [
+                obj.author_id
+                for child, objects in below for obj in objects
+                if hasattr(obj, 'author_id')
+            ],
+            target,
+        )
+    with transaction.atomic(using=target), without_tombstones():
+        model._base_manager.using(target).filter(pk__in=ids).delete()
+        model._base_manager.using(target).bulk_create(rows)
+        for child, objects in below:
+            if child is IssueBucket:
+                for obj in objects:
+                    obj.pk = None
+            child._base_manager.using(target).bulk_create(objects)
+
+
+def _batches(queryset, batch_size):
+    ''' The ids of the queryset's rows, batch by batch.
+    '''
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def _copy_links(project, source, target):
+    ''' Copy the links between the project's issues that the target lacks,
+    with the paths through them. Links have no ids shared by the databases,
+    like IssueBucket rows, and are matched by their issues and kind.
+    '''
+    fields = ('source_id', 'target_id', 'kind')
+    links = IssueLink.objects.using(source).filter(
+        source__project=project, target__project=project)
+    present = set(IssueLink.objects.using(target).filter(
+        source__project=project).values_list(*fields))
+    with transaction.atomic(using=target):
+        for link in links:
+            if tuple(getattr(link, name) for name in fields) in present:
+                continue
+            link.pk = None
+            link.save_base(raw=True, using=target)
+            if link.kind in ISSUE_LINK_ACYCLIC:
+                IssueAncestor.adjust(
+                    target, link.kind, link.source_id, link.target_id, 1)
+
+
+def move_project(project, target, batch_size=SHARD_MOVE_BATCH_SIZE,
+                 progress=None):
+    ''' Move a project's issues, comments and archived issues to the target
+    database. Issues changed while they are copied are copied again before
+    the project is switched over, and the rows are then deleted from the
+    old database. Returns the number of issues moved.
+    '''
+    source = Project.database_for(project.pk)
+    if source == target:
+        return 0
+    started = timezone.now()
+    if target != DATABASE_PRIMARY:
+        for obj in [project] + list(
+                Component.all_objects.filter(project=project)):
+            obj.save_base(raw=True, using=target)
+    total = 0
+    for model, children in MOVED_MODELS:
+        rows = model._base_manager.using(source).filter(project=project)
+        for ids in _batches(rows, batch_size):
+            _copy_batch(model, children, ids, source, target)
+            total += len(ids)
+            if progress:
+                progress('{}: {} issues copied to {}'.format(
+                    project.key, total, target))
+    for model, children in MOVED_MODELS:
+        changed = model._base_manager.using(source).filter(
+            project=project, modified__gte=started)
+        for ids in _batches(changed, batch_size):
+            _copy_batch(model, children, ids, source, target)
+    _copy_links(project, source, target)
+    project.database = target
+    project.save(update_fields=['database'])
+    for model, children in MOVED_MODELS:
+        rows = model._base_manager.using(source).filter(project=project)
+        for ids in _batches(rows, batch_size):
+            with transaction.atomic(using=source), without_tombstones():
+                model._base_manager.using(source).filter(
+                    pk__in=ids).delete()
+    Project.issues_changed(project.pk)
+    if progress:
+        progress('{}: moved from {} to {}'.format(
+            project.key, source, target))
+    return total
@@ -0,0 +1,82 @@
+''' Finding issues that are probably duplicates of a text.
+
+The text of an issue, its title and description, is cut into overlapping
+shingles of SIMILARITY_SHINGLE_SIZE characters. Its MinHash signature
+holds, for each of SIMILARITY_BANDS * SIMILARITY_ROWS hash functions, the
+smallest hash of any shingle; two texts agree on a signature value with a
+probability equal to the share of shingles they have in common. The
+signature is cut into SIMILARITY_BANDS bands of SIMILARITY_ROWS values and
+each band is hashed into a bucket. Issues are stored with their buckets,
+so the issues similar to a text are those sharing one of its buckets,
+found with an index lookup however many issues there are. Issues sharing
+more buckets are more similar.
+'''
+
+from __future__ import absolute_import
+
+import hashlib
+import random
+import re
+import struct
+import zlib
+
+from django.utils.html import strip_tags
+from issuetrack.settings import SIMILARITY_BANDS, SIMILARITY_ROWS
+from issuetrack.settings import SIMILARITY_SHINGLE_SIZE, SIMILARITY_TEXT_LENGTH
+
+_random = random.Random(0)
+HASH_MASKS = [
+    _random.getrandbits(32) for _ in range(SIMILARITY_BANDS * SIMILARITY_ROWS)
+]
+''' Each hash function of the signature is the shingle hash XOR one of
+these masks, which keeps the signature fast to compute in Python. Stored
+buckets depend on them, so they are drawn from a fixed seed.
+'''
+
+WORD_RE = re.compile(r'\w+')
+''' The words of a text. Case, punctuation and markup are ignored.
+'''
+
+
+def normalize(title, description):
+    ''' The words of an issue's title and description, lower-cased and
+    separated by single spaces.
+    '''
+    text = '{} {}'.format(title or '', strip_tags(description or ''))
+    return ' '.join(WORD_RE.findall(text.lower()))[:SIMILARITY_TEXT_LENGTH]
+
+
+def shingles(text):
+    ''' Hashes of the overlapping character shingles of a normalized text.
+    '''
+    size = SIMILARITY_SHINGLE_SIZE
+    return set(
+        zlib.crc32(text[start:start + size].encode('utf-8'))
+        for start in range(max(len(text) - size + 1, 1))
+    )
+
+
+def signature(text):
+    ''' MinHash signature of a normalized text.
+    '''
+    hashes = shingles(text)
+    return [min(map(mask.__xor__, hashes)) for mask in HASH_MASKS]
+
+
+def buckets(title, description):
+    ''' LSH buckets of an issue's title and description, one per band, as
+    signed 64 bit integers. Empty texts have no buckets.
+    '''
+    text = normalize(title, description)
+    if not text:
+        return []
+    values = signature(text)
+    result = []
+    for band in range(SIMILARITY_BANDS):
+        rows = values[band * SIMILARITY_ROWS:(band + 1) * SIMILARITY_ROWS]
+        digest = hashlib.blake2b(
+            struct.pack('>{}Q'.format(len(rows) + 1), band, *rows),
+            digest_size=8,
+        ).digest()
+        result.append(int.from_bytes(digest, 'big', signed=True))
+    return result
@@ -0,0 +1,201 @@
+''' Recording the slow SQL queries of the views.
+
+SlowQueryMiddleware times every query a view makes. Queries slower than
+SLOW_QUERY_MS are kept until the response is ready and are then recorded
+as SlowQuery rows, one per fingerprint: the SHA-1 of the SQL with its
+literals and lists of parameters replaced, so that the same query with
+other values or another number of ids is counted together. A row counts
+the queries, keeps the timings of the latest SLOW_QUERY_SAMPLES for their
+percentiles, and keeps the slowest query with its view, URL name and
+parameters and the database's EXPLAIN output for it. The slow_queries
+command lists the worst.
+
+Add 'issuetrack.slowqueries.SlowQueryMiddleware' to MIDDLEWARE_CLASSES.
+'''
+
+from __future__ import absolute_import
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+
+from django.db import DatabaseError, connections, router
+from django.db import transaction
+from django.utils import timezone
+from issuetrack.models import SlowQuery
+from issuetrack.settings import SLOW_QUERY_MS, SLOW_QUERY_SAMPLES
+
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+''' Replacements making the SQL of a query its normalized form: string and
+number literals, lists of parameters and runs of whitespace.
+'''
+
+EXPLAIN = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+''' The EXPLAIN statement of each database vendor, by default EXPLAIN.
+'''
+
+_requests = threading.local()
+''' The view of the current thread's request and its slow queries.
+'''
+
+
+def normalize(sql):
+    ''' The SQL with its literals and lists of parameters replaced.
+    '''
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def percentile(values, share):
+    ''' The value below which the share of the values lie, by the nearest
+    rank.
+    '''
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[max(0, int(math.ceil(share * len(values))) - 1)]
+
+
+def explain(alias, sql, params):
+    ''' The database's plan for a SELECT query, or the error explaining it.
+    '''
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    connection = connections[alias]
+    try:
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(
+                EXPLAIN.get(connection.vendor, 'EXPLAIN ') + sql, params)
+            return '\n'.join(
+                ' '.join(str(column) for column in row)
+                for row in cursor.fetchall())
+    except DatabaseError as error:
+        return 'EXPLAIN failed: {}'.format(error)
+
+
+def record(alias, sql, params, duration, view, url_name, parameters):
+    ''' Count a slow query under its fingerprint. The plan is taken for the
+    first query of a fingerprint and for each slower one.
+    '''
+    normalized = normalize(sql)
+    fingerprint = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    slowest = SlowQuery.objects.filter(fingerprint=fingerprint).values_list(
+        'max_time', flat=True).first()
+    plan = None
+    if slowest is None or duration > slowest:
+        plan = explain(alias, sql, params)
+    with transaction.atomic(using=router.db_for_write(SlowQuery)):
+        row, created = SlowQuery.objects.select_for_update().get_or_create(
+            fingerprint=fingerprint, defaults={'sql': normalized})
+        timings = json.loads(row.timings) + [round(duration, 3)]
+        row.timings = json.dumps(timings[-SLOW_QUERY_SAMPLES:])
+        row.count += 1
+        row.total_time += duration
+        row.last_seen = timezone.now()
+        if duration > row.max_time:
+            row.max_time = duration
+            row.example = '{} -- {!r}'.format(sql, params)
+            row.database = alias
+            row.view = view
+            row.url_name = url_name or ''
+            row.parameters = parameters
+            if plan is not None:
+                row.plan = plan
+        row.save()
+
+
+class ObservedCursor(object):
+    ''' Cursor timing the queries of the request being handled.
+    '''
+
+    def __init__(self, cursor, db):
+        self.cursor = cursor
+        self.db = db
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return self.cursor.__exit__(type, value, traceback)
+
+    def _observe(self, sql, params, started):
+        duration = (time.time() - started) * 1000
+        slow = getattr(_requests, 'slow', None)
+        if slow is not None and duration > SLOW_QUERY_MS:
+            slow.append((self.db.alias, sql, params, duration))
+
+    def execute(self, sql, params=None):
+        started = time.time()
+        try:
+            return self.cursor.execute(sql, params)
+        finally:
+            self._observe(sql, params, started)
+
+    def executemany(self, sql, param_list):
+        started = time.time()
+        try:
+            return self.cursor.executemany(sql, param_list)
+        finally:
+            self._observe(sql, None, started)
+
+
+def observe(connection):
+    ''' Have the cursors of a database connection time their queries.
+    '''
+    if getattr(connection, 'observed', False):
+        return
+    make_cursor = connection.make_cursor
+    make_debug_cursor = connection.make_debug_cursor
+    connection.make_cursor = lambda cursor: ObservedCursor(
+        make_cursor(cursor), connection)
+    connection.make_debug_cursor = lambda cursor: ObservedCursor(
+        make_debug_cursor(cursor), connection)
+    connection.observed = True
+
+
+class SlowQueryMiddleware(object):
+    ''' Record the slow queries of the views.
+    '''
+
+    def process_request(self, request):
+        for connection in connections.all():
+            observe(connection)
+        _requests.slow = []
+        _requests.view = ('', '', '{}')
+
+    def process_view(self, request, view, view_args, view_kwargs):
+        match = getattr(request, 'resolver_match', None)
+        _requests.view = (
+            '{}.{}'.format(view.__module__, getattr(
+                view, '__name__', type(view).__name__)),
+            match.url_name if match else '',
+            json.dumps({
+                'args': view_args,
+                'kwargs': view_kwargs,
+                'query': dict(request.GET.lists()),
+            }, default=str, sort_keys=True),
+        )
+
+    def process_response(self, request, response):
+        slow = getattr(_requests, 'slow', None)
+        _requests.slow = None
+        for alias, sql, params, duration in slow or []:
+            record(alias, sql, params, duration, *_requests.view)
+        return response
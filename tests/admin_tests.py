@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from issuetrack.models import Comment, Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * mock imported to lower the count limit.
+    * reverse imported for use with calling views.
+    * connection and CaptureQueriesContext imported to count the queries of
+      a changelist.
+    * TestCase imported for AdminTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * Comment, Component, Issue and Project imported as the listed models.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class AdminTest(TestCase):
+    ''' Test the admin console's changelists.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        self.component = Component.objects.create(name='UI', project=project)
+        self.add_issues(3)
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def add_issues(self, count):
+        ''' Add issues with a comment each.
+        '''
+        for i in range(count):
+            issue = Issue.objects.create(
+                title='Crash {}'.format(i),
+                description='It crashed.',
+                creater=self.admin_user,
+                assignee=self.admin_user,
+                kind=ISSUE_KIND_CODES['Bug'],
+                priority=ISSUE_PRIORITY_CODES['Major'],
+                urgency=ISSUE_URGENCY_CODES['Indefinite'],
+                component=self.component,
+            )
+            Comment.objects.create(
+                issue=issue, text='Seen it.', author=self.admin_user,
+                issue_status=ISSUE_STATUS_CODES['New'])
+
+    def changelist(self, model, **params):
+        ''' Get a changelist and the number of queries it took.
+        '''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:issuetrack_{}_changelist'.format(model)),
+                params,
+            )
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        ''' Listing more rows does not take more queries.
+        '''
+
+        for model in ('issue', 'comment', 'component', 'project'):
+            before = self.changelist(model)[1]
+            self.add_issues(3)
+            self.assertEqual(self.changelist(model)[1], before, model)
+
+    def test_count_is_bounded(self):
+        ''' Results over the count limit are shown as the limit.
+        '''
+
+        with mock.patch('issuetrack.admin.ADMIN_COUNT_LIMIT', 2):
+            response = self.changelist('issue')[0]
+
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_search_by_key(self):
+        ''' Issues and comments are found by issue key.
+        '''
+
+        issue = Issue.objects.get(number=2)
+
+        response = self.changelist('issue', q='TP1-2')[0]
+        self.assertEqual(list(response.context['cl'].result_list), [issue])
+
+        response = self.changelist('issue', q='Crash 1')[0]
+        self.assertEqual(
+            [i.title for i in response.context['cl'].result_list],
+            ['Crash 1'])
+
+        response = self.changelist('comment', q='TP1-2')[0]
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            list(issue.comment_set.all()),
+        )
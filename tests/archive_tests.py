@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.six import StringIO
+from issuetrack.models import ArchivedIssue, Comment, Issue
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * timedelta and timezone imported to age issues.
+    * call_command imported to run the archive_issues command.
+    * reverse imported for use with calling views.
+    * TestCase imported for ArchiveTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's progress output.
+    * ArchivedIssue, Comment and Issue imported as the archived models.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class ArchiveTest(TestCase):
+    ''' Test archiving old closed issues and reopening them.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.old = timezone.now() - timedelta(days=400)
+        self.closed = Issue.objects.create(
+            title='Old closed issue',
+            description='Fixed long ago.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            status=ISSUE_STATUS_CODES['Closed'],
+        )
+        Comment.objects.create(
+            issue=self.closed, text='Fixed.', author=self.admin_user,
+            issue_status=ISSUE_STATUS_CODES['Closed'])
+        Issue.objects.filter(pk=self.closed.pk).update(
+            created=self.old, modified=self.old)
+        ''' An issue closed and untouched for more than a year.
+        '''
+
+        self.open = Issue.objects.create(
+            title='Old open issue',
+            description='Still broken.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            status=ISSUE_STATUS_CODES['Open'],
+        )
+        Issue.objects.filter(pk=self.open.pk).update(modified=self.old)
+        ''' An old issue that is not in a terminal status.
+        '''
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def test_archive_moves_only_old_terminal_issues(self):
+        ''' Only the closed issue and its comment are moved.
+        '''
+
+        call_command('archive_issues', stdout=StringIO())
+
+        self.assertEqual(
+            list(Issue.objects.values_list('pk', flat=True)), [self.open.pk])
+        archived = ArchivedIssue.objects.get(pk=self.closed.pk)
+        self.assertEqual(archived.archivedcomment_set.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_archived_issue_is_read_only(self):
+        ''' The archived issue is still shown, without edit links.
+        '''
+
+        call_command('archive_issues', stdout=StringIO())
+
+        response = self.client.get(
+            reverse('issue', kwargs={'issue_id': self.closed.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Reopen Issue', str(response.content))
+        self.assertNotIn('Add Comment', str(response.content))
+
+    def test_reopen_restores_issue_and_comments(self):
+        ''' Reopening moves the issue back with its created date kept.
+        '''
+
+        call_command('archive_issues', stdout=StringIO())
+
+        self.client.post(
+            reverse('reopen_issue', kwargs={'issue_id': self.closed.pk}))
+
+        issue = Issue.objects.get(pk=self.closed.pk)
+        self.assertEqual(issue.status, ISSUE_STATUS_CODES['Open'])
+        self.assertEqual(issue.created, self.old)
+        self.assertEqual(issue.comment_set.count(), 1)
+        self.assertFalse(ArchivedIssue.objects.exists())
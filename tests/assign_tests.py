@@ -0,0 +1,179 @@
+from unittest import mock
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from issuetrack.models import AssigneeLoad, Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * mock imported to exhaust the compare-and-set attempts.
+    * reverse imported for use with calling views.
+    * TestCase imported for AutoAssignTest.
+    * Client imported for instantiating web client.
+    * User imported for creating the project members.
+    * AssigneeLoad, Component, Issue and Project imported as the models
+      involved.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class AutoAssignTest(TestCase):
+    ''' Test assigning new issues by the members' workloads.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+        self.ann = User.objects.create(username='ann')
+        self.bob = User.objects.create(username='bob')
+
+        self.project = Project.objects.create(
+            name='Test Project1',
+            key='TP1',
+            owner=self.admin_user,
+            auto_assign=True,
+        )
+        self.project.members.add(self.ann, self.bob)
+        self.component = Component.objects.create(
+            name='UI', project=self.project)
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def add_issue(self, priority='Major', urgency='Indefinite', **fields):
+        ''' Create an issue in the component.
+        '''
+        fields.setdefault('component', self.component)
+        return Issue.objects.create(
+            title='Crash',
+            description='It crashed.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES[priority],
+            urgency=ISSUE_URGENCY_CODES[urgency],
+            **fields
+        )
+
+    def loads(self):
+        ''' The members' workloads by username.
+        '''
+        return dict(
+            (row.user.username, row.load)
+            for row in AssigneeLoad.objects.filter(project=self.project))
+
+    def test_lowest_workload_is_picked(self):
+        ''' New issues go to the member with the lowest workload, taking
+        turns while the workloads are equal.
+        '''
+
+        first = self.add_issue()
+        second = self.add_issue()
+        self.assertEqual(
+            set([first.assignee_id, second.assignee_id]),
+            set([self.ann.pk, self.bob.pk]),
+        )
+        self.assertEqual(self.loads(), {'ann': 3, 'bob': 3})
+
+        self.add_issue(priority='Blocker', urgency='ASAP', assignee=self.ann)
+        self.assertEqual(self.loads(), {'ann': 35, 'bob': 3})
+        self.assertEqual(self.add_issue().assignee, self.bob)
+
+    def test_workload_follows_changes(self):
+        ''' Reassigning, reprioritizing and closing an issue move its
+        weight.
+        '''
+
+        issue = self.add_issue(assignee=self.ann)
+        issue.apply_changes(assignee=self.bob)
+        self.assertEqual(self.loads(), {'ann': 0, 'bob': 3})
+
+        issue.priority = ISSUE_PRIORITY_CODES['Blocker']
+        issue.save()
+        self.assertEqual(self.loads(), {'ann': 0, 'bob': 8})
+
+        issue.apply_changes(status=ISSUE_STATUS_CODES['Closed'])
+        self.assertEqual(self.loads(), {'ann': 0, 'bob': 0})
+
+    def test_switched_off(self):
+        ''' Components can turn auto-assignment off, and issues with an
+        assignee or without a component keep theirs.
+        '''
+
+        self.component.auto_assign = False
+        self.component.save()
+
+        self.assertIsNone(self.add_issue().assignee)
+        self.assertIsNone(self.add_issue(component=None).assignee)
+
+    def test_removed_members_are_not_picked(self):
+        ''' Only current members are picked, and nothing is assigned when a
+        project has none.
+        '''
+
+        self.project.members.remove(self.ann)
+        self.assertEqual(self.add_issue().assignee, self.bob)
+        self.assertEqual(self.add_issue().assignee, self.bob)
+
+        self.project.members.clear()
+        self.assertIsNone(self.add_issue().assignee)
+
+    def test_rebuild(self):
+        ''' Rebuilding the workloads, as deleting a component does, gives
+        the maintained ones.
+        '''
+
+        for i in range(4):
+            self.add_issue(urgency='7 days')
+        self.add_issue(assignee=self.admin_user)
+        loads = self.loads()
+        AssigneeLoad.objects.update(load=0)
+
+        AssigneeLoad.rebuild(self.project.pk)
+        self.assertEqual(self.loads(), loads)
+
+        self.client.get(reverse(
+            'delete_component', kwargs={'component_id': self.component.pk}))
+        self.assertEqual(self.loads(), {'admin': 0, 'ann': 0, 'bob': 0})
+
+    def test_form_issues_are_assigned(self):
+        ''' Issues added with the form without an assignee get one.
+        '''
+
+        response = self.client.post(
+            reverse('add_issue'),
+            {
+                'title': 'Form issue',
+                'description': 'Created from the form.',
+                'kind': ISSUE_KIND_CODES['Info'],
+                'priority': ISSUE_PRIORITY_CODES['Major'],
+                'urgency': ISSUE_URGENCY_CODES['ASAP'],
+                'component': self.component.pk,
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        issue = Issue.objects.get(title='Form issue')
+        self.assertIn(issue.assignee, [self.ann, self.bob])
+
+    def test_locked_after_retries(self):
+        ''' Once the compare-and-set attempts are used up, the member with
+        the lowest workload is still the one picked, under a row lock.
+        '''
+
+        self.add_issue(priority='Blocker', urgency='ASAP', assignee=self.ann)
+        with mock.patch('issuetrack.models.AUTO_ASSIGN_RETRIES', 0):
+            self.assertEqual(self.add_issue().assignee, self.bob)
+            self.assertEqual(self.loads(), {'ann': 32, 'bob': 3})
+
+            self.project.members.clear()
+            self.assertIsNone(self.add_issue().assignee)
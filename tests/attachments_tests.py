@@ -0,0 +1,188 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.attachments import attachment_root, blob_path
+from issuetrack.models import Attachment, Blob, Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * hashlib imported to compute the expected content hash.
+    * os, shutil and tempfile imported to keep the files in a scratch
+      MEDIA_ROOT.
+    * SimpleUploadedFile imported to build the uploaded files.
+    * call_command imported to run the purge_deleted command.
+    * reverse imported for use with calling views.
+    * TestCase imported for AttachmentsTest.
+    * Client imported for instantiating web client.
+    * override_settings imported to point MEDIA_ROOT at the scratch directory.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's progress output.
+    * attachment_root and blob_path imported to find the stored files.
+    * Attachment, Blob, Component, Issue and Project imported as the models
+      involved.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+LOG = b'ERROR something failed\n' * 1000
+''' Content attached in the tests.
+'''
+
+
+class AttachmentsTest(TestCase):
+    ''' Test uploading, deduplicating and downloading attachments.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.media_root = tempfile.mkdtemp()
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        component = Component.objects.create(name='UI', project=self.project)
+        self.issues = [
+            Issue.objects.create(
+                title='Crash {}'.format(i),
+                description='It crashed.',
+                creater=self.admin_user,
+                kind=ISSUE_KIND_CODES['Task'],
+                priority=ISSUE_PRIORITY_CODES['Major'],
+                urgency=ISSUE_URGENCY_CODES['Indefinite'],
+                component=component,
+            )
+            for i in range(2)
+        ]
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def tearDown(self):
+        ''' Remove the scratch MEDIA_ROOT.
+        '''
+        self.media_settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, issue):
+        ''' Attach the log to the given issue.
+        '''
+        return self.client.post(
+            reverse('add_attachment', kwargs={'issue_id': issue.id}),
+            {'file': SimpleUploadedFile('crash.log', LOG, 'text/plain')},
+        )
+
+    def download(self, **headers):
+        ''' Download the first attachment.
+        '''
+        return self.client.get(
+            reverse('attachment', kwargs={
+                'attachment_id': Attachment.objects.order_by('pk')[0].pk}),
+            **headers
+        )
+
+    def test_same_content_stored_once(self):
+        ''' The same log attached to two issues is stored once.
+        '''
+
+        for issue in self.issues:
+            self.assertEqual(self.upload(issue).status_code, 302)
+
+        sha256 = hashlib.sha256(LOG).hexdigest()
+        self.assertEqual(Attachment.objects.count(), 2)
+        self.assertEqual(list(Blob.objects.all()), [Blob(sha256=sha256)])
+        self.assertTrue(os.path.exists(blob_path(sha256)))
+        self.assertEqual(
+            os.listdir(os.path.dirname(blob_path(sha256))),
+            [sha256],
+        )
+        self.assertEqual(
+            os.listdir(os.path.join(attachment_root(), 'tmp')), [])
+        ''' The second upload's temporary file was dropped.
+        '''
+
+    def test_download_ranges_and_validators(self):
+        ''' Downloads answer Range and conditional requests.
+        '''
+
+        self.upload(self.issues[0])
+
+        response = self.download()
+        self.assertEqual(b''.join(response.streaming_content), LOG)
+        self.assertEqual(response['Content-Length'], str(len(LOG)))
+
+        response = self.download(HTTP_RANGE='bytes=6-14')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), LOG[6:15])
+        self.assertEqual(
+            response['Content-Range'], 'bytes 6-14/{}'.format(len(LOG)))
+
+        response = self.download(HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), LOG[-4:])
+
+        response = self.download(HTTP_RANGE='bytes={}-'.format(len(LOG)))
+        self.assertEqual(response.status_code, 416)
+
+        response = self.download(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_attachment(self):
+        ''' A file attached with a comment is listed with the comment.
+        '''
+
+        self.client.post(
+            reverse('add_comment', kwargs={'issue_id': self.issues[0].id}),
+            {
+                'status': ISSUE_STATUS_CODES['Open'],
+                'text': 'Log attached.',
+                'audience': 'Public',
+                'attachment': SimpleUploadedFile('crash.log', LOG),
+            },
+        )
+
+        attachment = Attachment.objects.get()
+        self.assertEqual(attachment.comment.text, 'Log attached.')
+
+        response = self.client.get(
+            reverse('issue', kwargs={'issue_id': self.issues[0].id}))
+        self.assertEqual(
+            response.context['comment_list'][0].attachment_list, [attachment])
+
+    def test_purge_removes_files(self):
+        ''' Purging a deleted project removes its attachments and files.
+        '''
+
+        self.upload(self.issues[0])
+        sha256 = Blob.objects.get().sha256
+        self.client.get(
+            reverse('delete_project', kwargs={'project_id': self.project.id}))
+
+        call_command('purge_deleted', stdout=StringIO())
+
+        self.assertFalse(Attachment.objects.exists())
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(blob_path(sha256)))
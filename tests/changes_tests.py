@@ -0,0 +1,195 @@
+import json
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.six import StringIO
+from issuetrack.archive import archive_issues
+from issuetrack.changes import changes_since
+from issuetrack.models import Comment, Component, Issue, Project, Tombstone
+from issuetrack.purge import purge_deleted
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * json imported to read the command's output.
+    * timedelta imported to age the changes.
+    * call_command imported to run the changes command.
+    * reverse imported for use with calling views.
+    * TestCase imported for ChangeFeedTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * timezone imported to age the changes.
+    * StringIO imported to capture the command's output.
+    * archive_issues imported to check that archiving deletes nothing.
+    * changes_since imported as the function under test.
+    * Comment, Component, Issue, Project and Tombstone imported as the models
+      reported.
+    * purge_deleted imported to check that purging records no tombstones.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class ChangeFeedTest(TestCase):
+    ''' Test the feed of changes since a cursor.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        self.component = Component.objects.create(
+            name='UI', project=self.project)
+        self.issue = Issue.objects.create(
+            title='Crash',
+            description='It crashed.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=self.component,
+        )
+        self.comment = Comment.objects.create(
+            issue=self.issue, text='Seen it.', author=self.admin_user,
+            issue_status=ISSUE_STATUS_CODES['New'])
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def kinds(self, changes):
+        ''' The (kind, id, deleted) of the changes.
+        '''
+        return [
+            (change['kind'], change['id'], change['deleted'])
+            for change in changes
+        ]
+
+    def test_changes_in_order(self):
+        ''' The changes come in the order they were made, page by page, and
+        the cursor continues after the last one given.
+        '''
+
+        changes, cursor, more = changes_since(limit=3, settle=0)
+        self.assertEqual(self.kinds(changes), [
+            ('project', self.project.pk, False),
+            ('component', self.component.pk, False),
+            ('issue', self.issue.pk, False),
+        ])
+        self.assertTrue(more)
+        self.assertEqual(changes[2]['data']['title'], 'Crash')
+
+        changes, cursor, more = changes_since(cursor, limit=3, settle=0)
+        self.assertEqual(
+            self.kinds(changes), [('comment', self.comment.pk, False)])
+        self.assertFalse(more)
+        self.assertEqual(changes_since(cursor, settle=0), ([], cursor, False))
+
+        self.issue.apply_changes(status=ISSUE_STATUS_CODES['Open'])
+        changes, cursor, more = changes_since(cursor, settle=0)
+        self.assertEqual(
+            self.kinds(changes), [('issue', self.issue.pk, False)])
+
+    def test_recent_changes_are_held_back(self):
+        ''' Changes younger than the settle time are left for later.
+        '''
+
+        self.assertEqual(changes_since(settle=60)[0], [])
+        Issue.objects.update(modified=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(
+            self.kinds(changes_since(settle=60)[0]),
+            [('issue', self.issue.pk, False)],
+        )
+
+    def test_deletions_are_tombstones(self):
+        ''' Deleting a component, or an issue with its comments, records
+        tombstones, while archiving and purging do not.
+        '''
+
+        cursor = changes_since(settle=0)[1]
+        self.issue.apply_changes(status=ISSUE_STATUS_CODES['Closed'])
+        archive_issues(days=-1)
+        other = Component.objects.create(name='API', project=self.project)
+        self.client.get(reverse(
+            'delete_component', kwargs={'component_id': self.component.pk}))
+        purge_deleted()
+
+        changes = changes_since(cursor, settle=0)[0]
+        self.assertEqual(self.kinds(changes), [
+            ('component', other.pk, False),
+            ('component', self.component.pk, True),
+        ])
+
+        issue = Issue.objects.create(
+            title='Freeze',
+            description='It froze.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=other,
+        )
+        comment = Comment.objects.create(
+            issue=issue, text='Again.', author=self.admin_user,
+            issue_status=ISSUE_STATUS_CODES['New'])
+        issue_id = issue.pk
+        issue.delete()
+        self.assertEqual(
+            sorted(Tombstone.objects.values_list('kind', 'object_id')),
+            [
+                ('comment', comment.pk),
+                ('component', self.component.pk),
+                ('issue', issue_id),
+            ],
+        )
+
+    def test_view_and_command(self):
+        ''' Staff read the feed as JSON from the view and the command.
+        '''
+
+        Tombstone.objects.create(
+            kind='issue', object_id=99,
+            deleted=timezone.now() - timedelta(minutes=1))
+        for model in (Project, Component, Issue, Comment):
+            model._base_manager.update(
+                modified=timezone.now() - timedelta(minutes=2))
+
+        response = self.client.get(reverse('changes'), {'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        page = json.loads(response.content.decode())
+        self.assertEqual(len(page['changes']), 3)
+        self.assertTrue(page['more'])
+        response = self.client.get(
+            reverse('changes'), {'since': page['cursor']})
+        page = json.loads(response.content.decode())
+        self.assertEqual(self.kinds(page['changes']), [
+            ('comment', self.comment.pk, False),
+            ('issue', 99, True),
+        ])
+        self.assertFalse(page['more'])
+
+        response = self.client.get(reverse('changes'), {'since': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+        out = StringIO()
+        call_command('changes', batch_size=2, stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(lines[-1], {'cursor': page['cursor']})
+
+        self.admin_user.is_staff = self.admin_user.is_superuser = False
+        self.admin_user.save()
+        response = self.client.get(reverse('changes'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,99 @@
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from issuetrack.models import Issue
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * reverse imported for use with calling views.
+    * TestCase imported for CodesTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * Issue imported as the model with coded fields.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class CodesTest(TestCase):
+    ''' Test the integer coded status, priority, kind and urgency fields.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        for priority, urgency in (
+                ('Minor', '7 days'), ('Blocker', '42 days'),
+                ('Trivial', 'ASAP'), ('Critical', '21 days')):
+            Issue.objects.create(
+                title='{} issue'.format(priority),
+                description='Something is broken.',
+                creater=self.admin_user,
+                kind=ISSUE_KIND_CODES['Task'],
+                priority=ISSUE_PRIORITY_CODES[priority],
+                urgency=ISSUE_URGENCY_CODES[urgency],
+            )
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def test_order_by_severity(self):
+        ''' Priorities and urgencies sort from the most to the least severe.
+        '''
+
+        self.assertEqual(
+            [i.get_priority_display()
+             for i in Issue.objects.order_by('priority')],
+            ['Blocker', 'Critical', 'Minor', 'Trivial'],
+        )
+        self.assertEqual(
+            [i.get_urgency_display()
+             for i in Issue.objects.order_by('urgency')],
+            ['ASAP', '7 days', '21 days', '42 days'],
+        )
+
+    def test_index_shows_labels(self):
+        ''' The issue list shows the labels, in priority order.
+        '''
+
+        response = self.client.get(reverse('index'), {'order_by': 'priority'})
+        content = response.content.decode()
+
+        self.assertLess(content.index('Blocker'), content.index('Trivial'))
+        self.assertIn('Task', content)
+        self.assertIn('New', content)
+
+    def test_add_issue_stores_codes(self):
+        ''' Issues created through the form store the codes.
+        '''
+
+        response = self.client.post(
+            reverse('add_issue'),
+            {
+                'title': 'Form issue',
+                'description': 'Created from the form.',
+                'kind': ISSUE_KIND_CODES['Info'],
+                'priority': ISSUE_PRIORITY_CODES['Major'],
+                'urgency': ISSUE_URGENCY_CODES['ASAP'],
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        issue = Issue.objects.get(title='Form issue')
+        self.assertEqual(issue.kind, ISSUE_KIND_CODES['Info'])
+        self.assertEqual(issue.status, ISSUE_STATUS_CODES['New'])
@@ -0,0 +1,150 @@
+import gzip
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from issuetrack.compression import brotli, negotiate
+from issuetrack.loaders import PRESERVED, collapse_whitespace
+from issuetrack.models import Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_URGENCY_CODES
+'''
+    * gzip imported to read the compressed pages.
+    * skipUnless imported to skip the brotli test without brotli.
+    * settings imported to extend the project's middleware and templates.
+    * reverse imported for use with calling views.
+    * TestCase imported for CompressionTest.
+    * Client imported for instantiating web client.
+    * override_settings imported to install the loader and middleware.
+    * User imported for creating and testing with a created user in the system.
+    * brotli and negotiate imported to test choosing the encoding.
+    * PRESERVED and collapse_whitespace imported to test the loader's work.
+    * Component, Issue and Project imported to fill the index page.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+COLLAPSING_TEMPLATES = [dict(
+    settings.TEMPLATES[0],
+    APP_DIRS=False,
+    OPTIONS=dict(settings.TEMPLATES[0].get('OPTIONS', {}), loaders=[
+        ('django.template.loaders.cached.Loader', [
+            ('issuetrack.loaders.Loader', [
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ]),
+    ]),
+)]
+''' The test project's templates loaded through issuetrack.loaders.Loader.
+'''
+
+
+class CompressionTest(TestCase):
+    ''' Test collapsing the templates' whitespace and compressing the
+    responses.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        component = Component.objects.create(name='UI', project=project)
+        for i in range(10):
+            Issue.objects.create(
+                title='Issue {}'.format(i),
+                description='Something is broken.',
+                creater=self.admin_user,
+                kind=ISSUE_KIND_CODES['Bug'],
+                priority=ISSUE_PRIORITY_CODES['Major'],
+                urgency=ISSUE_URGENCY_CODES['Indefinite'],
+                component=component,
+            )
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def test_collapse_whitespace(self):
+        ''' Indentation and blank lines are dropped, except in pre,
+        textarea and script elements.
+        '''
+
+        self.assertEqual(
+            collapse_whitespace(
+                '\t<table>\n\t{% for a in b %}\n\t<tr>\n\n'
+                '\t\t<td>{{ a }} b</td>\n\t</tr>\n\t{% endfor %}\n</table>\n'
+                '<pre>\n\tkept\n</pre>\n\t<script>\n\tkept();\n</script>\n'),
+            '\n<table>\n{% for a in b %}<tr>\n'
+            '<td>{{ a }} b</td>\n</tr>\n{% endfor %}</table>\n'
+            '<pre>\n\tkept\n</pre>\n<script>\n\tkept();\n</script>\n',
+        )
+
+    def test_collapsed_pages(self):
+        ''' Pages rendered through the loader lose their indentation.
+        '''
+
+        indented = self.client.get(reverse('index')).content.decode()
+        with override_settings(TEMPLATES=COLLAPSING_TEMPLATES):
+            collapsed = self.client.get(reverse('index')).content.decode()
+            self.assertEqual(
+                self.client.get(reverse('index')).content.decode(),
+                collapsed,
+            )
+
+        self.assertIn('Issue 9', collapsed)
+        outside = PRESERVED.sub('<script/>', collapsed)
+        self.assertNotIn('\t', outside)
+        self.assertNotIn('\n\n\n', outside)
+        self.assertLess(len(collapsed), len(indented) * 4 / 5)
+
+    def test_negotiate(self):
+        ''' The most wanted encoding the client accepts is chosen.
+        '''
+
+        self.assertEqual(negotiate('gzip, deflate')[0], 'gzip')
+        self.assertEqual(negotiate('*;q=0.5')[0], 'br' if brotli else 'gzip')
+        self.assertIsNone(negotiate('gzip;q=0, identity'))
+        self.assertIsNone(negotiate(''))
+
+    @override_settings(MIDDLEWARE_CLASSES=[
+        'issuetrack.compression.CompressionMiddleware',
+    ] + settings.MIDDLEWARE_CLASSES)
+    def test_gzip(self):
+        ''' Pages are gzipped for clients accepting it.
+        '''
+
+        plain = self.client.get(reverse('index'))
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(plain['Vary'], 'Cookie, Accept-Encoding')
+
+        response = self.client.get(
+            reverse('index'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content))
+
+    @skipUnless(brotli, 'needs the brotli package')
+    @override_settings(MIDDLEWARE_CLASSES=[
+        'issuetrack.compression.CompressionMiddleware',
+    ] + settings.MIDDLEWARE_CLASSES)
+    def test_brotli(self):
+        ''' Brotli is preferred when the client accepts it.
+        '''
+
+        plain = self.client.get(reverse('index'))
+        response = self.client.get(
+            reverse('index'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
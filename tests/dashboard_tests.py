@@ -0,0 +1,144 @@
+from django.core.cache import caches
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from issuetrack.models import Component, Issue, Project
+from issuetrack.settings import DASHBOARD_CACHE, ISSUE_KIND_CODES
+from issuetrack.settings import ISSUE_PRIORITY_CODES, ISSUE_STATUS_CODES
+from issuetrack.settings import ISSUE_URGENCY_CODES
+'''
+    * caches imported to clear the dashboards between the tests.
+    * reverse imported for use with calling views.
+    * TestCase imported for DashboardTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * Component, Issue and Project imported as the summed up models.
+    * DASHBOARD_CACHE imported as the cache holding the dashboards.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class DashboardTest(TestCase):
+    ''' Test the cached project dashboard.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        caches[DASHBOARD_CACHE].clear()
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        ui = Component.objects.create(name='UI', project=self.project)
+        api = Component.objects.create(name='API', project=self.project)
+        self.issues = [
+            Issue.objects.create(
+                title='Issue {}'.format(i),
+                description='Something is broken.',
+                creater=self.admin_user,
+                assignee=self.admin_user if i % 2 else None,
+                kind=ISSUE_KIND_CODES['Bug'],
+                priority=ISSUE_PRIORITY_CODES[priority],
+                urgency=ISSUE_URGENCY_CODES['Indefinite'],
+                status=ISSUE_STATUS_CODES[status],
+                component=component,
+            )
+            for i, (status, priority, component) in enumerate([
+                ('New', 'Major', ui),
+                ('Open', 'Blocker', ui),
+                ('New', 'Major', api),
+                ('Closed', 'Major', api),
+            ])
+        ]
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def dashboard(self):
+        ''' Get the project's page and return its dashboard.
+        '''
+        response = self.client.get(
+            reverse('project', kwargs={'project_id': self.project.id}))
+        self.assertEqual(response.status_code, 200)
+        return response.context['dashboard']
+
+    def dashboard_from_cache(self):
+        ''' The cached dashboard of the project.
+        '''
+        return caches[DASHBOARD_CACHE].get(
+            Project.dashboard_cache_key(self.project.id))
+
+    def test_counts_open_issues(self):
+        ''' Open issues are counted per status, priority, component and
+        assignee.
+        '''
+
+        dashboard = self.dashboard()
+
+        self.assertEqual(dashboard['open'], 3)
+        self.assertEqual(dashboard['by_status'], [('New', 2), ('Open', 1)])
+        self.assertEqual(
+            dashboard['by_priority'], [('Blocker', 1), ('Major', 2)])
+        self.assertEqual(dashboard['by_component'], [('API', 1), ('UI', 2)])
+        self.assertEqual(
+            dashboard['by_assignee'], [('admin', 1), ('Unassigned', 2)])
+        self.assertEqual(
+            [issue['key'] for issue in dashboard['recent']],
+            ['TP1-4', 'TP1-3', 'TP1-2', 'TP1-1'],
+        )
+        self.assertEqual(
+            [issue['key'] for issue in dashboard['untouched']],
+            ['TP1-1', 'TP1-2', 'TP1-3'],
+        )
+
+    def test_cached_until_issues_change(self):
+        ''' The dashboard is served from the cache until an issue of the
+        project changes.
+        '''
+
+        self.dashboard()
+        self.assertEqual(self.dashboard_from_cache()['open'], 3)
+
+        self.issues[0].apply_changes(status=ISSUE_STATUS_CODES['Closed'])
+
+        self.assertIsNone(self.dashboard_from_cache())
+        self.assertEqual(self.dashboard()['open'], 2)
+        self.assertEqual(
+            self.dashboard()['untouched'][-1]['key'], 'TP1-3')
+
+    def test_lists_for_staff_only(self):
+        ''' Users who are not staff see the counts but not the issues of
+        other users.
+        '''
+
+        user = User.objects.create(username='user')
+        user.set_password('user')
+        user.save()
+        client = Client()
+        client.login(username='user', password='user')
+
+        response = client.get(
+            reverse('project', kwargs={'project_id': self.project.id}))
+        self.assertEqual(response.context['dashboard']['open'], 3)
+        self.assertNotIn('recent', response.context['dashboard'])
+        self.assertNotIn('untouched', response.context['dashboard'])
+        self.assertNotContains(response, 'Issue 1')
+        self.assertNotContains(response, 'Recently Updated')
+
+        self.assertIn('recent', self.dashboard())
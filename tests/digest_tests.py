@@ -0,0 +1,223 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.utils import timezone
+from issuetrack import events
+from issuetrack.digests import record, send_digests
+from issuetrack.models import Component, Issue, Project, Watch, WatchEvent
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * timedelta imported to expire the events.
+    * mock imported to send the events without waiting for them to settle.
+    * mail imported to read the digests sent.
+    * reverse imported for use with calling views.
+    * connection imported to count the queries recording an event.
+    * TestCase imported for DigestTest.
+    * Client imported for instantiating web client.
+    * CaptureQueriesContext imported to count the queries recording an
+      event.
+    * User imported for creating and testing with a created user in the system.
+    * timezone imported to expire the events.
+    * events imported to announce the new issue.
+    * record and send_digests imported as the functions under test.
+    * Component, Issue, Project, Watch and WatchEvent imported as the models
+      involved.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class DigestTest(TestCase):
+    ''' Test watching issues and projects and sending the digests.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+        self.staff_user = User.objects.create(
+            username='staff', email='staff@localhost', is_staff=True)
+        self.staff_user.set_password('staff')
+        self.staff_user.save()
+        self.user = User.objects.create(
+            username='user', email='user@localhost')
+        self.user.set_password('user')
+        self.user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        component = Component.objects.create(name='UI', project=self.project)
+        self.issue = Issue.objects.create(
+            title='Crash',
+            description='It crashed.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=component,
+        )
+        events.issue_created(self.issue)
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def comment(self, text, audience, status='Open', issue=None):
+        ''' Comment on the issue, by default the admin's, as the admin user.
+        '''
+        issue = issue or self.issue
+        self.client.post(
+            reverse('add_comment', kwargs={'issue_id': issue.id}),
+            {
+                'status': ISSUE_STATUS_CODES[status],
+                'text': text,
+                'audience': audience,
+            },
+        )
+
+    def digests(self):
+        ''' Recipient and body of each digest sent, by recipient.
+        '''
+        return dict(
+            (message.to[0], message.body) for message in mail.outbox)
+
+    @mock.patch('issuetrack.digests.DIGEST_SETTLE_SECONDS', 0)
+    def test_digests(self):
+        ''' Each watcher gets one message with the events they may hear
+        about since they started watching, and not their own.
+        '''
+
+        self.assertTrue(Watch.objects.filter(
+            user=self.admin_user, issue_id=self.issue.id).exists())
+        staff = Client()
+        staff.login(username='staff', password='staff')
+        staff.post(reverse('watch_issue', kwargs={'issue_id': self.issue.id}))
+        user = Client()
+        user.login(username='user', password='user')
+        user.post(reverse(
+            'watch_project', kwargs={'project_id': self.project.id}))
+
+        own_issue = Issue.objects.create(
+            title='Typo',
+            description='A typo.',
+            creater=self.user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Minor'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=self.issue.component,
+        )
+
+        self.comment('Seen it.', 'Public')
+        self.comment('Internal note.', 'Private', status='In Progress')
+        self.comment('Reproduced.', 'Public', issue=own_issue)
+
+        self.assertEqual(send_digests(), 2)
+        digests = self.digests()
+        self.assertEqual(
+            sorted(digests), ['staff@localhost', 'user@localhost'])
+        self.assertIn('TP1-1 Crash', digests['staff@localhost'])
+        self.assertIn(
+            'admin commented: Seen it.', digests['staff@localhost'])
+        self.assertIn(
+            'admin commented: Internal note.', digests['staff@localhost'])
+        self.assertIn(
+            'Status set to In Progress.', digests['staff@localhost'])
+        self.assertNotIn('Reproduced.', digests['staff@localhost'])
+        self.assertIn('TP1-2 Typo', digests['user@localhost'])
+        self.assertIn('Status set to Open.', digests['user@localhost'])
+        self.assertIn(
+            'admin commented: Reproduced.', digests['user@localhost'])
+        self.assertIn(
+            reverse('issue', kwargs={'issue_id': own_issue.id}),
+            digests['user@localhost'],
+        )
+        self.assertNotIn('Crash', digests['user@localhost'])
+        self.assertNotIn('Seen it.', digests['user@localhost'])
+        ''' The project's watchers only hear about the issues they can see.
+        '''
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            [
+                'Issuetrack: 4 updates on 1 issues',
+                'Issuetrack: 2 updates on 1 issues',
+            ],
+        )
+
+        mail.outbox = []
+        self.assertEqual(send_digests(), 0)
+        user.post(reverse(
+            'watch_project', kwargs={'project_id': self.project.id}))
+        self.comment('Fixed.', 'Public', status='Resolved')
+        self.assertEqual(send_digests(), 1)
+        self.assertEqual(list(self.digests()), ['staff@localhost'])
+
+        send_digests(timezone.now() + timedelta(days=8))
+        self.assertFalse(WatchEvent.objects.exists())
+
+    def test_cheap_fan_out(self):
+        ''' Recording an event takes the same queries whatever the number of
+        watchers.
+        '''
+
+        with CaptureQueriesContext(connection) as few:
+            record(self.issue, 'comment.created', 'Seen it.')
+        Watch.objects.bulk_create(
+            Watch(user=User.objects.create(username='watcher{}'.format(i)),
+                  issue=self.issue)
+            for i in range(50))
+        with CaptureQueriesContext(connection) as many:
+            record(self.issue, 'comment.created', 'Seen it.')
+        self.assertEqual(len(many), len(few))
+
+    def test_watch_permissions(self):
+        ''' Users can watch only the issues they may see.
+        '''
+
+        user = Client()
+        user.login(username='user', password='user')
+        user.post(reverse('watch_issue', kwargs={'issue_id': self.issue.id}))
+        self.assertFalse(Watch.objects.filter(user=self.user).exists())
+
+        response = self.client.post(
+            reverse('watch_issue', kwargs={'issue_id': self.issue.id}))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Watch.objects.filter(user=self.admin_user).exists())
+        response = self.client.get(
+            reverse('issue', kwargs={'issue_id': self.issue.id}))
+        self.assertContains(response, 'Watch Issue')
+
+    @mock.patch('issuetrack.digests.DIGEST_SETTLE_SECONDS', 0)
+    def test_project_watch_visibility(self):
+        ''' Watching a project does not reveal the issues of other users,
+        which reach the watcher once they are staff.
+        '''
+
+        user = Client()
+        user.login(username='user', password='user')
+        user.post(reverse(
+            'watch_project', kwargs={'project_id': self.project.id}))
+        self.assertTrue(Watch.objects.filter(
+            user=self.user, project=self.project).exists())
+
+        self.comment('Seen it.', 'Public')
+        self.assertEqual(send_digests(), 0)
+        self.assertEqual(mail.outbox, [])
+
+        self.comment('Still there.', 'Public')
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(send_digests(), 1)
+        self.assertIn('Still there.', self.digests()['user@localhost'])
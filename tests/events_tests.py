@@ -0,0 +1,137 @@
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from issuetrack.models import Component, Issue, Project
+from issuetrack.pubsub import LocalBroker, CacheBroker, get_broker
+from issuetrack.pubsub import issue_channel
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_URGENCY_CODES
+'''
+    * reverse imported for use with calling views.
+    * TestCase imported for EventsTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * Issue imported as the model whose updates are streamed.
+    * Component and Project imported to delete the issue's component.
+    * LocalBroker, CacheBroker, get_broker and issue_channel imported as the
+      pub/sub layer under test.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class BrokerTest(TestCase):
+    ''' Test publishing and listening on both brokers.
+    '''
+
+    def check_broker(self, broker):
+        ''' Events after the given id are returned in order and listening
+        without new events times out empty.
+        '''
+
+        first = broker.publish('issue:1', 'comment', {'id': 1})
+        second = broker.publish('issue:1', 'status', {'status': 'Open'})
+
+        self.assertEqual(broker.last_id('issue:1'), second)
+        self.assertEqual(
+            broker.listen('issue:1', first, 0),
+            [(second, 'status', {'status': 'Open'})],
+        )
+        self.assertEqual(broker.listen('issue:1', second, 0), [])
+        self.assertEqual(broker.listen('issue:2', 0, 0), [])
+        ''' Channels do not see each other's events.
+        '''
+
+    def test_local_broker(self):
+        ''' LocalBroker publishes and listens.
+        '''
+        self.check_broker(LocalBroker())
+
+    def test_cache_broker(self):
+        ''' CacheBroker publishes and listens.
+        '''
+        self.check_broker(CacheBroker())
+
+    def test_backlog_is_bounded(self):
+        ''' Only the most recent events are kept for late listeners.
+        '''
+
+        broker = LocalBroker(backlog=2)
+        for i in range(5):
+            broker.publish('issue:1', 'comment', {'id': i})
+
+        self.assertEqual(
+            [e[0] for e in broker.listen('issue:1', 0, 0)], [4, 5])
+
+
+class EventStreamTest(TestCase):
+    ''' Test the Server-Sent Events view of an issue.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.issue = Issue.objects.create(
+            title='Streamed issue',
+            description='Something is broken.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+        )
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def test_stream_sends_published_event(self):
+        ''' A comment published for the issue is sent on its stream.
+        '''
+
+        channel = issue_channel(self.issue.id)
+        last_id = get_broker().last_id(channel)
+        get_broker().publish(channel, 'comment', {'id': 42})
+
+        response = self.client.get(
+            reverse('issue_events', kwargs={'issue_id': self.issue.id}),
+            {'last_event_id': last_id},
+        )
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        content = iter(response.streaming_content)
+        self.assertEqual(next(content), b'retry: 3000\n\n')
+        self.assertEqual(
+            next(content),
+            'id: {}\nevent: comment\ndata: {{"id": 42}}\n\n'.format(
+                last_id + 1).encode(),
+        )
+
+    def test_no_stream_for_deleted_component(self):
+        ''' Issues of a deleted component are not streamed.
+        '''
+
+        project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        component = Component.objects.create(name='UI', project=project)
+        self.issue.apply_changes(component=component)
+        component.deleted = True
+        component.save()
+
+        with self.assertRaises(Issue.DoesNotExist):
+            self.client.get(
+                reverse('issue_events', kwargs={'issue_id': self.issue.id}))
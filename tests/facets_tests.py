@@ -0,0 +1,119 @@
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from issuetrack.models import Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * reverse imported for use with calling views.
+    * TestCase imported for FacetsTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * Component, Issue and Project imported as the filtered models.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class FacetsTest(TestCase):
+    ''' Test filtering the issue list by facets and counting facet values.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        self.component = Component.objects.create(
+            name='UI', project=self.project)
+
+        for title, kind, priority, status, component in (
+                ('Broken button', 'Bug', 'Blocker', 'Open', self.component),
+                ('Broken link', 'Bug', 'Minor', 'Open', self.component),
+                ('Dark theme', 'Feature', 'Minor', 'New', self.component),
+                ('Old crash', 'Bug', 'Blocker', 'Closed', None)):
+            Issue.objects.create(
+                title=title,
+                description='Something to do.',
+                creater=self.admin_user,
+                kind=ISSUE_KIND_CODES[kind],
+                priority=ISSUE_PRIORITY_CODES[priority],
+                urgency=ISSUE_URGENCY_CODES['Indefinite'],
+                status=ISSUE_STATUS_CODES[status],
+                component=component,
+            )
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def get_facet(self, response, name):
+        ''' Map the labels of a facet to their counts.
+        '''
+        for facet in response.context['facets']:
+            if facet['name'] == name:
+                return dict((v['label'], v['count']) for v in facet['values'])
+
+    def test_facets_combine(self):
+        ''' Different facets must all match, values of one facet any.
+        '''
+
+        response = self.client.get(reverse('index'), {
+            'kind': ISSUE_KIND_CODES['Bug'],
+            'priority': [
+                ISSUE_PRIORITY_CODES['Blocker'], ISSUE_PRIORITY_CODES['Minor'],
+            ],
+            'project': self.project.id,
+        })
+
+        self.assertEqual(
+            sorted(i.title for i in response.context['issue_list']),
+            ['Broken button', 'Broken link'],
+        )
+        self.assertEqual(response.context['issue_list'].paginator.count, 2)
+
+    def test_counts_ignore_own_facet(self):
+        ''' A facet's counts follow the other facets' selection only.
+        '''
+
+        response = self.client.get(
+            reverse('index'), {'kind': ISSUE_KIND_CODES['Bug']})
+
+        self.assertEqual(
+            self.get_facet(response, 'kind'), {'Bug': 3, 'Feature': 1})
+        self.assertEqual(
+            self.get_facet(response, 'priority'), {'Blocker': 2, 'Minor': 1})
+        self.assertEqual(
+            self.get_facet(response, 'project'), {'TP1': 2, '(none)': 1})
+
+    def test_status_shortcuts(self):
+        ''' The open and closed links still work.
+        '''
+
+        response = self.client.get(reverse('index'), {'status': 'closed'})
+
+        self.assertEqual(
+            [i.title for i in response.context['issue_list']], ['Old crash'])
+
+    def test_no_query_per_option(self):
+        ''' The number of queries does not grow with the facet values.
+        '''
+
+        with self.assertNumQueries(4):
+            self.client.get(reverse('index'), {'status': 'open'})
+        ''' Session, user, facet counts and the page of issues.
+        '''
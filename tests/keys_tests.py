@@ -0,0 +1,107 @@
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from issuetrack.models import Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_URGENCY_CODES
+'''
+    * reverse imported for use with calling views.
+    * TestCase imported for KeysTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * Component, Issue and Project imported as the numbered models.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class KeysTest(TestCase):
+    ''' Test per-project issue numbers and keys.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.ui = Component.objects.create(
+            name='UI',
+            project=Project.objects.create(
+                name='Test Project1', key='TP1', owner=self.admin_user),
+        )
+        self.db = Component.objects.create(
+            name='DB',
+            project=Project.objects.create(
+                name='Test Project2', key='TP2', owner=self.admin_user),
+        )
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def create_issue(self, component):
+        ''' Create an issue in the given component.
+        '''
+        return Issue.objects.create(
+            title='Issue',
+            description='Something is broken.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=component,
+        )
+
+    def test_numbers_per_project(self):
+        ''' Every project numbers its issues from 1.
+        '''
+
+        keys = [
+            self.create_issue(component).key
+            for component in (self.ui, self.ui, self.db, None, self.ui)
+        ]
+
+        self.assertEqual(keys[:3], ['TP1-1', 'TP1-2', 'TP2-1'])
+        self.assertTrue(keys[3].startswith('#'))
+        self.assertEqual(keys[4], 'TP1-3')
+
+    def test_move_to_other_project(self):
+        ''' An issue moved to another project gets a number there.
+        '''
+
+        issue = self.create_issue(self.ui)
+        issue.component = self.db
+        issue.save()
+
+        self.assertEqual(issue.key, 'TP2-1')
+
+        issue.title = 'Renamed'
+        issue.save()
+        self.assertEqual(issue.key, 'TP2-1')
+
+    def test_key_route(self):
+        ''' /issue/<KEY>-<n>/ shows the issue.
+        '''
+
+        self.create_issue(self.ui)
+        issue = self.create_issue(self.ui)
+
+        with self.assertNumQueries(1):
+            Issue.objects.live().get(project__key='TP1', number=2)
+
+        response = self.client.get(
+            reverse('issue_key', kwargs={'key': 'TP1', 'number': 2}))
+
+        self.assertEqual(response.context['issue'], issue)
@@ -0,0 +1,276 @@
+import random
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from issuetrack.models import Component, Issue, IssueAncestor, IssueLink
+from issuetrack.models import LinkCycle, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_LINK_KIND_CODES
+from issuetrack.settings import ISSUE_PRIORITY_CODES, ISSUE_STATUS_CODES
+from issuetrack.settings import ISSUE_URGENCY_CODES
+'''
+    * random imported to link issues at random.
+    * reverse imported for use with calling views.
+    * TestCase imported for IssueLinkTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * Component, Issue and Project imported for the issues to link.
+    * IssueAncestor, IssueLink and LinkCycle imported as the links under
+      test.
+    * The ISSUE_*_CODES imported to give issues and links their codes.
+'''
+
+BLOCKS = ISSUE_LINK_KIND_CODES['Blocks']
+''' Code of the links followed in the tests.
+'''
+
+
+class IssueLinkTest(TestCase):
+    ''' Test linking issues and following the links transitively.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+        self.user = User.objects.create(username='user')
+        self.user.set_password('user')
+        self.user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        self.component = Component.objects.create(
+            name='UI', project=self.project)
+        self.release = Component.objects.create(
+            name='Release', project=self.project)
+        self.a, self.b, self.c, self.d = [
+            self.create_issue(title) for title in 'ABCD']
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def create_issue(self, title, component=None):
+        ''' An open bug with the given title.
+        '''
+        return Issue.objects.create(
+            title=title,
+            description='Something is broken.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            status=ISSUE_STATUS_CODES['Open'],
+            component=component or self.component,
+        )
+
+    def blockers(self, issue):
+        ''' Titles of the issues blocking the given one.
+        '''
+        return sorted(
+            Issue.objects.ancestors(issue).values_list('title', flat=True))
+
+    def test_transitive_blockers(self):
+        ''' The blockers of the blockers are found, counted once per path,
+        and lost with the last path.
+        '''
+
+        IssueLink.add(BLOCKS, self.a, self.b)
+        IssueLink.add(BLOCKS, self.a, self.c)
+        b_d = IssueLink.add(BLOCKS, self.b, self.d)
+        c_d = IssueLink.add(BLOCKS, self.c, self.d)
+        self.assertEqual(self.blockers(self.d), ['A', 'B', 'C'])
+        self.assertEqual(
+            IssueAncestor.objects.get(
+                ancestor=self.a, descendant=self.d).paths,
+            2,
+        )
+        self.assertEqual(
+            sorted(Issue.objects.descendants(self.a).values_list(
+                'title', flat=True)),
+            ['B', 'C', 'D'],
+        )
+
+        b_d.delete()
+        self.assertEqual(self.blockers(self.d), ['A', 'C'])
+        c_d.delete()
+        self.assertEqual(self.blockers(self.d), [])
+        self.assertEqual(self.blockers(self.c), ['A'])
+
+    def test_reject_cycles(self):
+        ''' Links closing a cycle are refused; "relates to" holds both ways.
+        '''
+
+        IssueLink.add(BLOCKS, self.a, self.b)
+        IssueLink.add(BLOCKS, self.b, self.c)
+        with self.assertRaises(LinkCycle):
+            IssueLink.add(BLOCKS, self.c, self.a)
+        with self.assertRaises(LinkCycle):
+            IssueLink.add(BLOCKS, self.a, self.a)
+        IssueLink.add(ISSUE_LINK_KIND_CODES['Duplicates'], self.c, self.a)
+
+        relates = ISSUE_LINK_KIND_CODES['Relates to']
+        link = IssueLink.add(relates, self.a, self.d)
+        self.assertEqual(IssueLink.add(relates, self.d, self.a), link)
+        self.assertEqual(IssueLink.objects.count(), 4)
+
+    def test_random_links(self):
+        ''' The ancestors match a walk over the links as random links are
+        added and removed.
+        '''
+
+        issues = [self.a, self.b, self.c, self.d] + [
+            self.create_issue(str(i)) for i in range(6)]
+        generator = random.Random(4)
+        for step in range(60):
+            links = list(IssueLink.objects.all())
+            if links and generator.random() < 0.3:
+                generator.choice(links).delete()
+            else:
+                try:
+                    IssueLink.add(BLOCKS, *generator.sample(issues, 2))
+                except LinkCycle:
+                    pass
+
+            below = {}
+            for source, target in IssueLink.objects.values_list(
+                    'source_id', 'target_id'):
+                below.setdefault(source, set()).add(target)
+            reached = set()
+            for issue in issues:
+                stack = list(below.get(issue.pk, ()))
+                while stack:
+                    pk = stack.pop()
+                    if (issue.pk, pk) not in reached:
+                        reached.add((issue.pk, pk))
+                        stack.extend(below.get(pk, ()))
+            self.assertEqual(
+                set(IssueAncestor.objects.values_list(
+                    'ancestor_id', 'descendant_id')),
+                reached,
+            )
+            self.assertFalse(any(
+                ancestor == descendant for ancestor, descendant in reached))
+
+    def test_open_blockers(self):
+        ''' A release's open blockers include those of closed blockers and
+        leave out the closed ones and those of closed issues.
+        '''
+
+        release = self.create_issue('Release 1.0', self.release)
+        shipped = self.create_issue('Release 0.9', self.release)
+        IssueLink.add(BLOCKS, self.a, self.b)
+        IssueLink.add(BLOCKS, self.b, release)
+        IssueLink.add(BLOCKS, self.c, shipped)
+        self.b.apply_changes(status=ISSUE_STATUS_CODES['Closed'])
+        shipped.apply_changes(status=ISSUE_STATUS_CODES['Closed'])
+
+        self.assertEqual(
+            [(issue, issue.blocked_component_id)
+             for issue in Issue.objects.open_blockers(self.project)],
+            [(self.a, self.release.pk)],
+        )
+        response = self.client.get(
+            reverse('project', kwargs={'project_id': self.project.pk}))
+        self.assertEqual(
+            response.context['blocker_list'],
+            [(self.component, []), (self.release, [self.a])],
+        )
+
+        IssueLink.add(BLOCKS, self.a, self.d)
+        IssueLink.add(BLOCKS, self.c, self.d)
+        self.c.apply_changes(creater=self.user)
+        self.assertEqual(
+            sorted(
+                (issue.title, issue.blocked_component_id)
+                for issue in Issue.objects.open_blockers(self.project)),
+            [('A', self.component.pk), ('A', self.release.pk),
+             ('C', self.component.pk)],
+        )
+        ''' One row for each component an issue blocks.
+        '''
+        response = self.client.get(
+            reverse('project', kwargs={'project_id': self.project.pk}))
+        self.assertEqual(
+            response.context['blocker_list'],
+            [(self.component, [self.a, self.c]), (self.release, [self.a])],
+        )
+
+        client = Client()
+        client.login(username='user', password='user')
+        response = client.get(
+            reverse('project', kwargs={'project_id': self.project.pk}))
+        self.assertEqual(
+            response.context['blocker_list'],
+            [(self.component, [self.c]), (self.release, [])],
+        )
+        self.assertNotContains(response, '{} A'.format(self.a.key))
+
+    def test_link_views(self):
+        ''' Issues are linked by key and unlinked from the issue's page;
+        deleting an issue removes the paths through it.
+        '''
+
+        url = reverse('add_link', kwargs={'issue_id': self.b.pk})
+        response = self.client.post(
+            url, {'kind': BLOCKS, 'issue': self.c.key})
+        self.assertEqual(response.status_code, 302)
+        self.client.post(
+            reverse('add_link', kwargs={'issue_id': self.a.pk}),
+            {'kind': BLOCKS, 'issue': str(self.b.pk)},
+        )
+        response = self.client.post(
+            url, {'kind': BLOCKS, 'issue': self.a.key})
+        self.assertContains(response, 'would close a cycle')
+
+        response = self.client.get(
+            reverse('issue', kwargs={'issue_id': self.c.pk}))
+        self.assertEqual(
+            [issue.title for issue in response.context['blocker_list']],
+            ['A', 'B'],
+        )
+
+        link = IssueLink.objects.get(source=self.a)
+        self.client.post(reverse('delete_link', kwargs={
+            'issue_id': self.b.pk, 'link_id': link.pk}))
+        self.assertEqual(self.blockers(self.c), ['B'])
+
+        IssueLink.add(BLOCKS, self.a, self.b)
+        self.b.delete()
+        self.assertEqual(self.blockers(self.c), [])
+        self.assertEqual(IssueLink.objects.count(), 0)
+        self.assertEqual(IssueAncestor.objects.count(), 0)
+
+    def test_link_visibility(self):
+        ''' Users who are not staff can only link to the issues they can see,
+        and do not see the issues of others through links.
+        '''
+
+        alice = User.objects.create(username='alice')
+        alice.set_password('alice')
+        alice.save()
+        own = self.create_issue('Own')
+        own.apply_changes(creater=alice)
+        client = Client()
+        client.login(username='alice', password='alice')
+
+        for other in (str(self.a.pk), self.a.key):
+            response = client.post(
+                reverse('add_link', kwargs={'issue_id': own.pk}),
+                {'kind': BLOCKS, 'issue': other},
+            )
+            self.assertContains(response, 'No issue has this key or id.')
+        self.assertFalse(IssueLink.objects.exists())
+
+        IssueLink.add(BLOCKS, self.a, own)
+        response = client.get(reverse('issue', kwargs={'issue_id': own.pk}))
+        self.assertEqual(response.context['link_list'], [])
+        self.assertEqual(response.context['blocker_list'], [])
+        self.assertNotContains(response, '{} A'.format(self.a.key))
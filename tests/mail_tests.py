@@ -0,0 +1,162 @@
+import mailbox
+import os
+import shutil
+import tempfile
+from email.message import EmailMessage
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.models import Comment, Component, Issue, MailMessage, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_URGENCY_CODES
+'''
+    * mailbox imported to write the Maildir and mbox read by the command.
+    * os, shutil and tempfile imported to keep the mailboxes in a scratch
+      directory.
+    * EmailMessage imported to build the emails.
+    * call_command imported to run the ingest_mail command.
+    * TestCase imported for MailTest.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's progress output.
+    * Comment, Component, Issue, MailMessage and Project imported as the
+      models written.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+def email(message_id, subject, sender, text, date, in_reply_to=None):
+    ''' An email with the given headers and plain text.
+    '''
+    message = EmailMessage()
+    message['Message-ID'] = message_id
+    message['Subject'] = subject
+    message['From'] = sender
+    message['To'] = 'support@localhost'
+    message['Date'] = date
+    if in_reply_to:
+        message['In-Reply-To'] = in_reply_to
+        message['References'] = in_reply_to
+    message.set_content(text)
+    return message
+
+
+EMAILS = [
+    email('<1@customer>', 'Crash on login', 'Ann <ann@customer>',
+          'It crashes.\n\nEvery time.', 'Mon, 05 Oct 2026 09:00:00 +0000'),
+    email('<2@localhost>', 'Re: Crash on login', 'admin@localhost',
+          'Looking into it.', 'Mon, 05 Oct 2026 10:00:00 +0000',
+          in_reply_to='<1@customer>'),
+    email('<3@customer>', 'Printing <b>broken</b>', 'Bob <bob@customer>',
+          'No printer found.', 'Tue, 06 Oct 2026 09:00:00 +0000'),
+    email('<4@customer>', 'Any news? [TP1-1]', 'Ann <ann@customer>',
+          'Still crashing.', 'Wed, 07 Oct 2026 09:00:00 +0000'),
+]
+''' Two new issues, a reply by Message-ID and a reply by the key of the
+issue retyped by hand.
+'''
+
+
+class MailTest(TestCase):
+    ''' Test adding the emails of a mailbox as issues and comments.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='Admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.support_user = User.objects.create(username='support')
+
+        project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        self.retyped = Issue.objects.create(
+            title='Crash on login',
+            description='Ann reports a crash.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=Component.objects.create(
+                name='Support', project=project),
+        )
+
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        ''' Remove the scratch mailboxes.
+        '''
+        shutil.rmtree(self.directory)
+
+    def mailbox(self, kind, emails):
+        ''' Write the emails to a new mailbox of the given kind and return
+        its path.
+        '''
+        path = os.path.join(self.directory, kind.__name__)
+        box = kind(path)
+        for message in emails:
+            box.add(message)
+        box.close()
+        return path
+
+    def ingest(self, path, *args):
+        ''' Run ingest_mail on the mailbox and return its output.
+        '''
+        out = StringIO()
+        call_command('ingest_mail', path, 'TP1', 'Support', *args, stdout=out)
+        return out.getvalue()
+
+    def test_emails_become_issues_and_comments(self):
+        ''' New emails open issues and replies are threaded onto them.
+        '''
+
+        out = self.ingest(
+            self.mailbox(mailbox.Maildir, EMAILS[::-1]), '--workers=1')
+
+        self.assertIn('Done: 2 issues and 2 comments added', out)
+        crash, printing = Issue.objects.exclude(
+            pk=self.retyped.pk).order_by('number')
+        self.assertEqual(crash.key, 'TP1-2')
+        self.assertEqual(crash.title, 'Crash on login')
+        self.assertEqual(crash.creater, self.support_user)
+        self.assertEqual(
+            crash.description_html,
+            '<p>From: Ann &lt;ann@customer&gt;</p>'
+            '<p>It crashes.</p>\n\n<p>Every time.</p>',
+        )
+        self.assertEqual(printing.key, 'TP1-3')
+        self.assertEqual(printing.title, 'Printing <b>broken</b>')
+
+        reply = crash.comment_set.get()
+        self.assertEqual(reply.author, self.admin_user)
+        self.assertEqual(reply.text_html, '<p>Looking into it.</p>')
+        self.assertEqual(reply.issue_status, crash.status)
+        self.assertIn('Still crashing.', self.retyped.comment_set.get().text)
+        self.assertEqual(MailMessage.objects.count(), 4)
+
+    def test_rerun_skips_added_emails(self):
+        ''' Running again over a grown mailbox only adds the new emails,
+        threading them across batches and runs.
+        '''
+
+        path = self.mailbox(mailbox.mbox, EMAILS[:2])
+        self.ingest(path, '--workers=2', '--batch-size=1')
+
+        box = mailbox.mbox(path)
+        for message in EMAILS[2:]:
+            box.add(message)
+        box.close()
+        out = self.ingest(path, '--workers=2', '--batch-size=1')
+
+        self.assertIn('Done: 1 issues and 1 comments added, 2 emails skipped',
+                      out)
+        self.assertEqual(Issue.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(self.retyped.comment_set.count(), 1)
+        self.assertEqual(Issue.objects.get(number=2).comment_set.count(), 1)
@@ -0,0 +1,154 @@
+from django.core.cache import caches
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from issuetrack.models import Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+from issuetrack.settings import PORTAL_CACHE, PORTAL_MAX_AGE
+'''
+    * caches imported to clear the portal's pages between the tests.
+    * reverse imported for use with calling views.
+    * TestCase imported for PortalTest.
+    * Client imported for instantiating web clients.
+    * User imported for creating and testing with a created user in the system.
+    * Component, Issue and Project imported to fill the portal.
+    * The ISSUE_*_CODES imported to give issues their codes.
+    * PORTAL_CACHE and PORTAL_MAX_AGE imported as the portal's cache and
+      the age shared caches may keep its pages.
+'''
+
+
+class PortalTest(TestCase):
+    ''' Test the read-only public portal of the projects.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        caches[PORTAL_CACHE].clear()
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user,
+            public=True)
+        self.component = Component.objects.create(
+            name='UI', project=self.project)
+        self.issue = self.create_issue('Crash')
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+        self.visitor = Client()
+
+        self.project_url = reverse(
+            'portal_project', kwargs={'key': 'TP1'})
+        self.issue_url = reverse(
+            'portal_issue', kwargs={'key': 'TP1', 'number': 1})
+
+    def create_issue(self, title):
+        ''' Create an issue in the public project.
+        '''
+        return Issue.objects.create(
+            title=title,
+            description='It crashed.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=self.component,
+        )
+
+    def comment(self, text, audience):
+        ''' Comment on the issue as the admin user.
+        '''
+        self.client.post(
+            reverse('add_comment', kwargs={'issue_id': self.issue.id}),
+            {
+                'status': ISSUE_STATUS_CODES['Open'],
+                'text': text,
+                'audience': audience,
+            },
+        )
+
+    def test_public_only(self):
+        ''' Anyone sees the issues and public comments of a public project,
+        and nothing of other projects.
+        '''
+
+        self.comment('Fixed upstream.', 'Public')
+        self.comment('Customer is ACME.', 'Private')
+
+        response = self.visitor.get(self.project_url)
+        self.assertContains(response, 'Crash')
+        response = self.visitor.get(self.issue_url)
+        self.assertContains(response, 'Fixed upstream.')
+        self.assertNotContains(response, 'Customer is ACME.')
+        self.assertNotContains(response, 'Logout')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+        self.assertEqual(
+            self.visitor.get(reverse(
+                'portal_issue', kwargs={'key': 'TP1', 'number': 2},
+            )).status_code,
+            404,
+        )
+        self.assertEqual(
+            self.visitor.get(self.project_url, {'page': 'x'}).status_code,
+            404,
+        )
+
+        self.project.public = False
+        self.project.save()
+        self.assertEqual(self.visitor.get(self.project_url).status_code, 404)
+        self.assertEqual(self.visitor.get(self.issue_url).status_code, 404)
+
+    def test_shared_caching(self):
+        ''' Pages may be kept by shared caches, are served from the cache
+        without queries, and are revalidated by their ETag.
+        '''
+
+        response = self.visitor.get(self.issue_url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn(
+            'max-age={}'.format(PORTAL_MAX_AGE), response['Cache-Control'])
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertFalse(response.cookies)
+
+        with self.assertNumQueries(0):
+            cached = self.visitor.get(self.issue_url)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+        with self.assertNumQueries(0):
+            revalidated = self.visitor.get(
+                self.issue_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+
+    def test_invalidation(self):
+        ''' Writes to a project's issues and comments outdate its pages.
+        '''
+
+        issue_page = self.visitor.get(self.issue_url)
+        project_page = self.visitor.get(self.project_url)
+
+        self.comment('Fixed upstream.', 'Public')
+        response = self.visitor.get(
+            self.issue_url, HTTP_IF_NONE_MATCH=issue_page['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], issue_page['ETag'])
+        self.assertContains(response, 'Fixed upstream.')
+
+        self.create_issue('Hang')
+        response = self.visitor.get(self.project_url)
+        self.assertNotEqual(response['ETag'], project_page['ETag'])
+        self.assertContains(response, 'Hang')
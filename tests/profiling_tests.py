@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from issuetrack.models import Project, RequestProfile
+from issuetrack.profiling import RATE_KEY, set_sample_rate
+from issuetrack.settings import PROFILE_CACHE
+'''
+    * mock imported to shrink the profile buffer.
+    * settings imported to extend the project's middleware.
+    * caches imported to clear the sample rate between the tests.
+    * reverse imported for use with calling views.
+    * TestCase imported for ProfilingTest.
+    * Client imported for instantiating web client.
+    * override_settings imported to install the middleware.
+    * User imported for creating and testing with a created user in the system.
+    * Project imported for a page to profile.
+    * RequestProfile imported as the stored profiles.
+    * RATE_KEY and set_sample_rate imported to reset the sample rate.
+    * PROFILE_CACHE imported as the cache holding the sample rate.
+'''
+
+
+@override_settings(MIDDLEWARE_CLASSES=settings.MIDDLEWARE_CLASSES + [
+    'issuetrack.profiling.ProfilingMiddleware',
+])
+class ProfilingTest(TestCase):
+    ''' Test profiling requests on demand.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        caches[PROFILE_CACHE].delete(RATE_KEY)
+        self.addCleanup(set_sample_rate, 0)
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+        self.user = User.objects.create(username='user')
+        self.user.set_password('user')
+        self.user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        self.url = reverse('project', kwargs={'project_id': self.project.pk})
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def test_profile_on_demand(self):
+        ''' Staff have a request profiled with the query flag, and see the
+        stored profile.
+        '''
+
+        self.client.get(self.url)
+        self.assertEqual(RequestProfile.objects.count(), 0)
+
+        response = self.client.get(self.url, {'profile': 1})
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(
+            response['X-Issuetrack-Profile'],
+            reverse('request_profile', kwargs={'profile_id': profile.pk}),
+        )
+        self.assertEqual(profile.path, self.url + '?profile=1')
+        self.assertEqual(profile.username, 'admin')
+        self.assertGreater(profile.query_count, 0)
+        self.assertIn('issuetrack_project', profile.queries)
+        self.assertIn('issuetrack/model/project.html', profile.templates)
+        self.assertIn('views.py', profile.stats)
+
+        response = self.client.get(response['X-Issuetrack-Profile'])
+        self.assertContains(response, 'issuetrack/model/project.html')
+        response = self.client.get(reverse('profiles'))
+        self.assertContains(response, self.url + '?profile=1')
+
+        other = Client()
+        other.login(username='user', password='user')
+        self.assertFalse(
+            other.get(self.url, {'profile': 1}).has_header(
+                'X-Issuetrack-Profile'))
+        self.assertEqual(RequestProfile.objects.count(), 1)
+        self.assertEqual(other.get(reverse('profiles')).status_code, 302)
+
+    def test_ring_buffer(self):
+        ''' Only the latest profiles are kept.
+        '''
+
+        with mock.patch('issuetrack.profiling.PROFILE_BUFFER_SIZE', 2):
+            for page in ('1', '2', '3', '4', '5'):
+                self.client.get(self.url, {'profile': page})
+
+        self.assertEqual(
+            list(RequestProfile.objects.order_by('-created').values_list(
+                'path', flat=True)),
+            [self.url + '?profile=5', self.url + '?profile=4'],
+        )
+
+    def test_sample_rate(self):
+        ''' Superusers set a share of all requests to profile.
+        '''
+
+        response = self.client.post(reverse('profiles'), {'sample_rate': 1})
+        self.assertEqual(response.status_code, 302)
+
+        other = Client()
+        other.login(username='user', password='user')
+        other.get(self.url)
+        self.assertEqual(RequestProfile.objects.get().username, 'user')
@@ -0,0 +1,105 @@
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.models import Comment, Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * call_command imported to run the purge_deleted command.
+    * reverse imported for use with calling views.
+    * TestCase imported for PurgeTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's progress output.
+    * Comment, Component, Issue and Project imported as the purged models.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class PurgeTest(TestCase):
+    ''' Test soft deletion of projects and components and their purge.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        self.component = Component.objects.create(
+            name='UI', project=self.project)
+
+        for i in range(5):
+            issue = Issue.objects.create(
+                title='Issue {}'.format(i),
+                description='Something is broken.',
+                creater=self.admin_user,
+                kind=ISSUE_KIND_CODES['Bug'],
+                priority=ISSUE_PRIORITY_CODES['Major'],
+                urgency=ISSUE_URGENCY_CODES['Indefinite'],
+                component=self.component,
+            )
+            Comment.objects.create(
+                issue=issue, text='Seen it too.', author=self.admin_user,
+                issue_status=ISSUE_STATUS_CODES['New'])
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def test_delete_project_hides_it_at_once(self):
+        ''' Deleting a project hides it and its issues but keeps the rows
+        for the purge job.
+        '''
+
+        response = self.client.get(
+            reverse('delete_project', kwargs={'project_id': self.project.id}))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Project.objects.filter(pk=self.project.id).exists())
+        self.assertFalse(Issue.objects.live().exists())
+        self.assertEqual(Issue.objects.count(), 5)
+
+    def test_purge_removes_rows_in_batches(self):
+        ''' purge_deleted removes everything below a deleted project.
+        '''
+
+        self.client.get(
+            reverse('delete_project', kwargs={'project_id': self.project.id}))
+
+        out = StringIO()
+        call_command('purge_deleted', batch_size=2, stdout=out)
+
+        self.assertFalse(Project.all_objects.exists())
+        self.assertFalse(Component.all_objects.exists())
+        self.assertFalse(Issue.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertIn('5 issues and 5 comments purged', out.getvalue())
+
+    def test_purge_deleted_component_only(self):
+        ''' Purging a deleted component leaves its project in place.
+        '''
+
+        self.client.get(reverse(
+            'delete_component', kwargs={'component_id': self.component.id}))
+        call_command('purge_deleted', stdout=StringIO())
+
+        self.assertTrue(Project.objects.filter(pk=self.project.id).exists())
+        self.assertFalse(Component.all_objects.exists())
+        self.assertFalse(Issue.objects.exists())
@@ -0,0 +1,140 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.http import HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.contrib.auth.models import User
+from issuetrack.models import Issue
+from issuetrack.routers import ReplicaMiddleware, ReplicaRouter
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_URGENCY_CODES, REPLICA_PIN_COOKIE
+'''
+    * mock imported to name the replica without configuring a database.
+    * skipUnless imported to skip the tests that need a second database.
+    * settings imported to look for the second database.
+    * reverse imported for use with calling views.
+    * HttpResponse imported as the response passed through the middleware.
+    * TestCase imported for ReplicaRouterTest and ReplicaDatabaseTest.
+    * Client imported for instantiating web client.
+    * RequestFactory imported to build requests for the middleware.
+    * override_settings imported to install the router and middleware.
+    * User imported for creating and testing with a created user in the system.
+    * Issue imported as the routed model.
+    * ReplicaMiddleware and ReplicaRouter imported as the routing under test.
+    * The ISSUE_*_CODES imported to give issues their codes.
+    * REPLICA_PIN_COOKIE imported to check the cookie set after writes.
+'''
+
+
+@mock.patch('issuetrack.routers.DATABASE_REPLICAS', ('replica',))
+class ReplicaRouterTest(TestCase):
+    ''' Test where the router sends reads and writes.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.router = ReplicaRouter()
+        self.middleware = ReplicaMiddleware()
+        self.factory = RequestFactory()
+
+    def test_get_reads_from_replica(self):
+        ''' Reads of a GET request go to the replica, writes to the primary.
+        '''
+
+        self.middleware.process_request(self.factory.get('/'))
+
+        self.assertEqual(self.router.db_for_read(Issue), 'replica')
+        self.assertEqual(self.router.db_for_read(User), None)
+        self.assertEqual(self.router.db_for_write(Issue), 'default')
+        self.assertEqual(self.router.db_for_read(Issue), 'default')
+        ''' Once the request wrote, it reads its own writes.
+        '''
+
+    def test_post_pins_to_primary(self):
+        ''' After a POST the user reads from the primary.
+        '''
+
+        request = self.factory.post('/')
+        self.middleware.process_request(request)
+        self.assertEqual(self.router.db_for_read(Issue), 'default')
+
+        response = self.middleware.process_response(request, HttpResponse())
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+
+        request = self.factory.get('/')
+        request.COOKIES[REPLICA_PIN_COOKIE] = \
+            response.cookies[REPLICA_PIN_COOKIE].value
+        self.middleware.process_request(request)
+        self.assertEqual(self.router.db_for_read(Issue), 'default')
+
+    def test_outside_requests_use_primary(self):
+        ''' Commands and other code outside a request use the primary.
+        '''
+
+        self.assertEqual(self.router.db_for_read(Issue), 'default')
+
+
+@skipUnless(
+    'replica' in settings.DATABASES,
+    "needs a second database aliased 'replica', e.g. another SQLite file")
+@override_settings(
+    DATABASE_ROUTERS=['issuetrack.routers.ReplicaRouter'],
+    MIDDLEWARE_CLASSES=settings.MIDDLEWARE_CLASSES + [
+        'issuetrack.routers.ReplicaMiddleware'],
+)
+class ReplicaDatabaseTest(TestCase):
+    ''' Test the routing against two databases. The 'replica' stands in for
+    a real replica and does not receive the primary's rows, which shows where
+    each read went.
+    '''
+
+    multi_db = True
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+
+        for db in ('default', 'replica'):
+            Issue.objects.using(db).create(
+                title='Issue on {}'.format(db),
+                description='Something is broken.',
+                creater_id=self.admin_user.id,
+                kind=ISSUE_KIND_CODES['Bug'],
+                priority=ISSUE_PRIORITY_CODES['Major'],
+                urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            )
+
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
+    def test_read_your_writes(self):
+        ''' The list is read from the replica until the user posts.
+        '''
+
+        response = self.client.get(reverse('index'))
+        self.assertIn('Issue on replica', str(response.content))
+
+        self.client.post(
+            reverse('add_issue'),
+            {
+                'title': 'Posted issue',
+                'description': 'Created from the form.',
+                'kind': ISSUE_KIND_CODES['Info'],
+                'priority': ISSUE_PRIORITY_CODES['Major'],
+                'urgency': ISSUE_URGENCY_CODES['ASAP'],
+            },
+        )
+
+        response = self.client.get(reverse('index'))
+        self.assertIn('Issue on default', str(response.content))
+        self.assertIn('Posted issue', str(response.content))
@@ -0,0 +1,144 @@
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.models import Comment, Issue
+from issuetrack.sanitize import sanitize_html
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * call_command imported to run the render_rich_text command.
+    * reverse imported for use with calling views.
+    * TestCase imported for SanitizeTest and RichTextTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's progress output.
+    * Comment and Issue imported as models with rich text.
+    * sanitize_html imported as the sanitizer under test.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class SanitizeTest(TestCase):
+    ''' Test the HTML sanitizer.
+    '''
+
+    def test_keeps_allowed_markup(self):
+        ''' Allowed tags and attributes are kept.
+        '''
+
+        html = '<p>Click <a href="https://example.com" title="x">here</a>' + \
+            '<br/></p>'
+
+        self.assertEqual(sanitize_html(html), html.replace('<br/>', '<br>'))
+
+    def test_removes_scripts_and_handlers(self):
+        ''' Scripts, event handlers and javascript links are removed.
+        '''
+
+        self.assertEqual(
+            sanitize_html(
+                '<p onclick="steal()">Hi<script>steal()</script></p>' +
+                '<a href=" javascript:steal()">link</a>' +
+                '<iframe src="https://example.com"></iframe>'
+            ),
+            '<p>Hi</p><a>link</a>',
+        )
+
+    def test_escapes_text_and_closes_tags(self):
+        ''' Text is escaped, unknown tags dropped and open tags closed.
+        '''
+
+        self.assertEqual(
+            sanitize_html('<blink>1 < 2</blink> & <strong><em>bold'),
+            '1 &lt; 2 &amp; <strong><em>bold</em></strong>',
+        )
+        self.assertEqual(sanitize_html(None), '')
+
+
+class RichTextTest(TestCase):
+    ''' Test storing and showing the sanitized HTML.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.issue = Issue.objects.create(
+            title='Script in description',
+            description='<p>Broken<script>alert(1)</script></p>',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Task'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+        )
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def test_html_stored_on_save(self):
+        ''' The raw input is kept and the sanitized HTML stored beside it.
+        '''
+
+        self.assertIn('<script>', self.issue.description)
+        self.assertEqual(self.issue.description_html, '<p>Broken</p>')
+
+        self.issue.apply_changes(steps='<ol><li>Open it')
+        self.assertEqual(
+            Issue.objects.get(pk=self.issue.pk).steps_html,
+            '<ol><li>Open it</li></ol>',
+        )
+
+    def test_issue_page_shows_sanitized_html(self):
+        ''' Comments and descriptions are shown without the scripts.
+        '''
+
+        self.client.post(
+            reverse('add_comment', kwargs={'issue_id': self.issue.id}),
+            {
+                'status': ISSUE_STATUS_CODES['Open'],
+                'text': '<b>Seen</b><script>alert(2)</script>',
+                'audience': 'Public',
+            },
+        )
+
+        response = self.client.get(
+            reverse('issue', kwargs={'issue_id': self.issue.id}))
+
+        self.assertContains(response, '<b>Seen</b>')
+        self.assertNotContains(response, 'alert(')
+
+    def test_render_command_updates_stale_html(self):
+        ''' render_rich_text rewrites HTML that no longer matches.
+        '''
+
+        Comment.objects.create(
+            issue=self.issue, text='<i>ok</i>', author=self.admin_user,
+            issue_status=ISSUE_STATUS_CODES['New'])
+        Issue.objects.filter(pk=self.issue.pk).update(
+            description_html='<script>stale</script>')
+
+        out = StringIO()
+        call_command('render_rich_text', stdout=out)
+
+        self.assertEqual(
+            Issue.objects.get(pk=self.issue.pk).description_html,
+            '<p>Broken</p>',
+        )
+        self.assertIn('Done: 1 rows changed', out.getvalue())
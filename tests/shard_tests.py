@@ -0,0 +1,228 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.models import Comment, Component, Issue, IssueAncestor
+from issuetrack.models import ArchivedComment, IssueLink, Project, Sequence
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_LINK_KIND_CODES
+from issuetrack.settings import ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * mock imported to name the shards without changing the app settings.
+    * skipUnless imported to skip the tests without the shard databases.
+    * settings imported to look for the shard databases.
+    * call_command imported to run the move_project command.
+    * reverse imported for use with calling views.
+    * TestCase imported for ShardTest.
+    * Client imported for instantiating web client.
+    * override_settings imported to install the router and middleware.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's progress output.
+    * Comment, Component, Issue, IssueAncestor, IssueLink and Project
+      imported as the models involved.
+    * ArchivedComment and Sequence imported to take comment ids.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+SHARDS = ('shard1', 'shard2')
+
+
+@skipUnless(
+    all(alias in settings.DATABASES for alias in SHARDS),
+    "needs databases aliased 'shard1' and 'shard2', e.g. SQLite files")
+@override_settings(
+    DATABASE_ROUTERS=['issuetrack.routers.ShardRouter'],
+    MIDDLEWARE_CLASSES=settings.MIDDLEWARE_CLASSES + [
+        'issuetrack.routers.ShardMiddleware'],
+)
+class ShardTest(TestCase):
+    ''' Test spreading the projects' issues over two shards.
+    '''
+
+    multi_db = True
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        for name in ('models', 'routers', 'forms'):
+            patcher = mock.patch(
+                'issuetrack.{}.DATABASE_SHARDS'.format(name), SHARDS)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.projects = []
+        self.issues = []
+        for key in ('TP1', 'TP2'):
+            project = Project.objects.create(
+                name='Project ' + key, key=key, owner=self.admin_user)
+            component = Component.objects.create(name='UI', project=project)
+            self.projects.append(project)
+            self.issues.append(Issue.objects.create(
+                title='Crash in ' + key,
+                description='It crashed.',
+                creater=self.admin_user,
+                kind=ISSUE_KIND_CODES['Bug'],
+                priority=ISSUE_PRIORITY_CODES['Major'],
+                urgency=ISSUE_URGENCY_CODES['Indefinite'],
+                component=component,
+            ))
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def titles(self, alias):
+        ''' Titles of the issues on a database.
+        '''
+        return list(Issue.objects.using(alias).order_by(
+            'pk').values_list('title', flat=True))
+
+    def test_projects_are_spread(self):
+        ''' Each project's issues live on its own shard, with ids unique
+        across the shards.
+        '''
+
+        self.assertEqual(
+            [project.database for project in self.projects], list(SHARDS))
+        self.assertEqual(self.titles('shard1'), ['Crash in TP1'])
+        self.assertEqual(self.titles('shard2'), ['Crash in TP2'])
+        self.assertEqual(self.titles('default'), [])
+        self.assertEqual(
+            self.issues[1].pk, self.issues[0].pk + 1)
+        self.assertEqual(
+            Project.objects.using('shard2').get(key='TP2').name,
+            'Project TP2')
+        ''' The projects are copied to every shard.
+        '''
+
+    def test_views_follow_the_project(self):
+        ''' Issue pages and comments use the issue's shard.
+        '''
+
+        issue = self.issues[1]
+        response = self.client.get(
+            reverse('issue', kwargs={'issue_id': issue.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Crash in TP2')
+
+        self.client.post(
+            reverse('add_comment', kwargs={'issue_id': issue.pk}),
+            {
+                'status': ISSUE_STATUS_CODES['Open'],
+                'text': 'Looking into it.',
+                'audience': 'Public',
+            },
+        )
+        comment = Comment.objects.using('shard2').get()
+        self.assertEqual(comment.issue_id, issue.pk)
+        self.assertEqual(
+            Issue.objects.using('shard2').get().status,
+            ISSUE_STATUS_CODES['Open'],
+        )
+
+    def test_sequence(self):
+        ''' Ids follow those the databases gave out before the sequence was
+        started, and each call takes the next ones.
+        '''
+
+        issue = self.issues[1]
+        Comment.objects.create(
+            issue=issue, text='First.', author=self.admin_user,
+            issue_status=issue.status)
+        last = Comment.objects.using('shard2').get().pk
+        Sequence.objects.filter(name='issuetrack.comment').delete()
+
+        comments = [
+            Comment(issue=issue, text='Reply.', author=self.admin_user,
+                    issue_status=issue.status)
+            for i in range(3)
+        ]
+        Sequence.assign(comments[:2], ArchivedComment)
+        Sequence.assign(comments, ArchivedComment)
+        self.assertEqual(
+            [comment.pk for comment in comments],
+            [last + 1, last + 2, last + 3],
+        )
+        self.assertEqual(
+            Sequence.objects.get(name='issuetrack.comment').last, last + 3)
+
+    def test_index_merges_the_shards(self):
+        ''' The index lists and counts the issues of every shard.
+        '''
+
+        response = self.client.get(reverse('index'), {'order_by': 'title'})
+
+        self.assertEqual(
+            [issue.title for issue in response.context['issue_list']],
+            ['Crash in TP1', 'Crash in TP2'],
+        )
+        self.assertEqual(
+            response.context['issue_list'].paginator.count, 2)
+
+    def test_move_project(self):
+        ''' Moving a project copies its issues and comments to the other
+        shard and removes them from the old one.
+        '''
+
+        Comment.objects.create(
+            issue=self.issues[0], text='Seen it.', author=self.admin_user,
+            issue_status=ISSUE_STATUS_CODES['New'])
+
+        call_command('move_project', 'TP1', 'shard2', stdout=StringIO())
+
+        self.assertEqual(Project.objects.get(key='TP1').database, 'shard2')
+        self.assertEqual(self.titles('shard1'), [])
+        self.assertEqual(
+            self.titles('shard2'), ['Crash in TP1', 'Crash in TP2'])
+        self.assertEqual(
+            Comment.objects.using('shard2').get().issue_id,
+            self.issues[0].pk,
+        )
+        response = self.client.get(
+            reverse('issue', kwargs={'issue_id': self.issues[0].pk}))
+        self.assertContains(response, 'Seen it.')
+
+    def test_move_project_links(self):
+        ''' Links between a project's issues move with them; issues on
+        other shards cannot be linked.
+        '''
+
+        blocks = ISSUE_LINK_KIND_CODES['Blocks']
+        blocker = Issue.objects.create(
+            title='Blocker in TP1',
+            description='It blocks.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=self.issues[0].component,
+        )
+        IssueLink.add(blocks, blocker, self.issues[0])
+        with self.assertRaises(ValueError):
+            IssueLink.add(blocks, blocker, self.issues[1])
+
+        call_command('move_project', 'TP1', 'shard2', stdout=StringIO())
+
+        self.assertFalse(IssueLink.objects.using('shard1').exists())
+        self.assertFalse(IssueAncestor.objects.using('shard1').exists())
+        self.assertEqual(
+            list(Issue.objects.using('shard2').ancestors(
+                self.issues[0]).values_list('pk', flat=True)),
+            [blocker.pk],
+        )
+        response = self.client.get(
+            reverse('issue', kwargs={'issue_id': self.issues[0].pk}))
+        self.assertContains(response, 'Blocker in TP1')
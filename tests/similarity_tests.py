@@ -0,0 +1,139 @@
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.models import Issue, IssueBucket
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_URGENCY_CODES, SIMILARITY_BANDS
+from issuetrack.similarity import buckets
+'''
+    * call_command imported to run the index_similarity command.
+    * reverse imported for use with calling views.
+    * TestCase imported for SimilarityTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's progress output.
+    * Issue and IssueBucket imported as the indexed models.
+    * The ISSUE_*_CODES imported to give issues their codes.
+    * SIMILARITY_BANDS imported as the number of buckets per issue.
+    * buckets imported as the hashing under test.
+'''
+
+CRASH = 'The application crashes when saving a report with an empty title.'
+''' Description shared by the duplicates.
+'''
+
+
+class SimilarityTest(TestCase):
+    ''' Test suggesting the issues similar to a new one.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.crash = self.create('Crash when saving report', CRASH)
+        self.slow = self.create(
+            'Slow login page', 'Logging in takes more than a minute.')
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def create(self, title, description, creater=None):
+        ''' Create an issue with the given text.
+        '''
+        return Issue.objects.create(
+            title=title,
+            description=description,
+            creater=creater or self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+        )
+
+    def similar(self, title, description=''):
+        ''' Keys of the issues the similar_issues view suggests.
+        '''
+        response = self.client.get(
+            reverse('similar_issues'),
+            {'title': title, 'description': description},
+        )
+        return [issue['key'] for issue in response.json()['issues']]
+
+    def test_buckets(self):
+        ''' Near duplicates share buckets, unrelated texts do not.
+        '''
+
+        crash = set(buckets('Crash when saving report', CRASH))
+
+        self.assertEqual(len(crash), SIMILARITY_BANDS)
+        self.assertEqual(
+            crash, set(buckets('CRASH when saving report!', '<p>' + CRASH)))
+        self.assertTrue(crash & set(buckets(
+            'Crash saving a report', CRASH.replace('an empty', 'no'))))
+        self.assertFalse(crash & set(buckets(
+            'Slow login page', 'Logging in takes more than a minute.')))
+        self.assertEqual(buckets('', '<p></p>'), [])
+
+    def test_suggests_duplicates(self):
+        ''' The view lists the issues similar to the text being entered.
+        '''
+
+        self.assertEqual(
+            self.similar('Crash on saving report', CRASH), [self.crash.key])
+        self.assertEqual(self.similar('Printer not found'), [])
+
+    def test_index_follows_changes(self):
+        ''' Changed issues are found by their new text only.
+        '''
+
+        self.slow.apply_changes(
+            title='Crash saving reports', description=CRASH)
+        self.crash.description = 'Fixed by checking the title.'
+        self.crash.title = 'Checking report titles'
+        self.crash.save()
+
+        self.assertEqual(
+            self.similar('Crash on saving report', CRASH), [self.slow.key])
+
+    def test_other_users_see_own_issues(self):
+        ''' Users other than staff are only shown their own issues.
+        '''
+
+        user = User.objects.create(username='user')
+        user.set_password('user')
+        user.save()
+        own = self.create('Crash when saving report', CRASH, creater=user)
+        self.client.post(
+            reverse('login'), {'username': 'user', 'password': 'user'})
+
+        self.assertEqual(self.similar('Crash saving report', CRASH), [own.key])
+
+    def test_index_command(self):
+        ''' index_similarity restores the buckets of every issue.
+        '''
+
+        IssueBucket.objects.all().delete()
+
+        out = StringIO()
+        call_command('index_similarity', stdout=out)
+
+        self.assertIn('Done: 2 issues indexed', out.getvalue())
+        self.assertEqual(
+            IssueBucket.objects.count(), 2 * SIMILARITY_BANDS)
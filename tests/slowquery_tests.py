@@ -0,0 +1,104 @@
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.models import Project, SlowQuery
+from issuetrack.slowqueries import normalize, percentile
+'''
+    * json imported to read the recorded parameters and timings.
+    * mock imported to count every query as slow.
+    * settings imported to extend the project's middleware.
+    * call_command imported to run the slow_queries command.
+    * reverse imported for use with calling views.
+    * TestCase imported for SlowQueryTest.
+    * Client imported for instantiating web client.
+    * override_settings imported to install the middleware.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to read the command's output.
+    * Project imported for a page making queries.
+    * SlowQuery imported as the recorded queries.
+    * normalize and percentile imported to test the fingerprints and timings.
+'''
+
+
+@override_settings(MIDDLEWARE_CLASSES=settings.MIDDLEWARE_CLASSES + [
+    'issuetrack.slowqueries.SlowQueryMiddleware',
+])
+class SlowQueryTest(TestCase):
+    ''' Test recording the slow queries of the views.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+        Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+
+        self.client = Client()
+        self.client.login(username='admin', password='admin')
+
+    def test_normalize(self):
+        ''' Queries differing in their values share their normalized SQL.
+        '''
+
+        self.assertEqual(
+            normalize('SELECT  a FROM b\n WHERE c = 12 AND d = \'x\'\'y\''),
+            'SELECT a FROM b WHERE c = ? AND d = ?',
+        )
+        self.assertEqual(
+            normalize('SELECT a FROM b WHERE c IN (%s, %s, %s)'),
+            normalize('SELECT a FROM b WHERE c IN (%s)'),
+        )
+
+    def test_percentile(self):
+        ''' Percentiles are taken by the nearest rank.
+        '''
+
+        timings = list(range(1, 101))
+        self.assertEqual(percentile(timings, 0.5), 50)
+        self.assertEqual(percentile(timings, 0.95), 95)
+        self.assertEqual(percentile(timings, 1), 100)
+        self.assertEqual(percentile([], 0.5), 0)
+
+    def test_record_view_queries(self):
+        ''' Slow queries are recorded once per fingerprint with their view,
+        parameters and plan.
+        '''
+
+        self.client.get(reverse('index'))
+        self.assertEqual(SlowQuery.objects.count(), 0)
+
+        with mock.patch('issuetrack.slowqueries.SLOW_QUERY_MS', -1):
+            self.client.get(reverse('index'), {'order_by': 'title'})
+            self.client.get(
+                reverse('index'), {'order_by': 'title', 'page': '2'})
+
+        query = SlowQuery.objects.get(sql__contains='FROM "issuetrack_issue"')
+        self.assertEqual(query.count, 2)
+        self.assertEqual(len(json.loads(query.timings)), 2)
+        self.assertEqual(query.view, 'issuetrack.views.index')
+        self.assertEqual(query.url_name, 'index')
+        self.assertEqual(
+            json.loads(query.parameters)['query']['order_by'], ['title'])
+        self.assertTrue(query.plan)
+        self.assertNotIn('EXPLAIN failed', query.plan)
+
+        output = StringIO()
+        call_command('slow_queries', order='count', clear=True, stdout=output)
+        self.assertIn('issuetrack.views.index (index)', output.getvalue())
+        self.assertIn('plan: ', output.getvalue())
+        self.assertEqual(SlowQuery.objects.count(), 0)
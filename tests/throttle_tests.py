@@ -0,0 +1,126 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.models import Comment, Component, Issue, Project
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+from issuetrack.settings import THROTTLE_CACHE
+from issuetrack.throttle import throttled_counts
+'''
+    * mock imported to lower the rates for the tests.
+    * caches imported to clear the counters between the tests.
+    * call_command imported to run the throttle_stats command.
+    * reverse imported for use with calling views.
+    * TestCase imported for ThrottleTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's output.
+    * Comment, Component, Issue and Project imported as the models written.
+    * The ISSUE_*_CODES imported to give issues their codes.
+    * THROTTLE_CACHE imported as the cache holding the counters.
+    * throttled_counts imported to read the throttled requests.
+'''
+
+
+class ThrottleTest(TestCase):
+    ''' Test limiting the writes of users and addresses.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        caches[THROTTLE_CACHE].clear()
+        for name, rates in (
+                ('THROTTLE_RATES', {'add_comment': (2, 60)}),
+                ('THROTTLE_IP_RATES', {'add_comment': (3, 60)})):
+            patcher = mock.patch.dict(
+                'issuetrack.throttle.' + name, rates, clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.users = []
+        for username in ('admin', 'other'):
+            user = User.objects.create(
+                username=username,
+                email=username + '@localhost',
+                is_superuser=True,
+                is_staff=True,
+            )
+            user.set_password(username)
+            user.save()
+            self.users.append(user)
+
+        project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.users[0])
+        self.issue = Issue.objects.create(
+            title='Crash',
+            description='It crashed.',
+            creater=self.users[0],
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=Component.objects.create(name='UI', project=project),
+        )
+
+    def comment(self, client):
+        ''' Post a comment to the issue.
+        '''
+        return client.post(
+            reverse('add_comment', kwargs={'issue_id': self.issue.pk}),
+            {
+                'status': ISSUE_STATUS_CODES['Open'],
+                'text': 'Me too.',
+                'audience': 'Public',
+            },
+        )
+
+    def test_users_and_addresses_are_limited(self):
+        ''' A user's writes over the limit get a 429 with Retry-After, and
+        so do those of their address, while the views they did not use are
+        not limited.
+        '''
+
+        clients = []
+        for user in self.users:
+            client = Client()
+            client.login(username=user.username, password=user.username)
+            clients.append(client)
+
+        self.assertEqual(self.comment(clients[0]).status_code, 302)
+        self.assertEqual(self.comment(clients[0]).status_code, 302)
+        response = self.comment(clients[0])
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        self.assertEqual(Comment.objects.count(), 2)
+
+        self.assertEqual(self.comment(clients[1]).status_code, 302)
+        self.assertEqual(self.comment(clients[1]).status_code, 429)
+        ''' The other user shares the address, whose bucket is now empty.
+        '''
+        self.assertEqual(
+            clients[0].get(reverse(
+                'add_comment', kwargs={'issue_id': self.issue.pk}),
+            ).status_code,
+            200,
+        )
+        self.assertEqual(
+            clients[0].post(
+                reverse('change_issue', kwargs={'issue_id': self.issue.pk}),
+                {},
+            ).status_code,
+            200,
+        )
+
+        counts = throttled_counts()
+        self.assertEqual(counts[('add_comment', 'user')], 1)
+        self.assertEqual(counts[('add_comment', 'ip')], 1)
+        out = StringIO()
+        call_command('throttle_stats', stdout=out)
+        self.assertEqual(
+            out.getvalue(), 'add_comment by ip: 1\nadd_comment by user: 1\n')
@@ -0,0 +1,189 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.utils.six import StringIO
+from issuetrack.models import Component, Issue, Project, Webhook
+from issuetrack.models import WebhookEvent
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+from issuetrack.settings import WEBHOOK_SIGNATURE_HEADER
+from issuetrack.webhooks import sign
+'''
+    * json imported to read the posted events.
+    * threading, BaseHTTPRequestHandler and HTTPServer imported to run the
+      stand-in receiver.
+    * call_command imported to run the deliver_webhooks command.
+    * reverse imported for use with calling views.
+    * TestCase imported for WebhooksTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * StringIO imported to capture the command's progress output.
+    * Component, Issue, Project, Webhook and WebhookEvent imported as the
+      models involved.
+    * The ISSUE_*_CODES imported to give issues their codes.
+    * WEBHOOK_SIGNATURE_HEADER and sign imported to check the signatures.
+'''
+
+
+class Receiver(BaseHTTPRequestHandler):
+    ''' Stand-in webhook receiver recording the requests it gets and
+    answering with the server's status.
+    '''
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((self.headers, body))
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class WebhooksTest(TestCase):
+    ''' Test queueing and delivering webhook events.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.server = HTTPServer(('127.0.0.1', 0), Receiver)
+        self.server.requests = []
+        self.server.status = 200
+        threading.Thread(target=self.server.serve_forever).start()
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        project = Project.objects.create(
+            name='Test Project1', key='TP1', owner=self.admin_user)
+        self.webhook = Webhook.objects.create(
+            project=project,
+            url='http://127.0.0.1:{}/hook'.format(self.server.server_port),
+            secret='s3cret',
+        )
+        self.issue = Issue.objects.create(
+            title='Crash on login',
+            description='It crashes.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Bug'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+            component=Component.objects.create(name='UI', project=project),
+        )
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def tearDown(self):
+        ''' Stop the stand-in receiver.
+        '''
+        self.server.shutdown()
+        self.server.server_close()
+
+    def comment(self, status='Open'):
+        ''' Add a comment to the issue, setting the given status.
+        '''
+        self.client.post(
+            reverse('add_comment', kwargs={'issue_id': self.issue.id}),
+            {
+                'status': ISSUE_STATUS_CODES[status],
+                'text': 'Looking into it.',
+                'audience': 'Public',
+            },
+        )
+
+    def deliver(self):
+        ''' Run deliver_webhooks until no events are due.
+        '''
+        call_command(
+            'deliver_webhooks', '--once', '--workers=1', stdout=StringIO())
+
+    def test_events_are_queued_not_sent(self):
+        ''' Writing a comment only queues its events.
+        '''
+
+        self.comment()
+
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(WebhookEvent.objects.count(), 2)
+
+    def test_delivery_is_signed(self):
+        ''' Each event is posted with the signature of the body.
+        '''
+
+        self.comment()
+        self.deliver()
+
+        self.assertEqual(len(self.server.requests), 2)
+        headers, body = self.server.requests[0]
+        self.assertEqual(
+            headers[WEBHOOK_SIGNATURE_HEADER], sign('s3cret', body))
+        event = json.loads(body.decode('utf-8'))['events'][0]
+        self.assertEqual(event['event'], 'comment.created')
+        self.assertEqual(event['data']['text'], 'Looking into it.')
+        event = json.loads(
+            self.server.requests[1][1].decode('utf-8'))['events'][0]
+        self.assertEqual(event['event'], 'issue.status_changed')
+        self.assertEqual(event['data']['key'], 'TP1-1')
+        self.assertEqual(event['data']['status'], 'Open')
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_batches_and_subscriptions(self):
+        ''' Events are sent together up to the batch size, and only the
+        subscribed ones.
+        '''
+
+        self.webhook.batch_size = 10
+        self.webhook.events = 'comment.created'
+        self.webhook.save()
+        self.comment()
+        self.comment(status='Resolved')
+        self.deliver()
+
+        self.assertEqual(len(self.server.requests), 1)
+        events = json.loads(
+            self.server.requests[0][1].decode('utf-8'))['events']
+        self.assertEqual(
+            [event['event'] for event in events], ['comment.created'] * 2)
+
+    def test_failed_delivery_backs_off(self):
+        ''' A failing receiver is retried later with a growing delay.
+        '''
+
+        self.server.status = 503
+        self.comment()
+        self.deliver()
+
+        self.assertEqual(len(self.server.requests), 1)
+        webhook = Webhook.objects.get()
+        self.assertEqual(webhook.failures, 1)
+        self.assertIsNotNone(webhook.retry_at)
+        self.assertIsNone(webhook.locked_until)
+        self.assertEqual(WebhookEvent.objects.order_by('pk')[0].attempts, 1)
+
+        self.server.status = 200
+        Webhook.objects.update(retry_at=None)
+        self.deliver()
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(Webhook.objects.get().failures, 0)
+        self.assertFalse(WebhookEvent.objects.exists())
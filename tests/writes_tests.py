@@ -0,0 +1,123 @@
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from issuetrack.models import Issue, IssueConflict
+from issuetrack.settings import ISSUE_KIND_CODES, ISSUE_PRIORITY_CODES
+from issuetrack.settings import ISSUE_STATUS_CODES, ISSUE_URGENCY_CODES
+'''
+    * reverse imported for use with calling views.
+    * connection and CaptureQueriesContext imported to inspect the SQL
+      written.
+    * TestCase imported for WritesTest.
+    * Client imported for instantiating web client.
+    * User imported for creating and testing with a created user in the system.
+    * Issue and IssueConflict imported as the written model and its conflict.
+    * The ISSUE_*_CODES imported to give issues their codes.
+'''
+
+
+class WritesTest(TestCase):
+    ''' Test targeted issue updates and refused stale edits.
+    '''
+
+    def setUp(self):
+        ''' Objects and routines that are set up for each test method.
+        '''
+
+        self.admin_user = User.objects.create(
+            username='admin',
+            email='admin@localhost',
+            is_superuser=True,
+            is_staff=True,
+        )
+        self.admin_user.set_password('admin')
+        self.admin_user.save()
+
+        self.issue = Issue.objects.create(
+            title='Slow page',
+            description='The page takes a minute to load.',
+            creater=self.admin_user,
+            kind=ISSUE_KIND_CODES['Task'],
+            priority=ISSUE_PRIORITY_CODES['Major'],
+            urgency=ISSUE_URGENCY_CODES['Indefinite'],
+        )
+
+        self.client = Client()
+        self.client.post(
+            reverse('login'),
+            {
+                'username': 'admin',
+                'password': 'admin',
+            },
+        )
+
+    def change_issue(self, title, version):
+        ''' Post the change issue form with a new title.
+        '''
+        return self.client.post(
+            reverse('change_issue', kwargs={'issue_id': self.issue.id}),
+            {
+                'title': title,
+                'description': self.issue.description,
+                'kind': self.issue.kind,
+                'priority': self.issue.priority,
+                'urgency': self.issue.urgency,
+                'version': version,
+            },
+        )
+
+    def test_comment_writes_only_status(self):
+        ''' A comment changing the status does not rewrite the issue's text.
+        '''
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                reverse('add_comment', kwargs={'issue_id': self.issue.id}),
+                {
+                    'status': ISSUE_STATUS_CODES['Open'],
+                    'text': 'Looking into it.',
+                    'audience': 'Public',
+                },
+            )
+
+        updates = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE "issuetrack_issue"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"description"', updates[0])
+
+        issue = Issue.objects.get(pk=self.issue.id)
+        self.assertEqual(issue.status, ISSUE_STATUS_CODES['Open'])
+        self.assertEqual(issue.version, 2)
+        self.assertEqual(issue.comment_set.get().issue_status, issue.status)
+
+    def test_stale_edit_is_refused(self):
+        ''' An edit of an issue someone else changed since gets a conflict.
+        '''
+
+        self.issue.apply_changes(title='Slow issue page')
+
+        response = self.change_issue('Slow list page', version=1)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            Issue.objects.get(pk=self.issue.id).title, 'Slow issue page')
+
+        response = self.change_issue('Slow list page', version=2)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            Issue.objects.get(pk=self.issue.id).title, 'Slow list page')
+
+    def test_apply_changes_checks_version(self):
+        ''' apply_changes raises IssueConflict for an outdated version.
+        '''
+
+        self.issue.apply_changes(version=1, title='Slow issue page')
+        self.assertEqual(self.issue.version, 2)
+
+        with self.assertRaises(IssueConflict):
+            self.issue.apply_changes(version=1, title='Slow list page')
@@ -0,0 +1,112 @@
+''' Limiting how fast users and addresses can write.
+
+Each user and each client address has a bucket per scope that holds
+THROTTLE_RATES (or THROTTLE_IP_RATES) requests and is refilled at the
+start of every period. A bucket is a counter in THROTTLE_CACHE keyed by
+the period, taken with one atomic incr per request, so the check is a
+cache round trip for the user and one for the address. Requests over the
+limit get a 429 response with the seconds until the refill in
+Retry-After, and are counted per scope, see throttled_counts.
+'''
+
+from __future__ import absolute_import
+
+import math
+import time
+from functools import wraps
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from issuetrack.settings import THROTTLE_CACHE, THROTTLE_IP_META
+from issuetrack.settings import THROTTLE_IP_RATES, THROTTLE_RATES
+
+CLIENTS = ('user', 'ip')
+''' The kinds of clients limited, each with its own rates.
+'''
+
+
+def _incr(cache, key, timeout):
+    ''' Increment a counter in the cache, creating it as needed. Returns
+    the new count.
+    '''
+    try:
+        return cache.incr(key)
+    except ValueError:
+        ''' No counter yet, or it was evicted.
+        '''
+        if cache.add(key, 1, timeout):
+            return 1
+        return cache.incr(key)
+
+
+def _clients(request, scope):
+    ''' The (client, id, rate) of the buckets a request takes from.
+    '''
+    if request.user.is_authenticated():
+        yield 'user', request.user.pk, THROTTLE_RATES.get(scope)
+    address = request.META.get(THROTTLE_IP_META)
+    if address:
+        yield 'ip', address.split(',')[0].strip(), \
+            THROTTLE_IP_RATES.get(scope)
+
+
+def check(request, scope):
+    ''' Take a request from the buckets of its user and address. Returns
+    the seconds until the emptied bucket is refilled, or 0 if the request
+    may go ahead.
+    '''
+    cache = caches[THROTTLE_CACHE]
+    now = time.time()
+    for client, client_id, rate in _clients(request, scope):
+        if not rate:
+            continue
+        requests, seconds = rate
+        period = int(now // seconds)
+        key = 'issuetrack:throttle:{}:{}:{}:{}'.format(
+            scope, client, client_id, period)
+        if _incr(cache, key, seconds + 1) > requests:
+            _incr(cache, counter_key(scope, client), None)
+            return max(1, int(math.ceil((period + 1) * seconds - now)))
+    return 0
+
+
+def counter_key(scope, client):
+    ''' Cache key counting the throttled requests of a scope and kind of
+    client.
+    '''
+    return 'issuetrack:throttle:throttled:{}:{}'.format(scope, client)
+
+
+def throttled_counts():
+    ''' The number of throttled requests by (scope, client), for every
+    scope with rates.
+    '''
+    keys = dict(
+        (counter_key(scope, client), (scope, client))
+        for scope in set(THROTTLE_RATES) | set(THROTTLE_IP_RATES)
+        for client in CLIENTS
+    )
+    found = caches[THROTTLE_CACHE].get_many(list(keys))
+    return dict((pair, found.get(key, 0)) for key, pair in keys.items())
+
+
+def throttled(scope):
+    ''' Decorator limiting the POST requests of a view by the rates of the
+    scope.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def wrapped_view(request, *args, **kwargs):
+            if request.method == 'POST':
+                retry_after = check(request, scope)
+                if retry_after:
+                    response = HttpResponse(
+                        'Too many requests, try again later.\n',
+                        content_type='text/plain',
+                        status=429,
+                    )
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapped_view
+    return decorator
@@ -7,7 +7,12 @@ from django.contrib.auth.views import logout
 from issuetrack.views import index, issue, add_issue, add_project, projects
 from issuetrack.views import project, add_component, add_comment, change_issue
 from issuetrack.views import change_comment, change_project, change_component
-from issuetrack.views import delete_project, delete_component
+from issuetrack.views import delete_project, delete_component, issue_events
+from issuetrack.views import reopen_issue, add_attachment, attachment
+from issuetrack.views import similar_issues, changes
+from issuetrack.views import profiles, request_profile
+from issuetrack.views import add_link, delete_link, watch_issue
+from issuetrack.views import watch_project, portal_project, portal_issue
 
 urlpatterns = [
     url(
@@ -26,6 +31,41 @@ urlpatterns = [
         view=add_issue,
         name='add_issue',
     ),
+    url(
+        regex=r'^profiles/$',
+        view=profiles,
+        name='profiles',
+    ),
+    url(
+        regex=r'^profile/(?P<profile_id>[0-9]+)/$',
+        view=request_profile,
+        name='request_profile',
+    ),
+    url(
+        regex=r'^changes/$',
+        view=changes,
+        name='changes',
+    ),
+    url(
+        regex=r'^issue/similar/$',
+        view=similar_issues,
+        name='similar_issues',
+    ),
+    url(
+        regex=r'^issue/(?P<key>[^/]+)-(?P<number>[0-9]+)/$',
+        view=issue,
+        name='issue_key',
+    ),
+    url(
+        regex=r'^public/(?P<key>[A-Za-z0-9]+)/$',
+        view=portal_project,
+        name='portal_project',
+    ),
+    url(
+        regex=r'^public/(?P<key>[A-Za-z0-9]+)/(?P<number>[0-9]+)/$',
+        view=portal_issue,
+        name='portal_issue',
+    ),
     url(
         regex=r'^issue/(?P<issue_id>[^/]+)/$',
         view=issue,
@@ -41,6 +81,41 @@ urlpatterns = [
         view=change_issue,
         name='change_issue',
     ),
+    url(
+        regex=r'^issue/(?P<issue_id>[^/]+)/reopen/$',
+        view=reopen_issue,
+        name='reopen_issue',
+    ),
+    url(
+        regex=r'^issue/(?P<issue_id>[^/]+)/attachment/add/$',
+        view=add_attachment,
+        name='add_attachment',
+    ),
+    url(
+        regex=r'^issue/(?P<issue_id>[^/]+)/link/add/$',
+        view=add_link,
+        name='add_link',
+    ),
+    url(
+        regex=r'^issue/(?P<issue_id>[^/]+)/link/(?P<link_id>[0-9]+)/delete/$',
+        view=delete_link,
+        name='delete_link',
+    ),
+    url(
+        regex=r'^issue/(?P<issue_id>[^/]+)/watch/$',
+        view=watch_issue,
+        name='watch_issue',
+    ),
+    url(
+        regex=r'^attachment/(?P<attachment_id>[^/]+)/$',
+        view=attachment,
+        name='attachment',
+    ),
+    url(
+        regex=r'^issue/(?P<issue_id>[^/]+)/events/$',
+        view=issue_events,
+        name='issue_events',
+    ),
     url(
         regex=r'comment/(?P<comment_id>[^/]+)/change/$',
         view=change_comment,
@@ -71,6 +146,11 @@ urlpatterns = [
         view=project,
         name='project',
     ),
+    url(
+        regex=r'^project/(?P<project_id>[^/]+)/watch/$',
+        view=watch_project,
+        name='watch_project',
+    ),
     url(
         regex=r'^project/(?P<project_id>[^/]+)/change/$',
         view=change_project,
@@ -2,19 +2,44 @@
 
 from __future__ import absolute_import
 
+import json
 import os
+import time
+from collections import defaultdict
 from django.contrib.auth.decorators import login_required
-from django.core.exceptions import FieldError
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.core.urlresolvers import reverse
-from django.http import HttpResponseRedirect
+from django.db import models, transaction
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from issuetrack import events
+from issuetrack.attachments import attach, serve_attachment, streamed_uploads
+from issuetrack.changes import changes_since
+from issuetrack.dashboard import project_dashboard
+from issuetrack.facets import CountedPaginator, FacetFilter, SORT_FIELDS
+from issuetrack.archive import restore_issue
 from issuetrack.forms import (
     AddIssueForm, AddProjectForm, AddComponentForm, AddCommentForm,
+    AddAttachmentForm, AddLinkForm, SampleRateForm,
     ChangeIssueForm, ChangeCommentForm, ChangeProjectForm, ChangeComponentForm
 )
-from issuetrack.models import Comment, Component, Issue, Project
+from issuetrack.models import ArchivedComment, ArchivedIssue, Attachment
+from issuetrack.models import Comment, Component, Issue, IssueConflict
+from issuetrack.models import IssueLink, LinkCycle, Watch
+from issuetrack.models import AssigneeLoad, Project, RequestProfile
+from issuetrack.models import Sequence, Tombstone
+from issuetrack.models import copy_to_shards
+from issuetrack.portal import serve
+from issuetrack.profiling import sample_rate, set_sample_rate
+from issuetrack.pubsub import get_broker, issue_channel
+from issuetrack.routers import issue_databases
+from issuetrack.sharding import MergedList
+from issuetrack.throttle import throttled
 from issuetrack.settings import TEMPLATE_DIR, TEMPLATE_CONTEXT, LOGIN_URL
+from issuetrack.settings import SSE_HEARTBEAT, SSE_STREAM_TIMEOUT
+from issuetrack.settings import ISSUE_STATUS_CODES, SIMILARITY_SUGGESTIONS
+from issuetrack.settings import CHANGES_PAGE_SIZE, PORTAL_PAGE_SIZE
 
 
 @login_required(login_url=LOGIN_URL)
@@ -24,11 +49,10 @@ def index(request):
     """ This view's default sorting order in lieu of a valid order field. """
 
     order = request.GET.get('order_by', default_sort_order)
+    if order.lstrip('-') not in SORT_FIELDS:
+        order = default_sort_order
     ''' Requested sorting order for this view.
     '''
-    status = request.GET.get('status', 'all')
-    ''' Filter by status or use 'all'.
-    '''
     if request.user.is_staff or request.user.is_superuser:
         kwargs = {}
     else:
@@ -36,29 +60,19 @@ def index(request):
     ''' Staff and superuser users can see all available issues. Non-privileged
      users can only see their own issues.
     '''
-    try:
-        if status == 'all':
-            issue_list = list(Issue.objects.filter(**kwargs).order_by(order))
-        elif status == 'open':
-            issue_list = list(Issue.objects.filter(**kwargs).exclude(
-                status='Closed').order_by(order))
-        elif status == 'closed':
-            issue_list = list(
-                Issue.objects.filter(
-                    **kwargs, status='Closed').order_by(order))
-    except FieldError:
-        if status == 'all':
-            issue_list = list(
-                Issue.objects.filter(**kwargs).order_by(default_sort_order))
-        elif status == 'open':
-            issue_list = list(
-                Issue.objects.filter(**kwargs).exclude(
-                    status='Closed').order_by(default_sort_order))
-        elif status == 'closed':
-            issue_list = list(
-                Issue.objects.filter(
-                    **kwargs, status='Closed').order_by(default_sort_order))
-    paginator = Paginator(issue_list, 25)
+    facet_filter = FacetFilter(
+        Issue.objects.live().filter(**kwargs), request.GET)
+    ''' Narrow the list by the selected project, component, assignee, status,
+    priority, kind and urgency. Issues of deleted projects and components are
+    not listed.
+    '''
+    facets, total = facet_filter.facets()
+    issue_list = MergedList(
+        facet_filter.filter().select_related('project', 'assignee'), order)
+    paginator = CountedPaginator(issue_list, 25, total)
+    ''' The facet query already counted the matching issues. With sharded
+    issues, the page is merged from the pages of every database.
+    '''
     page = request.GET.get('page')
     try:
         issue_list = paginator.page(page)
@@ -69,11 +83,16 @@ def index(request):
     view_context = {
         'issue_list': issue_list,
         'page_title': 'Issuetrack',
-        'status': status,
+        'facets': facets,
+        'query': facet_filter.query(),
+        'order': order,
     }
     ''' Context used for this view:
         issue_list:     List of all issues
         page_title:     Title of the html page
+        facets:         Values and counts of each facet
+        query:          Query string of the selected facets
+        order:          Sorting order of the list
     '''
     view_context.update(TEMPLATE_CONTEXT)
     ''' Add standard template context from Issuetrack settings file.
@@ -106,11 +125,29 @@ def projects(request):
 
 
 @login_required(login_url=LOGIN_URL)
-def issue(request, issue_id):
-    ''' View: /issue/<issue_id>/
+def issue(request, issue_id=None, key=None, number=None):
+    ''' View: /issue/<issue_id>/ or /issue/<key>-<number>/
     '''
-    issue = Issue.objects.get(pk=issue_id)
-    ''' Issue object for this view.
+    if key is None:
+        lookup = {'pk': issue_id}
+    else:
+        lookup = {'project__key': key, 'number': number}
+    ''' Issue keys are resolved through the unique project key and the
+    unique (project, number) index in one query.
+    '''
+    try:
+        issue = Issue.objects.live().defer(
+            *Issue.rich_text_fields).get(**lookup)
+        comment_list = Comment.objects.filter(issue=issue).defer('text')
+        archived = False
+    except Issue.DoesNotExist:
+        issue = ArchivedIssue.objects.live().defer(
+            *Issue.rich_text_fields).get(**lookup)
+        comment_list = ArchivedComment.objects.filter(issue=issue).defer(
+            'text')
+        archived = True
+    ''' Issue object for this view. Archived issues are shown read-only.
+    Only the sanitized HTML of the rich text fields is loaded.
     '''
     if request.user != issue.creater and not request.user.is_superuser and \
             not request.user.is_staff:
@@ -118,14 +155,57 @@ def issue(request, issue_id):
     ''' Only staff, issue owners and superuser users can see their
     issue details.
     '''
+    attachment_list = []
+    comment_attachments = {}
+    for attachment in Attachment.objects.filter(
+            issue_id=issue.id).select_related('blob').order_by('created'):
+        if attachment.comment_id is None:
+            attachment_list.append(attachment)
+        else:
+            comment_attachments.setdefault(
+                attachment.comment_id, []).append(attachment)
+    comment_list = list(comment_list)
+    for comment in comment_list:
+        comment.attachment_list = comment_attachments.get(comment.id, [])
+    ''' Files attached to the issue and to each comment, all fetched in one
+    query.
+    '''
+    link_list = []
+    blocker_list = []
+    if not archived:
+        link_list = IssueLink.objects.filter(
+            models.Q(source=issue) | models.Q(target=issue),
+        ).select_related('source__project', 'target__project')
+        if not request.user.is_staff and not request.user.is_superuser:
+            link_list = link_list.filter(
+                source__creater=request.user, target__creater=request.user)
+        link_list = list(link_list)
+        blocker_list = list(Issue.objects.ancestors(issue).visible_to(
+            request.user).select_related('project').order_by('status', 'pk'))
+    ''' Links from and to the issue, and everything blocking it directly or
+    through other blockers, as far as the user can see the other issues.
+    '''
     view_context = {
         'issue': issue,
-        'comment_list': Comment.objects.filter(issue=issue),
-        'page_title': 'Issuetrack - Issue #{}'.format(issue.id),
+        'archived': archived,
+        'attachment_list': attachment_list,
+        'link_list': link_list,
+        'blocker_list': blocker_list,
+        'watching': Watch.objects.filter(
+            user=request.user, issue_id=issue.id).exists(),
+        'comment_list': comment_list,
+        'last_event_id': get_broker().last_id(issue_channel(issue.id)),
+        'page_title': 'Issuetrack - Issue {}'.format(issue.key),
     }
     ''' Context used for this view:
         issue:          Issue object for this view.
+        archived:       Whether the issue was moved to the archive.
+        attachment_list: Files attached to the issue itself.
+        link_list:      Links from and to the issue.
+        blocker_list:   Issues blocking the issue, directly or not.
+        watching:       Whether the user watches the issue.
         comment_list:   List of comments for this issue.
+        last_event_id:  Live update the page is current with.
         page_title:     Title of the html page.
     '''
     view_context.update(TEMPLATE_CONTEXT)
@@ -137,6 +217,75 @@ def issue(request, issue_id):
     return render(request, template_file, view_context)
 
 
+@login_required(login_url=LOGIN_URL)
+def reopen_issue(request, issue_id):
+    ''' View: /issue/<issue_id>/reopen/
+
+    Moves an archived issue back to the live issues with the 'Open' status.
+    '''
+    archived = ArchivedIssue.objects.get(pk=issue_id)
+    ''' Archived issue object for this view.
+    '''
+    if request.user != archived.creater and \
+            not request.user.is_superuser and not request.user.is_staff:
+        return HttpResponseRedirect(reverse('index'))
+    ''' Only staff, issue owners and superuser users can reopen an issue.
+    '''
+    if request.method == 'POST':
+        events.status_changed(
+            restore_issue(archived, ISSUE_STATUS_CODES['Open']),
+            request.user)
+    return HttpResponseRedirect(
+        reverse('issue', kwargs={'issue_id': issue_id}))
+
+
+@login_required(login_url=LOGIN_URL)
+def issue_events(request, issue_id):
+    ''' View: /issue/<issue_id>/events/
+
+    Server-Sent Events stream of the new comments and status changes of
+    an issue. The stream is closed after SSE_STREAM_TIMEOUT seconds and the
+    browser resumes from the Last-Event-ID it received.
+    '''
+    issue = Issue.objects.live().get(pk=issue_id)
+    ''' Issue object for this view.
+    '''
+    if request.user != issue.creater and not request.user.is_superuser and \
+            not request.user.is_staff:
+        return HttpResponseRedirect(reverse('index'))
+    ''' Only staff, issue owners and superuser users can follow an issue.
+    '''
+    last_id = request.META.get(
+        'HTTP_LAST_EVENT_ID', request.GET.get('last_event_id', 0))
+    try:
+        last_id = int(last_id)
+    except ValueError:
+        last_id = 0
+    ''' Resume after the last event the browser has seen.
+    '''
+
+    def stream(last_id):
+        broker = get_broker()
+        channel = issue_channel(issue.id)
+        deadline = time.time() + SSE_STREAM_TIMEOUT
+        yield 'retry: 3000\n\n'
+        while time.time() < deadline:
+            updates = broker.listen(channel, last_id, SSE_HEARTBEAT)
+            if not updates:
+                yield ': keep-alive\n\n'
+            for last_id, event, data in updates:
+                yield 'id: {}\nevent: {}\ndata: {}\n\n'.format(
+                    last_id, event, json.dumps(data))
+
+    response = StreamingHttpResponse(
+        stream(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    ''' Keep proxies from caching or buffering the stream.
+    '''
+    return response
+
+
 @login_required(login_url=LOGIN_URL)
 def project(request, project_id):
     ''' View: /project/<project_id>/
@@ -144,12 +293,33 @@ def project(request, project_id):
     project = Project.objects.get(pk=project_id)
     ''' Project object for this view.
     '''
+    blockers = defaultdict(list)
+    for blocker in Issue.objects.open_blockers(project).visible_to(
+            request.user).order_by('priority', 'pk').select_related(
+            'project'):
+        blockers[blocker.blocked_component_id].append(blocker)
+    blocker_list = [
+        (component, blockers[component.id])
+        for component in project.component_set.all()
+    ]
+    ''' The open issues blocking each component's open issues, all fetched
+    in one query, as far as the user can see them.
+    '''
     view_context = {
         'project': project,
+        'dashboard': project_dashboard(project.id, request.user),
+        'blocker_list': blocker_list,
+        'watching': Watch.objects.filter(
+            user=request.user, project=project).exists(),
         'page_title': 'Issuetrack - Project: {}'.format(project.name),
     }
     ''' Context used for this view:
         project:        Project object for this view.
+        dashboard:      Issue statistics of the project, see
+                        issuetrack.dashboard. Only staff get its lists of
+                        issues.
+        blocker_list:   Components with the open issues blocking them.
+        watching:       Whether the user watches the project.
         page_title:     Title of the html page.
     '''
     view_context.update(TEMPLATE_CONTEXT)
@@ -162,6 +332,7 @@ def project(request, project_id):
 
 
 @login_required(login_url=LOGIN_URL)
+@throttled('add_issue')
 def add_issue(request):
     ''' View: /issue/add/
     '''
@@ -186,6 +357,9 @@ def add_issue(request):
             issue.save()
             ''' Now, save the issue object to peristence.
             '''
+            events.issue_created(issue)
+            ''' Queue the new issue for the project's webhooks.
+            '''
             return HttpResponseRedirect(reverse('index'))
             ''' Send the user back to the "home" page.
             '''
@@ -216,6 +390,141 @@ def add_issue(request):
     return render(request, template_file, view_context)
 
 
+@login_required(login_url=LOGIN_URL)
+def similar_issues(request):
+    ''' View: /issue/similar/?title=<title>&description=<description>
+
+    The issues most likely duplicating the one being entered, as JSON. The
+    create issue page shows them while the user types.
+    '''
+    issues = Issue.objects.live().similar_to(
+        request.GET.get('title', ''), request.GET.get('description', ''))
+    if not request.user.is_superuser and not request.user.is_staff:
+        issues = issues.filter(creater=request.user)
+    ''' Other users only see their own issues, as on the issue pages.
+    '''
+    issues = issues.select_related('project').only(
+        'title', 'status', 'number', 'modified', 'project__key')
+    found = []
+    for database in issue_databases():
+        found.extend(issues.using(database)[:SIMILARITY_SUGGESTIONS])
+    found.sort(key=lambda issue: issue.modified, reverse=True)
+    found.sort(key=lambda issue: issue.shared_buckets, reverse=True)
+    ''' The best matches of each database, merged in the same order.
+    '''
+    return JsonResponse({
+        'issues': [
+            {
+                'key': issue.key,
+                'title': issue.title,
+                'status': issue.get_status_display(),
+                'url': reverse('issue', kwargs={'issue_id': issue.id}),
+            }
+            for issue in found[:SIMILARITY_SUGGESTIONS]
+        ],
+    })
+
+
+@login_required(login_url=LOGIN_URL)
+def changes(request):
+    ''' View: /changes/?since=<cursor>&limit=<count>
+
+    The projects, components, issues and comments changed or deleted after
+    the cursor, as JSON, for keeping a copy of them up to date. See
+    issuetrack.changes.
+    '''
+    if not request.user.is_staff and not request.user.is_superuser:
+        return HttpResponseRedirect(reverse('index'))
+    ''' Only staff and superuser users see every project's changes.
+    '''
+    try:
+        limit = min(
+            int(request.GET.get('limit', CHANGES_PAGE_SIZE)),
+            CHANGES_PAGE_SIZE,
+        )
+        if limit < 1:
+            raise ValueError('Invalid limit {}'.format(limit))
+        found, cursor, more = changes_since(
+            request.GET.get('since', ''), limit)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({
+        'changes': found,
+        'cursor': cursor,
+        'more': more,
+    })
+
+
+@login_required(login_url=LOGIN_URL)
+def profiles(request):
+    ''' View: /profiles/
+    '''
+    if not request.user.is_staff and not request.user.is_superuser:
+        return HttpResponseRedirect(reverse('index'))
+    ''' Only staff and superuser users see the request profiles.
+    '''
+    sample_rate_form = None
+    if request.user.is_superuser:
+        if request.method == 'POST':
+            sample_rate_form = SampleRateForm(request.POST)
+            if sample_rate_form.is_valid():
+                set_sample_rate(sample_rate_form.cleaned_data['sample_rate'])
+                return HttpResponseRedirect(reverse('profiles'))
+        else:
+            sample_rate_form = SampleRateForm(
+                initial={'sample_rate': sample_rate()})
+    ''' Superusers set the share of requests profiled.
+    '''
+    view_context = {
+        'profile_list': RequestProfile.objects.order_by('-created').defer(
+            'stats', 'queries', 'templates'),
+        'sample_rate_form': sample_rate_form,
+        'page_title': 'Issuetrack - Request Profiles',
+    }
+    ''' Context used for this view:
+        profile_list:       The stored request profiles, latest first.
+        sample_rate_form:   Form setting the sample rate, for superusers.
+        page_title:         Title of the html page.
+    '''
+    view_context.update(TEMPLATE_CONTEXT)
+    ''' Add standard template context from Issuetrack settings file.
+    '''
+    template_file = os.path.join(TEMPLATE_DIR, 'listing', 'profiles.html')
+    ''' Template file used by this view.
+    '''
+    return render(request, template_file, view_context)
+
+
+@login_required(login_url=LOGIN_URL)
+def request_profile(request, profile_id):
+    ''' View: /profile/<profile_id>/
+    '''
+    if not request.user.is_staff and not request.user.is_superuser:
+        return HttpResponseRedirect(reverse('index'))
+    profile = RequestProfile.objects.get(pk=profile_id)
+    ''' Request profile for this view.
+    '''
+    view_context = {
+        'profile': profile,
+        'queries': json.loads(profile.queries),
+        'templates': json.loads(profile.templates),
+        'page_title': 'Issuetrack - Profile: {}'.format(profile.path),
+    }
+    ''' Context used for this view:
+        profile:        RequestProfile object for this view.
+        queries:        The [database, milliseconds, sql] of the queries.
+        templates:      The [name, milliseconds] of the templates.
+        page_title:     Title of the html page.
+    '''
+    view_context.update(TEMPLATE_CONTEXT)
+    ''' Add standard template context from Issuetrack settings file.
+    '''
+    template_file = os.path.join(TEMPLATE_DIR, 'model', 'profile.html')
+    ''' Template file used by this view.
+    '''
+    return render(request, template_file, view_context)
+
+
 @login_required(login_url=LOGIN_URL)
 def add_project(request):
     ''' View: /project/add/
@@ -332,6 +641,8 @@ def add_component(request, project_id):
 
 
 @login_required(login_url=LOGIN_URL)
+@throttled('add_comment')
+@streamed_uploads
 def add_comment(request, issue_id):
     ''' View: /issue/<issue_id>/comment/add/
     '''
@@ -349,7 +660,7 @@ def add_comment(request, issue_id):
     if request.method == 'POST':
         ''' If this view is called using the POST method ...
         '''
-        add_comment_form = AddCommentForm(request.POST)
+        add_comment_form = AddCommentForm(request.POST, request.FILES)
         ''' Get the data from the POST request.
         '''
         if add_comment_form.is_valid():
@@ -365,11 +676,30 @@ def add_comment(request, issue_id):
             new_comment.author = request.user
             ''' Set the author of the comment based on the logged-in user.
             '''
-            issue.status = add_comment_form.cleaned_data['status']
-            issue.save()
-            new_comment.issue_status = issue.status
-            new_comment.save()
-            ''' Save the new component to persistence.
+            status = add_comment_form.cleaned_data['status']
+            status_changed = issue.status != status
+            Sequence.assign([new_comment], ArchivedComment)
+            ''' Take the comment's id before the transaction, see Sequence.
+            '''
+            with transaction.atomic(), \
+                    transaction.atomic(using=issue._state.db):
+                issue.apply_changes(
+                    **({'status': status} if status_changed else {}))
+                new_comment.issue_status = status
+                new_comment.save()
+                if add_comment_form.cleaned_data['attachment']:
+                    attach(
+                        add_comment_form.cleaned_data['attachment'],
+                        issue.id, request.user, new_comment.id,
+                    )
+            ''' Save the new comment, its attachment and the issue's status,
+            if changed, together. Only the status and modified columns of the
+            issue are written.
+            '''
+            events.comment_saved(new_comment, created=True)
+            if status_changed:
+                events.status_changed(issue, request.user)
+            ''' Push the comment and status to the issue's live listeners.
             '''
             return HttpResponseRedirect(
                 reverse(
@@ -403,6 +733,213 @@ def add_comment(request, issue_id):
 
 
 @login_required(login_url=LOGIN_URL)
+@streamed_uploads
+def add_attachment(request, issue_id):
+    ''' View: /issue/<issue_id>/attachment/add/
+    '''
+    issue = Issue.objects.live().get(pk=issue_id)
+    ''' Issue object the file is being attached to.
+    '''
+    if not request.user.is_staff and not request.user.is_superuser and \
+            issue.creater != request.user:
+        return HttpResponseRedirect(
+            reverse('index')
+        )
+    ''' Only staff, issue owners and superuser users can attach files to
+    an issue.
+    '''
+    if request.method == 'POST':
+        ''' If this view is called using the POST method ...
+        '''
+        add_attachment_form = AddAttachmentForm(request.POST, request.FILES)
+        ''' Get the data from the POST request. The file was already
+        written to disk while it was uploaded.
+        '''
+        if add_attachment_form.is_valid():
+            attach(
+                add_attachment_form.cleaned_data['file'],
+                issue.id, request.user,
+            )
+            ''' Store the file, unless its content is stored already.
+            '''
+            return HttpResponseRedirect(
+                reverse(
+                    'issue', kwargs={'issue_id': issue_id}
+                )
+            )
+            ''' Redirect the user to individual issue page.
+            '''
+    else:
+        add_attachment_form = AddAttachmentForm()
+        ''' Create an empty attachment form.
+        '''
+    view_context = {
+        'add_attachment_form': add_attachment_form,
+        'page_title': 'Issuetrack - Attach File to Issue {}'.format(
+            issue.key),
+        'issue': issue,
+    }
+    ''' Context used for this view:
+        add_attachment_form:    Generated AddAttachmentForm.
+        page_title:             Title of the html page.
+        issue:                  Issue object for this view.
+    '''
+    view_context.update(TEMPLATE_CONTEXT)
+    ''' Add standard template context from Issuetrack settings file.
+    '''
+    template_file = os.path.join(TEMPLATE_DIR, 'add', 'attachment.html')
+    ''' Template file used by this view.
+    '''
+    return render(request, template_file, view_context)
+
+
+@login_required(login_url=LOGIN_URL)
+@throttled('change')
+def add_link(request, issue_id):
+    ''' View: /issue/<issue_id>/link/add/
+    '''
+    issue = Issue.objects.live().get(pk=issue_id)
+    ''' Issue object the link is made from.
+    '''
+    if not request.user.is_staff and not request.user.is_superuser and \
+            issue.creater != request.user:
+        return HttpResponseRedirect(
+            reverse('issue', kwargs={'issue_id': issue_id})
+        )
+    ''' Only staff, issue owners and superuser users can link an issue.
+    '''
+    if request.method == 'POST':
+        ''' If this view is called using the POST method ...
+        '''
+        add_link_form = AddLinkForm(request.POST, user=request.user)
+        ''' Get the data from the POST request.
+        '''
+        if add_link_form.is_valid():
+            try:
+                IssueLink.add(
+                    add_link_form.cleaned_data['kind'],
+                    issue,
+                    add_link_form.cleaned_data['issue'],
+                )
+                return HttpResponseRedirect(
+                    reverse('issue', kwargs={'issue_id': issue_id}))
+                ''' Redirect the user to individual issue page.
+                '''
+            except LinkCycle:
+                add_link_form.add_error(
+                    'issue',
+                    'This link would close a cycle, e.g. two issues' +
+                    ' blocking each other.'
+                )
+            except ValueError:
+                add_link_form.add_error(
+                    'issue', 'Only issues on the same database can be linked.')
+    else:
+        add_link_form = AddLinkForm(user=request.user)
+        ''' Create an empty link form.
+        '''
+    view_context = {
+        'add_link_form': add_link_form,
+        'page_title': 'Issuetrack - Link Issue {}'.format(issue.key),
+        'issue': issue,
+    }
+    ''' Context used for this view:
+        add_link_form:  Generated AddLinkForm.
+        page_title:     Title of the html page.
+        issue:          Issue object for this view.
+    '''
+    view_context.update(TEMPLATE_CONTEXT)
+    ''' Add standard template context from Issuetrack settings file.
+    '''
+    template_file = os.path.join(TEMPLATE_DIR, 'add', 'link.html')
+    ''' Template file used by this view.
+    '''
+    return render(request, template_file, view_context)
+
+
+@login_required(login_url=LOGIN_URL)
+def delete_link(request, issue_id, link_id):
+    ''' View: /issue/<issue_id>/link/<link_id>/delete/
+
+    Removes a link from or to the issue on a POST request.
+    '''
+    link = IssueLink.objects.select_related('source', 'target').get(
+        models.Q(source_id=issue_id) | models.Q(target_id=issue_id),
+        pk=link_id,
+    )
+    ''' Link object for this view.
+    '''
+    if request.user.is_staff or request.user.is_superuser or \
+            request.user.id in (link.source.creater_id,
+                                link.target.creater_id):
+        if request.method == 'POST':
+            link.delete()
+    ''' Only staff, superuser users and the owners of either issue can
+    remove a link.
+    '''
+    return HttpResponseRedirect(
+        reverse('issue', kwargs={'issue_id': issue_id}))
+
+
+@login_required(login_url=LOGIN_URL)
+def watch_issue(request, issue_id):
+    ''' View: /issue/<issue_id>/watch/
+
+    Starts or stops watching the issue on a POST request.
+    '''
+    issue = Issue.objects.live().get(pk=issue_id)
+    ''' Issue object for this view.
+    '''
+    if not Watch.can_watch(request.user, issue):
+        return HttpResponseRedirect(reverse('index'))
+    ''' Users can only watch the issues they can see: staff and superusers
+    any, other users their own.
+    '''
+    if request.method == 'POST':
+        Watch.toggle(request.user, issue_id=issue.id)
+    return HttpResponseRedirect(
+        reverse('issue', kwargs={'issue_id': issue_id}))
+
+
+@login_required(login_url=LOGIN_URL)
+def watch_project(request, project_id):
+    ''' View: /project/<project_id>/watch/
+
+    Starts or stops watching every issue of the project on a POST request.
+    Like watch_issue, the digests only carry the issues the user can see.
+    '''
+    project = Project.objects.get(pk=project_id)
+    ''' Project object for this view.
+    '''
+    if request.method == 'POST':
+        Watch.toggle(request.user, project=project)
+    return HttpResponseRedirect(
+        reverse('project', kwargs={'project_id': project_id}))
+
+
+@login_required(login_url=LOGIN_URL)
+def attachment(request, attachment_id):
+    ''' View: /attachment/<attachment_id>/
+    '''
+    attachment = Attachment.objects.select_related('blob').get(
+        pk=attachment_id)
+    ''' Attachment object for this view.
+    '''
+    creater_ids = list(Issue.objects.filter(
+        pk=attachment.issue_id).values_list('creater_id', flat=True)) or \
+        list(ArchivedIssue.objects.filter(
+            pk=attachment.issue_id).values_list('creater_id', flat=True))
+    if request.user.id not in creater_ids and \
+            not request.user.is_superuser and not request.user.is_staff:
+        return HttpResponseRedirect(reverse('index'))
+    ''' Only staff, issue owners and superuser users can download the files
+    of an issue, archived or not.
+    '''
+    return serve_attachment(request, attachment)
+
+
+@login_required(login_url=LOGIN_URL)
+@throttled('change')
 def change_issue(request, issue_id):
     ''' View: /issue/<issue_id>/change/
     '''
@@ -411,6 +948,9 @@ def change_issue(request, issue_id):
         return HttpResponseRedirect(
             reverse('issue', kwargs={'issue_id': issue_id})
         )
+    status = 200
+    ''' Response status, 409 if the edits conflict with someone else's.
+    '''
     if request.method == "POST":
         ''' If this view is called using the POST method ...
         '''
@@ -418,16 +958,34 @@ def change_issue(request, issue_id):
         ''' Get the data from the POST request but saving for this issue.
         '''
         if change_issue_form.is_valid():
-            ''' If this is form's data is valid then create the new
-            Issue object.
-            '''
-            issue = change_issue_form.save()
-            ''' Save data from this form to the same issue.
-            '''
-            return HttpResponseRedirect(reverse(
-                'issue', kwargs={'issue_id': issue.id}))
-            ''' Send the user back to the issue's page.
+            ''' If this is form's data is valid then write the changed
+            fields of the issue.
             '''
+            try:
+                issue.apply_changes(
+                    version=change_issue_form.cleaned_data['version'],
+                    **change_issue_form.changes()
+                )
+                return HttpResponseRedirect(reverse(
+                    'issue', kwargs={'issue_id': issue.id}))
+                ''' Send the user back to the issue's page.
+                '''
+            except IssueConflict:
+                issue.refresh_from_db()
+                data = request.POST.copy()
+                data['version'] = issue.version
+                change_issue_form = ChangeIssueForm(data, instance=issue)
+                change_issue_form.is_valid()
+                change_issue_form.add_error(
+                    None,
+                    "This issue was changed by someone else since you" +
+                    " opened it. Check the issue's page and save again to" +
+                    " overwrite their changes."
+                )
+                status = 409
+                ''' Someone else changed the issue in the meantime. Show
+                the edits again, now based on the current version.
+                '''
     else:
         ''' If this view is called by any other method besides POST --
         usually 'GET' ...
@@ -449,10 +1007,11 @@ def change_issue(request, issue_id):
     template_file = os.path.join(TEMPLATE_DIR, 'change', 'issue.html')
     ''' Template file used by this view.
     '''
-    return render(request, template_file, view_context)
+    return render(request, template_file, view_context, status=status)
 
 
 @login_required(login_url=LOGIN_URL)
+@throttled('change')
 def change_comment(request, comment_id):
     ''' View: /comment/<comment_id>/change/
     '''
@@ -475,17 +1034,28 @@ def change_comment(request, comment_id):
             ''' If this form's data is valid then create the new Comment
             object.
             '''
-            comment.issue.status = change_comment_form.cleaned_data['status']
-            ''' Change the issue's status as needed.
-            '''
-            comment.issue.save()
-            ''' Save the issue's status.
-            '''
-            comment.issue_status = comment.issue.status
+            issue = comment.issue
+            status = change_comment_form.cleaned_data['status']
+            status_changed = issue.status != status
+            comment = change_comment_form.save(commit=False)
+            comment.issue_status = status
             ''' Set the comment's issue status tracking.
             '''
-            comment = change_comment_form.save()
-            ''' Save data from this form to the same comment.
+            with transaction.atomic(), \
+                    transaction.atomic(using=issue._state.db):
+                issue.apply_changes(
+                    **({'status': status} if status_changed else {}))
+                comment.save(update_fields=[
+                    name for name in change_comment_form.changed_data
+                    if name in ('text', 'audience')
+                ] + ['issue_status', 'modified'])
+            ''' Save the changed comment fields and the issue's status, if
+            changed, together.
+            '''
+            events.comment_saved(comment)
+            if status_changed:
+                events.status_changed(issue, request.user)
+            ''' Push the comment and status to the issue's live listeners.
             '''
             return HttpResponseRedirect(reverse(
                 'issue', kwargs={'issue_id': comment.issue.id}))
@@ -519,6 +1089,7 @@ def change_comment(request, comment_id):
 
 
 @login_required(login_url=LOGIN_URL)
+@throttled('change')
 def change_project(request, project_id):
     ''' View: /project/<project_id>/change/
     '''
@@ -572,6 +1143,7 @@ def change_project(request, project_id):
 
 
 @login_required(login_url=LOGIN_URL)
+@throttled('change')
 def change_component(request, component_id):
     ''' View: /component/<component_id>/change/
     '''
@@ -627,6 +1199,92 @@ def change_component(request, component_id):
     return render(request, template_file, view_context)
 
 
+def portal_project(request, key):
+    ''' View: /public/<key>/
+
+    The issues of a project with a public portal, newest first. Needs no
+    login; see issuetrack.portal.
+    '''
+    page = request.GET.get('page', '1')
+    if not page.isdigit():
+        raise Http404('No such page.')
+    ''' Only page numbers make distinct pages, so that the cache holds one
+    copy of each.
+    '''
+
+    def build(project):
+        ''' Template file and context of the page.
+        '''
+        paginator = Paginator(
+            Issue.objects.live().filter(project=project).only(
+                'project', 'number', 'title', 'status', 'kind', 'modified',
+            ).order_by('-number'),
+            PORTAL_PAGE_SIZE,
+        )
+        try:
+            issue_list = paginator.page(page)
+        except (EmptyPage, PageNotAnInteger):
+            raise Http404('No such page.')
+        view_context = {
+            'project': project,
+            'issue_list': issue_list,
+            'page_title': 'Issuetrack - {}'.format(project.name),
+        }
+        ''' Context used for this view:
+            project:        Project object for this view.
+            issue_list:     Page of the project's issues.
+            page_title:     Title of the html page.
+        '''
+        view_context.update(TEMPLATE_CONTEXT)
+        ''' Add standard template context from Issuetrack settings file.
+        '''
+        return os.path.join(TEMPLATE_DIR, 'portal', 'project.html'), \
+            view_context
+
+    return serve(request, key, 'issues:{}'.format(int(page)), build)
+
+
+def portal_issue(request, key, number):
+    ''' View: /public/<key>/<number>/
+
+    An issue of a project with a public portal and its public comments.
+    Needs no login; see issuetrack.portal.
+    '''
+
+    def build(project):
+        ''' Template file and context of the page.
+        '''
+        try:
+            issue = Issue.objects.live().defer(
+                *Issue.rich_text_fields).get(project=project, number=number)
+        except Issue.DoesNotExist:
+            raise Http404('No issue has this key.')
+        comment_list = Comment.objects.filter(
+            issue=issue, audience='Public').defer('text').order_by(
+            'created', 'pk')
+        ''' Private comments are never shown on the portal.
+        '''
+        view_context = {
+            'project': project,
+            'issue': issue,
+            'comment_list': comment_list,
+            'page_title': 'Issuetrack - Issue {}'.format(issue.key),
+        }
+        ''' Context used for this view:
+            project:        Project object for this view.
+            issue:          Issue object for this view.
+            comment_list:   The issue's public comments.
+            page_title:     Title of the html page.
+        '''
+        view_context.update(TEMPLATE_CONTEXT)
+        ''' Add standard template context from Issuetrack settings file.
+        '''
+        return os.path.join(TEMPLATE_DIR, 'portal', 'issue.html'), \
+            view_context
+
+    return serve(request, key, 'issue:{}'.format(number), build)
+
+
 def delete_project(request, project_id):
     ''' View: /project/<project_id>/delete/
     '''
@@ -636,7 +1294,17 @@ def delete_project(request, project_id):
         return HttpResponseRedirect(
             reverse('project', kwargs={'project_id': project_id})
         )
-    project.delete()
+    with transaction.atomic():
+        project.deleted = True
+        project.save(update_fields=['deleted'])
+        Component.all_objects.filter(project=project).update(deleted=True)
+        copy_to_shards(Component.all_objects.filter(project=project))
+        Tombstone.record(Project, [project.pk])
+        Tombstone.record(Component, Component.all_objects.filter(
+            project=project).values_list('pk', flat=True))
+    ''' Hide the project and its components at once. The rows are removed
+    in the background by the purge_deleted command.
+    '''
     return HttpResponseRedirect(reverse('projects'))
 
 
@@ -648,11 +1316,19 @@ def delete_component(request, component_id):
     if not request.user.is_staff and not request.user.is_superuser and \
             component.project.owner != request.user:
         return HttpResponseRedirect(
-            reverse('project', kwargs={'project_id': project_id})
+            reverse('project', kwargs={'project_id': component.project.id})
         )
         ''' Redirect if the user doesn't have authorization. '''
-    component.delete()
-    ''' Delete the component. '''
+    with transaction.atomic():
+        component.deleted = True
+        component.save(update_fields=['deleted'])
+        Tombstone.record(Component, [component.pk])
+    ''' Hide the component. The rows are removed in the background by the
+    purge_deleted command.
+    '''
+    AssigneeLoad.rebuild(component.project_id)
+    ''' Its issues no longer count towards the members' workloads.
+    '''
     return HttpResponseRedirect(
         reverse('project', kwargs={'project_id': component.project.id})
     )
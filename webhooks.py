@@ -0,0 +1,193 @@
+''' Posting the events of a project's issues to its webhooks.
+
+The views only queue the events, as WebhookEvent rows, so a slow or
+unreachable receiver never delays them. The deliver_webhooks command
+drains the queue with WEBHOOK_WORKERS threads. A worker locks a webhook
+with due events, posts up to its batch_size oldest events in one request
+signed with its secret, and removes them once the receiver answered with
+a 2xx status. After a failure the webhook is retried after
+WEBHOOK_RETRY_DELAY seconds, doubled with every failure in a row.
+
+Requests are JSON objects with an "events" list. Each event has an "id",
+unique across deliveries, an "event" name, its "created" date and its
+"data". Receivers check the WEBHOOK_SIGNATURE_HEADER header, which is
+sha256=<hex HMAC-SHA256 of the raw body keyed with the secret>.
+'''
+
+from __future__ import absolute_import
+
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import timedelta
+from http.client import HTTPException
+from urllib.request import Request, urlopen
+
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from issuetrack.models import Webhook, WebhookEvent
+from issuetrack.settings import WEBHOOK_MAX_ATTEMPTS, WEBHOOK_POLL_INTERVAL
+from issuetrack.settings import WEBHOOK_RETRY_DELAY, WEBHOOK_RETRY_MAX_DELAY
+from issuetrack.settings import WEBHOOK_SIGNATURE_HEADER, WEBHOOK_TIMEOUT
+from issuetrack.settings import WEBHOOK_WORKERS
+
+EVENTS = (
+    'issue.created',
+    'issue.status_changed',
+    'comment.created',
+    'comment.changed',
+)
+''' Events webhooks can subscribe to.
+'''
+
+
+def enqueue(project_id, event, data):
+    ''' Queue an event for the active webhooks of a project that subscribed
+    to it.
+    '''
+    if project_id is None:
+        return
+    payload = json.dumps({
+        'id': uuid.uuid4().hex,
+        'event': event,
+        'created': timezone.now().isoformat(),
+        'data': data,
+    })
+    WebhookEvent.objects.bulk_create(
+        WebhookEvent(webhook=webhook, payload=payload)
+        for webhook in Webhook.objects.filter(
+            project_id=project_id, active=True)
+        if webhook.wants(event)
+    )
+
+
+def sign(secret, body):
+    ''' Signature header value of a request body.
+    '''
+    return 'sha256=' + hmac.new(
+        secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def _claim(now):
+    ''' Lock a webhook with due events that no other worker is delivering
+    and return it, or None if there is none.
+    '''
+    free = Q(locked_until__isnull=True) | Q(locked_until__lte=now)
+    due = list(Webhook.objects.filter(
+        free,
+        Q(retry_at__isnull=True) | Q(retry_at__lte=now),
+        active=True,
+        webhookevent__isnull=False,
+    ).distinct().values_list('pk', flat=True)[:WEBHOOK_WORKERS * 2])
+    random.shuffle(due)
+    ''' Workers try the due webhooks in different orders, so they rarely
+    compete for the same one.
+    '''
+    lease = now + timedelta(seconds=WEBHOOK_TIMEOUT * 3)
+    for pk in due:
+        if Webhook.objects.filter(free, pk=pk).update(locked_until=lease):
+            return Webhook.objects.get(pk=pk)
+    return None
+
+
+def _post(webhook, body):
+    ''' Post a body to the webhook. Returns None on success, the error
+    otherwise.
+    '''
+    request = Request(webhook.url, data=body, headers={
+        'Content-Type': 'application/json',
+        'User-Agent': 'Issuetrack-Webhook',
+        WEBHOOK_SIGNATURE_HEADER: sign(webhook.secret, body),
+    })
+    try:
+        with urlopen(request, timeout=WEBHOOK_TIMEOUT) as response:
+            if 200 <= response.status < 300:
+                return None
+            return 'HTTP {}'.format(response.status)
+    except (HTTPException, OSError) as error:
+        return str(error) or error.__class__.__name__
+
+
+def deliver(webhook):
+    ''' Send the oldest queued events of a locked webhook in one request
+    and unlock it. Returns the number of events sent and the error, if the
+    delivery failed.
+    '''
+    events = list(
+        webhook.webhookevent_set.order_by('pk')[:max(webhook.batch_size, 1)])
+    ids = [event.pk for event in events]
+    body = '{{"events": [{}]}}'.format(
+        ', '.join(event.payload for event in events)).encode('utf-8')
+    error = _post(webhook, body) if events else None
+    if error is None:
+        WebhookEvent.objects.filter(pk__in=ids).delete()
+        Webhook.objects.filter(pk=webhook.pk).update(
+            failures=0, retry_at=None, locked_until=None)
+        return len(events), None
+    WebhookEvent.objects.filter(pk__in=ids).update(attempts=F('attempts') + 1)
+    WebhookEvent.objects.filter(
+        pk__in=ids, attempts__gte=WEBHOOK_MAX_ATTEMPTS).delete()
+    ''' Events the receiver refused too often are dropped.
+    '''
+    delay = min(
+        WEBHOOK_RETRY_DELAY * 2 ** webhook.failures, WEBHOOK_RETRY_MAX_DELAY)
+    Webhook.objects.filter(pk=webhook.pk).update(
+        failures=F('failures') + 1,
+        retry_at=timezone.now() + timedelta(seconds=delay),
+        locked_until=None,
+    )
+    return 0, error
+
+
+def _work(once, progress):
+    ''' Deliver events until the queue has no due events, if once, or
+    forever.
+    '''
+    while True:
+        webhook = _claim(timezone.now())
+        if webhook is None:
+            if once:
+                return
+            time.sleep(WEBHOOK_POLL_INTERVAL)
+            continue
+        sent, error = deliver(webhook)
+        if progress:
+            if error:
+                progress('{}: failed, {}'.format(webhook.url, error))
+            else:
+                progress('{}: {} events sent'.format(webhook.url, sent))
+
+
+def _work_in_thread(once, progress):
+    ''' Run a worker in its own thread, with its own database connection.
+    '''
+    try:
+        _work(once, progress)
+    finally:
+        connection.close()
+
+
+def deliver_webhooks(workers=WEBHOOK_WORKERS, once=False, progress=None):
+    ''' Drain the webhook queue with the given number of workers. With once,
+    return when no events are due, otherwise run until interrupted.
+    '''
+    if workers <= 1:
+        _work(once, progress)
+        return
+    threads = [
+        threading.Thread(target=_work_in_thread, args=(once, progress))
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        while thread.is_alive():
+            thread.join(1)
+    ''' Joined with a timeout so the command can be interrupted.
+    '''